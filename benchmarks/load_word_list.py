@@ -0,0 +1,96 @@
+import logging
+import os
+import tempfile
+import time
+import uuid
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from constants import DEFAULT_LISTS_DIR, Language
+from helpers.load_word_list import load_word_list
+from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
+from log import logger
+
+app = typer.Typer()
+
+
+def create_synthetic_list(
+    template_word_objects: list[dict], length: int, lists_dir: str
+) -> None:
+    word_objects = []
+    while len(word_objects) < length:
+        for word_object in template_word_objects[: length - len(word_objects)]:
+            word_objects.append({**word_object, "key": str(uuid.uuid4())})
+
+    save_word_objects_in_chunks(
+        word_objects=word_objects, language=Language.POLISH, lists_dir=lists_dir
+    )
+
+
+def time_cold_load(lists_dir: str, workers: int, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_word_list(
+            language=Language.POLISH,
+            lists_dir=lists_dir,
+            cache_dir=None,
+            workers=workers,
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@app.command()
+def main(
+    lengths: list[int] = [1_000, 5_000, 10_000, 25_000, 50_000, 100_000],
+    workers: int = os.cpu_count() or 1,
+    repeat: int = 3,
+    lists_dir: str = DEFAULT_LISTS_DIR,
+) -> None:
+    """Compares cold (uncached) serial and parallel loads of synthetic word lists."""
+    template_word_objects = load_word_list(
+        language=Language.POLISH,
+        lists_dir=os.path.join(lists_dir, Language.POLISH.value),
+    )
+    if not template_word_objects:
+        return
+
+    # Every load logs a line, which would drown the results
+    logger.setLevel(logging.WARNING)
+
+    table = Table(title=f"Cold load_word_list (best of {repeat})")
+    table.add_column("Words", justify="right")
+    table.add_column("Serial", justify="right")
+    table.add_column(f"Parallel ({workers} workers)", justify="right")
+    table.add_column("Speedup", justify="right")
+
+    break_even = None
+    for length in lengths:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            create_synthetic_list(template_word_objects, length, tmp_dir)
+            serial = time_cold_load(tmp_dir, workers=1, repeat=repeat)
+            parallel = time_cold_load(tmp_dir, workers=workers, repeat=repeat)
+
+        speedup = serial / parallel
+        if speedup > 1 and break_even is None:
+            break_even = length
+
+        table.add_row(
+            f"{length:,}", f"{serial:.3f}s", f"{parallel:.3f}s", f"{speedup:.2f}x"
+        )
+
+    console = Console()
+    console.print(table)
+    if break_even:
+        console.print(
+            f"Parallel loading beats serial loading from {break_even:,} words"
+        )
+    else:
+        console.print("Parallel loading did not beat serial loading")
+
+
+if __name__ == "__main__":
+    app()
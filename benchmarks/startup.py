@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import time
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+app = typer.Typer()
+
+TOOLKIT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "toolkit.py")
+
+
+def time_command(command: list[str], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, TOOLKIT_PATH, *command],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+@app.command()
+def main(
+    commands: list[str] = ["--help", "languages", "quota"],
+    repeat: int = 5,
+    max_seconds: float = 0.5,
+) -> None:
+    """Times the cold start of lightweight toolkit commands and fails if one
+    of them is slower than max_seconds."""
+    table = Table(title=f"Toolkit startup (best of {repeat})")
+    table.add_column("Command")
+    table.add_column("Time", justify="right")
+
+    too_slow = []
+    for command in commands:
+        seconds = time_command(command.split(), repeat)
+        if seconds > max_seconds:
+            too_slow.append(command)
+        table.add_row(command, f"{seconds:.3f}s")
+
+    console = Console()
+    console.print(table)
+    if too_slow:
+        console.print(
+            f"[red]Slower than {max_seconds:.3f}s: {', '.join(too_slow)}[/red]"
+        )
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,52 @@
+import hashlib
+import io
+
+from requests import PreparedRequest, Response
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+class FakeHttpAdapter(BaseAdapter):
+    """Serves fixed bodies by URL, mounted on a session in place of the real
+    transport. Bodies get an ETag and are answered with 304 when the request
+    already has it. The first failures[url] requests to a URL are answered
+    with 503 and Retry-After: 0."""
+
+    def __init__(
+        self, bodies: dict[str, bytes], failures: dict[str, int] | None = None
+    ):
+        super().__init__()
+        self.bodies = bodies
+        self.failures = dict(failures or {})
+        self.requests = []
+
+    def send(self, request: PreparedRequest, **kwargs) -> Response:
+        self.requests.append(request)
+        url = request.url.split("?")[0]
+        body = self.bodies.get(url)
+        headers = {}
+
+        if self.failures.get(url):
+            self.failures[url] -= 1
+            status_code, body, headers = 503, b"", {"Retry-After": "0"}
+        elif body is None:
+            status_code, body = 404, b""
+        else:
+            etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+            headers = {"ETag": etag}
+            if request.headers.get("If-None-Match") == etag:
+                status_code, body = 304, b""
+            else:
+                status_code = 200
+
+        response = Response()
+        response.status_code = status_code
+        response.headers = CaseInsensitiveDict(headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,104 @@
+import re
+import threading
+from types import SimpleNamespace
+from xml.sax.saxutils import unescape
+
+from google.api_core import exceptions as google_exceptions
+
+from constants import TTS_BATCH_BREAK_SECONDS
+
+# MPEG-1 layer III, 128 kbit/s, 44.1 kHz, mono, no CRC and no padding
+FRAME_HEADER = bytes([0xFF, 0xFB, 0x90, 0xC0])
+FRAME_LENGTH = 1152 // 8 * 128000 // 44100
+FRAME_DURATION = 1152 / 44100
+
+SINGLE_PREFIX = b"single:"
+
+MARKED_TEXT_PATTERN = re.compile(r'<mark name="(w\d+)"/>(.*?)<break')
+
+
+def get_frame(payload: bytes = b"") -> bytes:
+    # Real frames hold encoded audio, the fake ones hold a readable payload
+    return FRAME_HEADER + payload.ljust(FRAME_LENGTH - len(FRAME_HEADER), b"\0")
+
+
+def get_word_frame_count(text: str) -> int:
+    # Longer words take longer to say
+    return 2 + len(text) % 5
+
+
+def get_word_audio(text: str, payload: bytes) -> bytes:
+    return get_frame(payload) * get_word_frame_count(text)
+
+
+def get_frame_payload(frame: bytes) -> bytes:
+    return frame[len(FRAME_HEADER) :].rstrip(b"\0")
+
+
+class FailingClient:
+    """Raises a retryable error for the first failures calls, like an
+    overloaded API. Safe to share between threads like the real clients."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.failed_calls = 0
+        self.lock = threading.Lock()
+
+    def fail_if_overloaded(self) -> None:
+        with self.lock:
+            if self.failed_calls < self.failures:
+                self.failed_calls += 1
+                raise google_exceptions.ServiceUnavailable("Fake overload")
+
+
+class FakeTextToSpeechClient(FailingClient):
+    """Stands in for texttospeech.TextToSpeechClient. Every word is a few
+    frames whose payload is "single:<text>"."""
+
+    def __init__(self, failures: int = 0):
+        super().__init__(failures)
+        self.texts = []
+
+    def synthesize_speech(self, input, voice, audio_config) -> SimpleNamespace:
+        self.fail_if_overloaded()
+        self.texts.append(input.text)
+        payload = SINGLE_PREFIX + input.text.encode("utf-8")
+        return SimpleNamespace(audio_content=get_word_audio(input.text, payload))
+
+
+class FakeBatchTextToSpeechClient(FailingClient):
+    """Stands in for texttospeech_v1beta1.TextToSpeechClient. The SSML of a
+    batch is rendered as the frames of each word followed by silent frames
+    for the break, with a timepoint at every mark. Words in missing_marks
+    get no timepoint, like a mark the API skipped."""
+
+    def __init__(self, missing_marks: set[str] | None = None, failures: int = 0):
+        super().__init__(failures)
+        self.missing_marks = missing_marks or set()
+        self.batches = []
+
+    def synthesize_speech(self, request) -> SimpleNamespace:
+        self.fail_if_overloaded()
+        ssml = request.input.ssml
+        texts = []
+        audio_content = b""
+        timepoints = []
+        time_seconds = 0.0
+        break_frames = round(TTS_BATCH_BREAK_SECONDS / FRAME_DURATION)
+
+        for mark_name, escaped_text in MARKED_TEXT_PATTERN.findall(ssml):
+            text = unescape(escaped_text)
+            texts.append(text)
+            if text not in self.missing_marks:
+                timepoints.append(
+                    SimpleNamespace(mark_name=mark_name, time_seconds=time_seconds)
+                )
+            audio_content += get_word_audio(text, text.encode("utf-8"))
+            audio_content += get_frame() * break_frames
+            time_seconds += (get_word_frame_count(text) + break_frames) * FRAME_DURATION
+
+        timepoints.append(
+            SimpleNamespace(mark_name=f"w{len(texts)}", time_seconds=time_seconds)
+        )
+        self.batches.append(texts)
+        return SimpleNamespace(audio_content=audio_content, timepoints=timepoints)
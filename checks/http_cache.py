@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import tempfile
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from checks.fake_http_adapter import FakeHttpAdapter
+from helpers.http_client import (
+    download_file_cached,
+    get_http_session,
+    get_json_cached,
+    get_with_retry,
+)
+from log import logger
+
+app = typer.Typer()
+
+BASE_URL = "https://fake.test/"
+JSON_URL = f"{BASE_URL}photos"
+FILE_URL = f"{BASE_URL}photo.jpg"
+FLAKY_URL = f"{BASE_URL}flaky"
+
+
+@app.command()
+def main() -> None:
+    """Runs the cached HTTP helpers against a fake transport and checks that
+    fresh responses are reused, stale ones are revalidated with their ETag,
+    failed requests are retried and downloads happen once."""
+    logger.setLevel(logging.ERROR)
+
+    data = {"results": [{"id": "abc"}]}
+    adapter = FakeHttpAdapter(
+        bodies={
+            JSON_URL: json.dumps(data).encode("utf-8"),
+            FILE_URL: b"\xff\xd8 not really a jpeg",
+            FLAKY_URL: b"ok",
+        },
+        failures={FLAKY_URL: 2},
+    )
+    get_http_session().mount(BASE_URL, adapter)
+
+    table = Table(title="HTTP cache")
+    table.add_column("Step")
+    table.add_column("Requests", justify="right")
+    table.add_column("Result")
+    problems = []
+
+    def check(step: str, expected_requests: int, passed: bool) -> None:
+        requests_made = len(adapter.requests)
+        adapter.requests.clear()
+        ok = passed and requests_made == expected_requests
+        if not ok:
+            problems.append(
+                f"{step}: {requests_made} of {expected_requests} request(s)"
+                + ("" if passed else ", wrong result")
+            )
+        table.add_row(
+            step,
+            f"{requests_made}/{expected_requests}",
+            "[green]ok[/green]" if ok else "[red]failed[/red]",
+        )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_path = os.path.join(tmp_dir, "photos.json")
+
+        check("first fetch", 1, get_json_cached(JSON_URL, cache_path, 60) == data)
+        check("fresh cache", 0, get_json_cached(JSON_URL, cache_path, 60) == data)
+
+        revalidated = get_json_cached(JSON_URL, cache_path, 0) == data
+        if_none_match = adapter.requests[-1].headers.get("If-None-Match")
+        check("revalidation", 1, revalidated and if_none_match is not None)
+
+        response = get_with_retry(FLAKY_URL, max_retries=2)
+        check("retry after 503", 3, response.status_code == 200)
+
+        file_path = os.path.join(tmp_dir, "images", "photo.jpg")
+        download_file_cached(FILE_URL, file_path)
+        with open(file_path, "rb") as f:
+            downloaded = f.read() == adapter.bodies[FILE_URL]
+        check("download", 1, downloaded)
+        check(
+            "cached download", 0, download_file_cached(FILE_URL, file_path) == file_path
+        )
+
+    console = Console()
+    console.print(table)
+    if problems:
+        console.print(f"[red]{'; '.join(problems)}[/red]")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,150 @@
+import logging
+import os
+import tempfile
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from checks.fake_tts_client import (
+    SINGLE_PREFIX,
+    FakeBatchTextToSpeechClient,
+    FakeTextToSpeechClient,
+    get_frame_payload,
+    get_word_frame_count,
+)
+from constants import Language
+from helpers.get_audio_from_google_cloud_tts import get_audio_from_google_cloud_tts
+from helpers.split_mp3 import get_mp3_frames
+from log import logger
+
+app = typer.Typer()
+
+LANGUAGE = Language.POLISH
+
+
+def get_single_texts(
+    batches: list[list[str]], words: list[str], missing_marks: set[str]
+) -> set[str]:
+    # A missing mark ends the previous word as well as starting its own, and
+    # words that end up in a batch of one are never sent as a batch
+    batched_texts = {text for batch in batches for text in batch}
+    single_texts = {text for text in words if text not in batched_texts}
+    for batch in batches:
+        for text, next_text in zip(batch, [*batch[1:], None]):
+            if text in missing_marks or next_text in missing_marks:
+                single_texts.add(text)
+    return single_texts
+
+
+def get_audio_problem(audio_content: bytes, text: str, single: bool) -> str | None:
+    # Silent frames around the word are fine, other words are not
+    payloads = [
+        get_frame_payload(frame.data) for frame in get_mp3_frames(audio_content)
+    ]
+    expected_payload = (SINGLE_PREFIX if single else b"") + text.encode("utf-8")
+    word_payloads = [payload for payload in payloads if payload]
+
+    other_payloads = sorted(set(word_payloads) - {expected_payload})
+    if other_payloads:
+        return f"contains {b', '.join(other_payloads).decode('utf-8')}"
+    if len(word_payloads) != get_word_frame_count(text):
+        return f"has {len(word_payloads)} of {get_word_frame_count(text)} word frames"
+    return None
+
+
+@app.command()
+def main(
+    words: list[str] = ["kot", "pies", "dom & ogród", "samochód", "ptak", "ryba"],
+    missing_mark: str = "samochód",
+    batch_size: int = 4,
+    workers: int = 4,
+    failures: int = 1,
+) -> None:
+    """Runs the batched audio generation against fake TTS clients and checks
+    that every key gets exactly its own word, cut at the SSML marks or, for
+    the words next to the missing mark, requested on their own. Both clients
+    fail their first requests with retryable errors."""
+    logger.setLevel(logging.WARNING)
+
+    client = FakeTextToSpeechClient(failures=failures)
+    batch_client = FakeBatchTextToSpeechClient(
+        missing_marks={missing_mark}, failures=failures
+    )
+    word_objects = [
+        {"key": f"key-{i}", LANGUAGE.value: text} for i, text in enumerate(words)
+    ]
+
+    # The quota and the audio store live below the working directory
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.chdir(tmp_dir)
+        try:
+            output_dir = os.path.join("media", "audio", LANGUAGE.value)
+            errors = get_audio_from_google_cloud_tts(
+                word_objects=word_objects,
+                language=LANGUAGE,
+                output_dir=output_dir,
+                workers=workers,
+                client=client,
+                max_retries=failures,
+                batch_size=batch_size,
+                batch_client=batch_client,
+            )
+
+            table = Table(
+                title=f"TTS batching (batch size {batch_size}, {workers} workers)"
+            )
+            table.add_column("Key")
+            table.add_column("Word")
+            table.add_column("Source")
+            table.add_column("Result")
+
+            single_texts = get_single_texts(
+                batch_client.batches, words, batch_client.missing_marks
+            )
+            problems = [f"{key}: {error}" for key, error in errors.items()]
+            for word_object in word_objects:
+                key = word_object["key"]
+                text = word_object[LANGUAGE.value]
+                single = text in single_texts
+                audio_file_path = os.path.join(output_dir, f"{key}.mp3")
+
+                if not os.path.exists(audio_file_path):
+                    problem = "is missing"
+                else:
+                    with open(audio_file_path, "rb") as f:
+                        problem = get_audio_problem(f.read(), text, single)
+                if problem:
+                    problems.append(f"{key}: audio {problem}")
+
+                table.add_row(
+                    key,
+                    text,
+                    "single request" if single else "batch",
+                    f"[red]{problem}[/red]" if problem else "[green]ok[/green]",
+                )
+        finally:
+            os.chdir(original_dir)
+
+    if len(batch_client.batches) < 2:
+        problems.append(f"expected several batches, got {batch_client.batches}")
+    if batch_client.failed_calls != failures:
+        problems.append(
+            f"expected {failures} failed batch request(s) to be retried, "
+            f"got {batch_client.failed_calls}"
+        )
+    if sorted(client.texts) != sorted(single_texts):
+        problems.append(
+            f"expected single requests for {sorted(single_texts)}, got {client.texts}"
+        )
+
+    console = Console()
+    console.print(table)
+    if problems:
+        console.print(f"[red]{'; '.join(problems)}[/red]")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
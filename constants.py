@@ -10,17 +10,75 @@ DEFAULT_AUDIO_DIR = "audio"
 DEFAULT_TEMPLATE_PATH = "./templates/refinement_prompt.md"
 DEFAULT_CHUNK_SIZE = 50
 DEFAULT_TRIM_LENGTH = 0
+DEFAULT_NEAR_DUPLICATE_THRESHOLD = 0.8
+NEAR_DUPLICATE_NGRAM_SIZE = 3
+NEAR_DUPLICATE_BANDS = 8
+NEAR_DUPLICATE_BAND_ROWS = 4
+NEAR_DUPLICATE_MAX_BUCKET_SIZE = 50
+DEFAULT_CACHE_DIR = "./.cache"
+DEFAULT_LOAD_WORKERS = 1
+DEFAULT_DUMP_DIR = "./dump"
+DEFAULT_WORD_LIST_DB_PATH = "./lists.sqlite3"
+WORD_LIST_BACKENDS = ("yaml", "sqlite")
+DEFAULT_WATCH_DEBOUNCE = 0.2
+DEFAULT_WATCH_POLL_INTERVAL = 0.3
+DEFAULT_EXPORT_DIR = "./export"
+EXPORT_YAML_BATCH_SIZE = 100
 
 IMAGES_DIR_NAME = "images"
 AUDIO_DIR_NAME = "audio"
+AUDIO_STORE_DIR_NAME = ".store"
+AUDIO_MANIFEST_FILENAME = ".manifest.json"
+IMAGE_ATTRIBUTIONS_FILENAME = "attributions.json"
 
 UNSPLASH_REFERENCE_URL = "unsplash.com/"
+UNSPLASH_API_URL = "https://api.unsplash.com"
+UNSPLASH_METADATA_MAX_AGE = 30 * 24 * 60 * 60
 
+ONE_MINUTE = 60
 ONE_HOUR = 60 * 60
 UNSPLASH_LIMIT_PER_HOUR = 50
+TTS_LIMIT_PER_MINUTE = 1000
+
+QUOTA_DB_FILENAME = "quota.sqlite3"
+UNSPLASH_QUOTA = "unsplash"
+TTS_QUOTA = "tts"
+
+# Requests allowed per period in seconds
+API_QUOTAS = {
+    UNSPLASH_QUOTA: (UNSPLASH_LIMIT_PER_HOUR, ONE_HOUR),
+    TTS_QUOTA: (TTS_LIMIT_PER_MINUTE, ONE_MINUTE),
+}
+
+IMAGE_SIZE = 1024
+IMAGE_QUALITY = 90
+DEFAULT_IMAGE_WORKERS = 4
+DEFAULT_IMAGE_CANDIDATES = 9
+
+DEFAULT_OPTIMIZED_MEDIA_DIR = "./media-optimized"
+DEFAULT_OPTIMIZED_IMAGE_SIZE = 512
+DEFAULT_OPTIMIZED_IMAGE_QUALITY = 80
+DEFAULT_OPTIMIZED_AUDIO_BITRATE = "48k"
+OPTIMIZED_MEDIA_MANIFEST_FILENAME = ".optimize-manifest.json"
 
 TIMEOUT = 10
 
+DEFAULT_SYNC_WORKERS = 8
+SYNC_MANIFEST_FILENAME = ".sync-manifest.json"
+
+HTTP_TIMEOUT = 30
+HTTP_POOL_SIZE = 16
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BASE_DELAY = 1
+
+DEFAULT_TTS_WORKERS = 8
+TTS_MAX_RETRIES = 5
+TTS_RETRY_BASE_DELAY = 1
+DEFAULT_TTS_BATCH_SIZE = 1
+TTS_MAX_SSML_BYTES = 5000
+TTS_BATCH_BREAK_SECONDS = 0.4
+TTS_BATCH_PADDING_SECONDS = 0.1
+
 DEEPL_ENGLISH_SOURCE_LANG = "EN"
 DEEPL_ENGLISH_TARGET_LANG = "EN-US"
 
@@ -44,6 +102,14 @@ class WordType(Enum):
     ALL = "all"
 
 
+class ExportFormat(Enum):
+    YAML = "yaml"
+    JSONL = "jsonl"
+    CSV = "csv"
+    TSV = "tsv"
+    JSON = "json"
+
+
 class Language(Enum):
     ARABIC = "ar"
     BANGLA = "bn"
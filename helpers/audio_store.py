@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+from constants import AUDIO_MANIFEST_FILENAME, AUDIO_STORE_DIR_NAME
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+
+def get_audio_hash(
+    voice_name: str, language_code: str, text: str, audio_config: dict
+) -> str:
+    # Everything that influences the synthesized audio is part of the hash
+    description = {
+        "voice_name": voice_name,
+        "language_code": language_code,
+        "text": text,
+        "audio_config": audio_config,
+    }
+    return hashlib.sha256(
+        json.dumps(description, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def get_audio_store_dir(audio_dir: str) -> str:
+    # The store is shared by all languages: media/audio/.store
+    return os.path.join(
+        os.path.dirname(os.path.normpath(audio_dir)), AUDIO_STORE_DIR_NAME
+    )
+
+
+def get_audio_store_path(store_dir: str, audio_hash: str) -> str:
+    return os.path.join(store_dir, f"{audio_hash}.mp3")
+
+
+def read_audio_manifest(audio_dir: str) -> dict[str, str]:
+    manifest_path = os.path.join(audio_dir, AUDIO_MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return {}
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"Could not read {manifest_path}, starting a new one: {e}")
+        return {}
+
+
+def write_audio_manifest(audio_dir: str, manifest: dict[str, str]) -> None:
+    write_file_atomically(
+        os.path.join(audio_dir, AUDIO_MANIFEST_FILENAME),
+        json.dumps(manifest, indent=2, sort_keys=True),
+    )
+
+
+def link_or_copy(source_path: str, destination_path: str) -> None:
+    """Links the source file to the destination path, as a hardlink where
+    possible and as a copy otherwise (e.g. across devices). The destination
+    is replaced atomically."""
+    directory = os.path.dirname(destination_path)
+    os.makedirs(directory, exist_ok=True)
+
+    tmp_path = os.path.join(
+        directory, f".{os.path.basename(destination_path)}.{uuid.uuid4().hex}.tmp"
+    )
+    try:
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, destination_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def link_audio_file(store_path: str, audio_file_path: str) -> None:
+    # Materialises a stored audio file under its per-key name
+    if os.path.exists(audio_file_path) and os.path.samefile(
+        store_path, audio_file_path
+    ):
+        return
+
+    link_or_copy(store_path, audio_file_path)
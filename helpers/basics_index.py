@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+
+import yaml
+
+from constants import DEFAULT_CACHE_DIR, Language
+from helpers.write_file_atomically import write_file_atomically
+from helpers.yaml_loader import CSafeLoader
+from log import logger
+
+# Bump when the layout of the index changes
+BASICS_INDEX_VERSION = 1
+
+
+def get_basics_index_dir(cache_dir: str, basics_list_path: str) -> str:
+    basics_list_digest = hashlib.sha1(
+        os.path.abspath(basics_list_path).encode("utf-8")
+    ).hexdigest()[:10]
+    return os.path.join(cache_dir, "basics", basics_list_digest)
+
+
+def get_file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_basics_index(basics_list_path: str, index_dir: str, sha256: str) -> dict:
+    """Splits the basics list into one column per language. Row i of every
+    column belongs to entry i of the list, missing translations are None."""
+    with open(basics_list_path, "r", encoding="utf-8") as f:
+        basics_list = yaml.load(f, Loader=CSafeLoader) or []
+
+    languages = sorted({code for word in basics_list for code in word})
+    for code in languages:
+        column = [word.get(code) for word in basics_list]
+        write_file_atomically(
+            os.path.join(index_dir, f"{code}.json"),
+            json.dumps(column, ensure_ascii=False),
+        )
+
+    stat = os.stat(basics_list_path)
+    meta = {
+        "version": BASICS_INDEX_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": sha256,
+        "rows": len(basics_list),
+        "languages": languages,
+    }
+
+    # The meta file is written last, so an interrupted build is redone
+    write_file_atomically(os.path.join(index_dir, "meta.json"), json.dumps(meta))
+    logger.info(
+        f"Indexed {len(basics_list)} basics in {len(languages)} language(s) from {basics_list_path}"
+    )
+    return meta
+
+
+def load_basics_index(
+    basics_list_path: str, cache_dir: str = DEFAULT_CACHE_DIR
+) -> dict:
+    """Returns the meta data of the compiled basics index and rebuilds the
+    index first if the YAML file changed."""
+    index_dir = get_basics_index_dir(cache_dir, basics_list_path)
+    meta_path = os.path.join(index_dir, "meta.json")
+
+    meta = {}
+    if os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+    if meta.get("version") == BASICS_INDEX_VERSION:
+        stat = os.stat(basics_list_path)
+        if meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+            return {**meta, "dir": index_dir}
+
+    # A touched but unchanged file only needs a new modification time
+    sha256 = get_file_hash(basics_list_path)
+    if meta.get("version") == BASICS_INDEX_VERSION and meta["sha256"] == sha256:
+        stat = os.stat(basics_list_path)
+        meta.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        write_file_atomically(meta_path, json.dumps(meta))
+    else:
+        meta = build_basics_index(basics_list_path, index_dir, sha256)
+
+    return {**meta, "dir": index_dir}
+
+
+def get_basics_column(basics_index: dict, language: Language) -> list[str | None]:
+    if language.value not in basics_index["languages"]:
+        return [None] * basics_index["rows"]
+
+    with open(
+        os.path.join(basics_index["dir"], f"{language.value}.json"),
+        "r",
+        encoding="utf-8",
+    ) as f:
+        return json.load(f)
+
+
+def get_basics_pairs(basics_index: dict, language: Language) -> list[dict]:
+    # The basics of a language paired with English, as used for new lists
+    english_column = get_basics_column(basics_index, Language.ENGLISH)
+    language_column = get_basics_column(basics_index, language)
+    return [
+        {Language.ENGLISH.value: en, language.value: word}
+        for en, word in zip(english_column, language_column)
+    ]
+
+
+def get_missing_basics_rows(basics_index: dict, language: Language) -> list[int]:
+    return [
+        row
+        for row, word in enumerate(get_basics_column(basics_index, language))
+        if not word
+    ]
@@ -0,0 +1,9 @@
+import re
+
+
+def clean_word(text: str) -> str:
+    # Remove content in parentheses
+    text = re.sub(r"\s*\([^)]*\)", "", text)
+    # Clean up any extra whitespace
+    text = " ".join(text.split())
+    return text.strip()
@@ -1,4 +1,5 @@
 import os
+from functools import cache
 
 import genanki
 import i18n
@@ -10,11 +11,22 @@ from constants import (
     GENANKI_ID,
     Language,
 )
+from helpers.get_deck_fingerprint import (
+    deck_is_up_to_date,
+    get_deck_fingerprint,
+    write_deck_fingerprint,
+)
 from helpers.get_image_source import get_image_source
 from helpers.get_word_additions import (
     get_comment,
     get_gender_addition,
 )
+from helpers.media_index import (
+    get_audio_file,
+    get_image_file,
+    get_image_slug,
+    load_media_index,
+)
 from helpers.update_deck_index import update_deck_index
 from log import logger
 
@@ -52,38 +64,41 @@ def get_common_css() -> str:
         return f.read()
 
 
-FLASHCARD_MODEL = genanki.Model(
-    model_id=GENANKI_FLASHCARD_MODEL_ID,
-    name="Snail's Vocabularies Note",
-    fields=[
-        {"name": "native_word"},
-        {"name": "target_word"},
-        {"name": "word_type"},
-        {"name": "sound"},
-        {"name": "image"},
-        {"name": "gender"},
-        {"name": "plural_form"},
-        {"name": "positive"},
-        {"name": "comparative"},
-        {"name": "superlative"},
-        {"name": "first_person_singular"},
-        {"name": "first_person_plural"},
-        {"name": "second_person_singular"},
-        {"name": "second_person_plural"},
-        {"name": "third_person_singular"},
-        {"name": "third_person_plural"},
-        {"name": "image_source"},
-        {"name": "comment"},
-        {"name": "perfective"},
-    ],
-    templates=[
-        {
-            "name": "Vocabulary",
-            "qfmt": load_template("card-question"),
-            "afmt": load_template("card-answer"),
-        },
-    ],
-)
+@cache
+def get_flashcard_model() -> genanki.Model:
+    # Built on first use, so importing this module does not read the templates
+    return genanki.Model(
+        model_id=GENANKI_FLASHCARD_MODEL_ID,
+        name="Snail's Vocabularies Note",
+        fields=[
+            {"name": "native_word"},
+            {"name": "target_word"},
+            {"name": "word_type"},
+            {"name": "sound"},
+            {"name": "image"},
+            {"name": "gender"},
+            {"name": "plural_form"},
+            {"name": "positive"},
+            {"name": "comparative"},
+            {"name": "superlative"},
+            {"name": "first_person_singular"},
+            {"name": "first_person_plural"},
+            {"name": "second_person_singular"},
+            {"name": "second_person_plural"},
+            {"name": "third_person_singular"},
+            {"name": "third_person_plural"},
+            {"name": "image_source"},
+            {"name": "comment"},
+            {"name": "perfective"},
+        ],
+        templates=[
+            {
+                "name": "Vocabulary",
+                "qfmt": load_template("card-question"),
+                "afmt": load_template("card-answer"),
+            },
+        ],
+    )
 
 
 def create_deck(
@@ -92,7 +107,16 @@ def create_deck(
     target_language: Language,
     media_dir: str,
     output_dir: str,
-) -> None:
+    force: bool = False,
+    media_index: dict | None = None,
+    update_index: bool = True,
+) -> str | None:
+    """Creates the deck and returns its path. A media index loaded once can be
+    shared between decks, otherwise the index for the target language is
+    loaded from the cache."""
+    if media_index is None:
+        media_index = load_media_index(media_dir, [target_language])
+
     deck_title_key = f"deck_titles.deck_title_{target_language.value}"
     translated_title = i18n.t(deck_title_key, locale=native_language.value)
 
@@ -123,44 +147,46 @@ def create_deck(
             logger.error(
                 f"{word_object} does not include {native_language.value} and {target_language.value}."
             )
-            return
+            return None
 
         translated_word_type = i18n.t(
             f"word_types.{word_type}", locale=native_language.value
         )
 
-        audio_filepath = os.path.join(audio_dir, f"{key}.mp3")
-        audio_filename = f"{key}.mp3"
+        audio_filepath = get_audio_file(media_index, target_language, key)
 
         # Check if audio file exists
         sound_field = ""
-        if os.path.exists(audio_filepath):
-            sound_field = f"[sound:{audio_filename}]"
+        if audio_filepath:
+            sound_field = f"[sound:{os.path.basename(audio_filepath)}]"
             package.media_files.append(audio_filepath)
         else:
-            logger.warning(f"Audio file not found: {audio_filepath}")
+            logger.warning(
+                f"Audio file not found: {os.path.join(audio_dir, f'{key}.mp3')}"
+            )
 
         # Slugify the English word for the image filename
-        en_slug = slugify(en) if en else "unknown"
+        en_slug = get_image_slug(en)
 
         # Check if image file exists with format: {en_slug}.jpg
-        image_filepath = os.path.join(images_dir, f"{en_slug}.jpg")
-        image_filename = f"{en_slug}.jpg"
+        image_filepath = get_image_file(media_index, en_slug)
         image_field = ""
-        if os.path.exists(image_filepath):
-            image_field = f'<img src="{image_filename}">'
+        if image_filepath:
+            image_field = f'<img src="{os.path.basename(image_filepath)}">'
             package.media_files.append(image_filepath)
         else:
-            logger.warning(f"Image file not found: {image_filepath}")
+            logger.warning(
+                f"Image file not found: {os.path.join(images_dir, f'{en_slug}.jpg')}"
+            )
 
         # Get image source attribution
-        image_source_snippet = get_image_source(en_slug, images_dir)
+        image_source_snippet = get_image_source(en_slug, media_index["attributions"])
 
         gender_snippet = get_gender_addition(gender, native_language.value)
         comment_snippet = get_comment(comment_text)
 
         note = genanki.Note(
-            model=FLASHCARD_MODEL,
+            model=get_flashcard_model(),
             fields=[
                 native_word,
                 target_word,
@@ -204,20 +230,37 @@ def create_deck(
     os.makedirs(output_dir, exist_ok=True)
 
     filename = slugify(translated_title)
+
+    # Titles fall back to English, so other native languages get a distinct name
+    if native_language != Language.ENGLISH:
+        filename = f"{native_language.value}-{filename}"
+
     output_path = os.path.join(output_dir, f"{filename}.apkg")
-    package.write_to_file(output_path)
 
-    logger.info(f"Deck created: {output_path}")
+    # Skip writing the package if none of its inputs changed since the last build
+    fingerprint = get_deck_fingerprint(deck, package)
+    if not force and deck_is_up_to_date(output_path, fingerprint):
+        logger.info(
+            f"Deck is up to date, skipping rebuild: {output_path} (list, templates, locales and media unchanged, use --force to rebuild)"
+        )
+    else:
+        package.write_to_file(output_path)
+        write_deck_fingerprint(output_path, fingerprint)
+
+        logger.info(f"Deck created: {output_path}")
 
     # Update the deck index
-    decks_base_dir = os.path.dirname(output_dir)
-    index_path = os.path.join(decks_base_dir, "index.json")
+    if update_index:
+        decks_base_dir = os.path.dirname(output_dir)
+        index_path = os.path.join(decks_base_dir, "index.json")
 
-    relative_deck_path = os.path.relpath(output_path, decks_base_dir)
+        relative_deck_path = os.path.relpath(output_path, decks_base_dir)
 
-    update_deck_index(
-        index_path=index_path,
-        native_language_code=native_language.value,
-        target_language_code=target_language.value,
-        deck_path=relative_deck_path,
-    )
+        update_deck_index(
+            index_path=index_path,
+            native_language_code=native_language.value,
+            target_language_code=target_language.value,
+            deck_path=relative_deck_path,
+        )
+
+    return output_path
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from constants import Language
+from helpers.create_deck import create_deck
+from helpers.media_index import load_media_index
+from helpers.update_deck_index import update_deck_index_entries
+from log import logger
+
+
+def create_decks(
+    word_lists: dict[Language, list[dict]],
+    native_languages: list[Language],
+    media_dir: str,
+    decks_dir: str,
+    workers: int = 1,
+    force: bool = False,
+) -> list[tuple[str, str, str]]:
+    """Builds a deck for every native and target language pair in a process
+    pool and updates the deck index once at the end. Returns the index
+    entries of the decks that were built."""
+    # The media index is loaded once and shared by all decks
+    media_index = load_media_index(media_dir, list(word_lists))
+
+    entries = []
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = {}
+        for target_language, word_objects in word_lists.items():
+            for native_language in native_languages:
+                if native_language == target_language:
+                    continue
+
+                future = executor.submit(
+                    create_deck,
+                    word_objects=word_objects,
+                    native_language=native_language,
+                    target_language=target_language,
+                    media_dir=media_dir,
+                    output_dir=os.path.join(decks_dir, target_language.value),
+                    force=force,
+                    media_index=media_index,
+                    update_index=False,
+                )
+                futures[future] = (native_language, target_language)
+
+        for future in as_completed(futures):
+            native_language, target_language = futures[future]
+            pair = f"{native_language.value}_{target_language.value}"
+            try:
+                output_path = future.result()
+            except Exception as e:
+                logger.error(f"Failed to create deck {pair}: {e}")
+                failed.append(pair)
+                continue
+
+            if output_path is None:
+                failed.append(pair)
+                continue
+
+            entries.append(
+                (
+                    native_language.value,
+                    target_language.value,
+                    os.path.relpath(output_path, decks_dir),
+                )
+            )
+
+    # One merged write instead of a read-modify-write per deck
+    if entries:
+        update_deck_index_entries(
+            index_path=os.path.join(decks_dir, "index.json"),
+            entries=sorted(entries),
+        )
+
+    logger.info(f"Created {len(entries)} deck(s)")
+    if failed:
+        logger.error(
+            f"Could not create {len(failed)} deck(s): {', '.join(sorted(failed))}"
+        )
+
+    return entries
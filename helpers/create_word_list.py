@@ -0,0 +1,56 @@
+import os
+
+from constants import DEFAULT_CACHE_DIR, Language
+from helpers.deduplicate_list import deduplicate_list
+from helpers.get_frequency_list import get_frequency_list
+from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
+from log import logger
+
+
+def create_word_list(
+    language: Language,
+    basics_list: list[dict],
+    frequency_list_length: int,
+    lists_dir: str,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+) -> int:
+    """Creates the raw list for the language in lists_dir/<language> from the
+    basics and the most frequent words and returns its number of words."""
+    # get initial frequency list
+    frequency_list = get_frequency_list(language, frequency_list_length, cache_dir)
+
+    # convert basics list to word objects
+    basics_word_objects = []
+    for word in basics_list:
+        word_object = {
+            Language.ENGLISH.value: word.get(Language.ENGLISH.value, None),
+            language.value: word.get(language.value, None),
+        }
+        basics_word_objects.append(word_object)
+
+    # convert frequency list to word objects
+    frequency_word_objects = []
+    for word in frequency_list:
+        word_object = {
+            language.value: word,
+        }
+        frequency_word_objects.append(word_object)
+
+    # combine basics and frequency lists
+    word_objects = basics_word_objects + frequency_word_objects
+
+    # deduplicate word_objects based on key
+    word_objects = deduplicate_list(word_objects, key=language.value)
+
+    # save the word objects in chunks of 50
+    lang_dir = os.path.join(lists_dir, language.value)
+    created_files = save_word_objects_in_chunks(
+        word_objects=word_objects,
+        language=language,
+        lists_dir=lang_dir,
+    )
+
+    logger.info(
+        f"Saved {len(word_objects)} {language.value} words across {len(created_files)} files"
+    )
+    return len(word_objects)
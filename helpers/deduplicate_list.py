@@ -1,11 +1,66 @@
-def deduplicate_list(word_objects: list[dict], key: str = "key") -> list[dict]:
-    seen = set()
+import unicodedata
+from typing import Callable
+
+from helpers.clean_word import clean_word
+from log import logger
+
+
+def normalize_word(
+    text: str,
+    casefold: bool = True,
+    unicode_form: str | None = "NFKC",
+    strip_parentheticals: bool = True,
+) -> str:
+    # The same parentheticals are removed before a word is spoken
+    if strip_parentheticals:
+        text = clean_word(text)
+    if unicode_form:
+        text = unicodedata.normalize(unicode_form, text)
+    if casefold:
+        text = text.casefold()
+    return text
+
+
+def merge_word_objects(kept: dict, duplicates: list[dict]) -> dict:
+    # Fields the kept word object lacks are taken from its duplicates
+    merged = dict(kept)
+    for duplicate in duplicates:
+        for field, value in duplicate.items():
+            if value and not merged.get(field):
+                merged[field] = value
+    return merged
+
+
+def deduplicate_list(
+    word_objects: list[dict],
+    key: str = "key",
+    normalize: Callable[[str], str] | None = None,
+    merge: bool = False,
+) -> list[dict]:
+    """Keeps the first word object per value of key. Values are compared
+    after normalize if given, or as written if they normalize to nothing.
+    With merge the missing fields of the kept word object are filled from
+    its duplicates."""
+    seen = {}
     deduplicated = []
 
     for word_obj in word_objects:
         value = word_obj.get(key, "")
+        if value and normalize:
+            normalized_value = normalize(value)
+
+            # e.g. a word that is only a parenthetical, it is kept as written
+            if not normalized_value:
+                logger.warning(
+                    f"'{value}' is empty after normalization, comparing it as written"
+                )
+            value = normalized_value or value
+
         if value and value not in seen:
-            seen.add(value)
+            seen[value] = len(deduplicated)
             deduplicated.append(word_obj)
+        elif value and merge:
+            index = seen[value]
+            deduplicated[index] = merge_word_objects(deduplicated[index], [word_obj])
 
     return deduplicated
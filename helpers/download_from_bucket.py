@@ -1,26 +1,25 @@
-import os
-
-from dotenv import load_dotenv
-
+from constants import DEFAULT_SYNC_WORKERS
+from helpers.storage_backends import get_storage_backend
+from helpers.sync_directory import MergeFunction, download_directory
 from log import logger
 
 
-def download_from_bucket(path: str) -> None:
-    load_dotenv()
-
-    bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET")
+def download_from_bucket(
+    path: str,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
+    merge_files: dict[str, MergeFunction] | None = None,
+) -> None:
+    backend = get_storage_backend()
 
-    if not bucket_name:
-        logger.error("GOOGLE_CLOUD_BUCKET environment variable is not set")
+    if not backend:
         return
 
-    bucket_path = f"gs://{bucket_name}/{path}"
-
-    logger.info(f"Downloading {bucket_path} to {path}...")
-
-    result = os.system(f'gsutil -m rsync -r "{bucket_path}" "{path}"')
+    logger.info(f"Downloading {backend.describe(path)} to {path}...")
 
-    if result == 0:
+    if download_directory(
+        path, path, backend, workers=workers, dry_run=dry_run, merge_files=merge_files
+    ):
         logger.info("Download completed successfully")
     else:
-        logger.error(f"Download failed with exit code {result}")
+        logger.error("Download failed for some files")
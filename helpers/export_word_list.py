@@ -0,0 +1,192 @@
+import csv
+import json
+import os
+from typing import IO, Iterable, Iterator
+
+import yaml
+
+from constants import (
+    DEFAULT_CACHE_DIR,
+    EXPORT_YAML_BATCH_SIZE,
+    ExportFormat,
+    Language,
+    WordType,
+)
+from helpers.load_word_list import InvalidWordListError, iter_word_list
+from helpers.write_file_atomically import open_file_atomically
+from helpers.yaml_loader import Dumper
+from log import logger
+
+
+def filter_word_type(
+    word_objects: Iterable[dict], word_type: WordType = WordType.ALL
+) -> Iterator[dict]:
+    if word_type == WordType.ALL:
+        yield from word_objects
+        return
+
+    for word_obj in word_objects:
+        if word_obj.get("word_type") == word_type.value:
+            yield word_obj
+
+
+def project_word_objects(
+    word_objects: Iterable[dict], fields: list[str] | None
+) -> Iterator[dict]:
+    if not fields:
+        yield from word_objects
+        return
+
+    for word_obj in word_objects:
+        yield {field: word_obj[field] for field in fields if field in word_obj}
+
+
+def write_yaml(f: IO, word_objects: Iterable[dict], fields: list[str]) -> int:
+    # Dumping small batches of a list concatenates into one YAML list
+    count = 0
+    batch = []
+    for word_obj in word_objects:
+        batch.append(word_obj)
+        if len(batch) >= EXPORT_YAML_BATCH_SIZE:
+            yaml.dump(
+                batch,
+                f,
+                Dumper=Dumper,
+                default_flow_style=False,
+                allow_unicode=True,
+                sort_keys=False,
+            )
+            count += len(batch)
+            batch = []
+
+    if batch or not count:
+        yaml.dump(
+            batch,
+            f,
+            Dumper=Dumper,
+            default_flow_style=False,
+            allow_unicode=True,
+            sort_keys=False,
+        )
+        count += len(batch)
+
+    return count
+
+
+def write_jsonl(f: IO, word_objects: Iterable[dict], fields: list[str]) -> int:
+    count = 0
+    for word_obj in word_objects:
+        f.write(json.dumps(word_obj, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_json(f: IO, word_objects: Iterable[dict], fields: list[str]) -> int:
+    # A compact JSON array, as loaded by the website
+    count = 0
+    f.write("[")
+    for word_obj in word_objects:
+        if count:
+            f.write(",")
+        f.write(json.dumps(word_obj, ensure_ascii=False, separators=(",", ":")))
+        count += 1
+    f.write("]")
+    return count
+
+
+def get_cell(value: object) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def write_delimited(
+    f: IO, word_objects: Iterable[dict], fields: list[str], separator: str
+) -> int:
+    # The header lines tell Anki's text import how to read the file
+    separator_name = "tab" if separator == "\t" else "comma"
+    f.write(f"#separator:{separator_name}\n#html:false\n")
+    f.write(f"#columns:{separator.join(fields)}\n")
+
+    writer = csv.writer(f, delimiter=separator, lineterminator="\n")
+    count = 0
+    for word_obj in word_objects:
+        writer.writerow([get_cell(word_obj.get(field)) for field in fields])
+        count += 1
+    return count
+
+
+def write_csv(f: IO, word_objects: Iterable[dict], fields: list[str]) -> int:
+    return write_delimited(f, word_objects, fields, ",")
+
+
+def write_tsv(f: IO, word_objects: Iterable[dict], fields: list[str]) -> int:
+    return write_delimited(f, word_objects, fields, "\t")
+
+
+FORMAT_WRITERS = {
+    ExportFormat.YAML: write_yaml,
+    ExportFormat.JSONL: write_jsonl,
+    ExportFormat.JSON: write_json,
+    ExportFormat.CSV: write_csv,
+    ExportFormat.TSV: write_tsv,
+}
+
+
+def get_export_format(output_file: str) -> ExportFormat | None:
+    extension = os.path.splitext(output_file)[1].lstrip(".").lower()
+    if extension == "yml":
+        return ExportFormat.YAML
+    try:
+        return ExportFormat(extension)
+    except ValueError:
+        return None
+
+
+def export_word_objects(
+    word_objects: Iterable[dict],
+    output_file: str,
+    export_format: ExportFormat,
+    language: Language,
+    fields: list[str] | None = None,
+) -> int:
+    """Writes word objects one by one to output_file and returns how many were
+    written. Only the given fields are kept, and delimited formats use them
+    as their columns."""
+    # Delimited formats need columns, by default the word and its translation
+    if not fields and export_format in (ExportFormat.CSV, ExportFormat.TSV):
+        fields = ["key", language.value, Language.ENGLISH.value, "word_type"]
+
+    word_objects = project_word_objects(word_objects, fields)
+
+    newline = "" if export_format in (ExportFormat.CSV, ExportFormat.TSV) else None
+    with open_file_atomically(output_file, newline=newline) as f:
+        return FORMAT_WRITERS[export_format](f, word_objects, fields or [])
+
+
+def export_word_list(
+    language: Language,
+    lists_dir: str,
+    output_file: str,
+    export_format: ExportFormat,
+    fields: list[str] | None = None,
+    word_type: WordType = WordType.ALL,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+) -> int | bool:
+    word_objects = filter_word_type(
+        iter_word_list(language, lists_dir, cache_dir=cache_dir), word_type
+    )
+
+    try:
+        count = export_word_objects(
+            word_objects, output_file, export_format, language, fields
+        )
+    except InvalidWordListError:
+        logger.error(f"Did not export the {language.value} list to {output_file}")
+        return False
+
+    logger.info(f"Exported {count} word objects to {output_file}")
+    return count
@@ -0,0 +1,122 @@
+import hashlib
+from array import array
+from collections import defaultdict
+
+from constants import (
+    NEAR_DUPLICATE_BAND_ROWS,
+    NEAR_DUPLICATE_BANDS,
+    NEAR_DUPLICATE_MAX_BUCKET_SIZE,
+    NEAR_DUPLICATE_NGRAM_SIZE,
+)
+
+
+def get_ngrams(text: str, size: int = NEAR_DUPLICATE_NGRAM_SIZE) -> frozenset[str]:
+    # Padding makes the start and end of short words count
+    padded = f" {text} "
+    return frozenset(
+        padded[i : i + size] for i in range(max(len(padded) - size + 1, 1))
+    )
+
+
+def get_jaccard_similarity(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def get_ngram_hashes(ngram: str, count: int) -> tuple[int, ...]:
+    # One digest provides all hash functions as 16 bit values (at most 32)
+    digest = hashlib.blake2b(ngram.encode("utf-8"), digest_size=count * 2).digest()
+    return tuple(memoryview(digest).cast("H"))
+
+
+def find_near_duplicates(
+    values: list[str],
+    threshold: float,
+    bands: int = NEAR_DUPLICATE_BANDS,
+    rows: int = NEAR_DUPLICATE_BAND_ROWS,
+) -> list[tuple[list[int], float]]:
+    """Returns groups of indices of values whose character n-grams have a
+    Jaccard similarity of at least threshold, together with the lowest
+    verified similarity in the group. Candidates come from MinHash
+    signatures split into bands (LSH), so values are never compared
+    pairwise. Empty values are not words and never part of a group."""
+    ngram_sets = [get_ngrams(value) for value in values]
+
+    # Most n-grams are shared by many values, so their hashes are reused
+    ngram_hashes = {}
+
+    # Band keys are bytes and buckets only become lists once two values share
+    # them, which keeps the garbage collector from scanning millions of objects
+    first_members = [{} for _ in range(bands)]
+    buckets = defaultdict(list)
+    band_size = rows * 2
+    for index, ngrams in enumerate(ngram_sets):
+        if not values[index]:
+            continue
+
+        hash_rows = []
+        for ngram in ngrams:
+            if ngram not in ngram_hashes:
+                ngram_hashes[ngram] = get_ngram_hashes(ngram, bands * rows)
+            hash_rows.append(ngram_hashes[ngram])
+
+        # The MinHash signature is the minimum of every hash function
+        signature = array("H", map(min, zip(*hash_rows))).tobytes()
+        for band in range(bands):
+            band_key = signature[band * band_size : (band + 1) * band_size]
+            first_member = first_members[band].setdefault(band_key, index)
+            if first_member != index:
+                bucket = buckets[band, band_key]
+                if not bucket:
+                    bucket.append(first_member)
+                bucket.append(index)
+
+    # Union-find over the verified pairs
+    parents = list(range(len(values)))
+
+    def find(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    checked = set()
+    similarities = {}
+    for members in buckets.values():
+        # Huge buckets only hold very common n-grams, e.g. of one-letter words
+        if len(members) > NEAR_DUPLICATE_MAX_BUCKET_SIZE:
+            continue
+
+        # The Jaccard similarity is at most the ratio of the set sizes, so
+        # comparisons stop once the next set is too large
+        members = sorted(members, key=lambda index: len(ngram_sets[index]))
+        for i, first in enumerate(members):
+            max_size = len(ngram_sets[first]) / threshold
+            for second in members[i + 1 :]:
+                if len(ngram_sets[second]) > max_size:
+                    break
+
+                pair = (first, second) if first < second else (second, first)
+                if pair in checked:
+                    continue
+                checked.add(pair)
+
+                similarity = get_jaccard_similarity(
+                    ngram_sets[first], ngram_sets[second]
+                )
+                if similarity >= threshold:
+                    root_first, root_second = find(first), find(second)
+                    parents[max(root_first, root_second)] = min(root_first, root_second)
+                    similarities[first] = min(similarities.get(first, 1), similarity)
+                    similarities[second] = min(similarities.get(second, 1), similarity)
+
+    groups = defaultdict(list)
+    for index in similarities:
+        groups[find(index)].append(index)
+
+    return sorted(
+        (
+            (sorted(members), min(similarities[index] for index in members))
+            for members in groups.values()
+        ),
+        key=lambda group: group[0][0],
+    )
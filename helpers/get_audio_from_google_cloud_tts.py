@@ -1,24 +1,205 @@
-import re
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, TypeVar
+from xml.sax.saxutils import escape
 
-from google.cloud import texttospeech
-from rich.progress import track
+from google.api_core import exceptions as google_exceptions
+from google.cloud import texttospeech, texttospeech_v1beta1
+from rich.progress import Progress
 
-from constants import AI_VOICE_MAP, BCP_47_MAP, Language
+from constants import (
+    AI_VOICE_MAP,
+    BCP_47_MAP,
+    DEFAULT_TTS_BATCH_SIZE,
+    DEFAULT_TTS_WORKERS,
+    TTS_BATCH_BREAK_SECONDS,
+    TTS_BATCH_PADDING_SECONDS,
+    TTS_MAX_RETRIES,
+    TTS_MAX_SSML_BYTES,
+    TTS_QUOTA,
+    TTS_RETRY_BASE_DELAY,
+    Language,
+)
+from helpers.audio_store import (
+    get_audio_hash,
+    get_audio_store_dir,
+    get_audio_store_path,
+    link_audio_file,
+    read_audio_manifest,
+    write_audio_manifest,
+)
+from helpers.clean_word import clean_word
+from helpers.quota import acquire_quota
+from helpers.split_mp3 import cut_mp3_frames, get_mp3_frames
+from helpers.write_file_atomically import write_file_atomically
 from log import logger
 
+T = TypeVar("T")
 
-def clean_word(text: str) -> str:
-    # Remove content in parentheses
-    text = re.sub(r"\s*\([^)]*\)", "", text)
-    # Clean up any extra whitespace
-    text = " ".join(text.split())
-    return text.strip()
+# Errors that are worth retrying (quota, overload and transient server errors)
+RETRYABLE_TTS_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.GatewayTimeout,
+)
+
+
+def call_with_retry(
+    request: Callable[[], T], description: str, max_retries: int = TTS_MAX_RETRIES
+) -> T:
+    for attempt in range(max_retries + 1):
+        try:
+            # Every attempt counts against the per-minute quota
+            acquire_quota(TTS_QUOTA)
+            return request()
+        except RETRYABLE_TTS_ERRORS as e:
+            if attempt == max_retries:
+                raise
+
+            # Exponential backoff with jitter
+            delay = TTS_RETRY_BASE_DELAY * 2**attempt * random.uniform(0.5, 1.5)
+            logger.warning(
+                f"TTS request for {description} failed ({e}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+
+
+def synthesize_speech_with_retry(
+    client: texttospeech.TextToSpeechClient,
+    text: str,
+    voice: texttospeech.VoiceSelectionParams,
+    audio_config: texttospeech.AudioConfig,
+    max_retries: int = TTS_MAX_RETRIES,
+) -> bytes:
+    # Set the text input to be synthesized
+    synthesis_input = texttospeech.SynthesisInput(text=text)
+
+    response = call_with_retry(
+        lambda: client.synthesize_speech(
+            input=synthesis_input, voice=voice, audio_config=audio_config
+        ),
+        description=f"'{text}'",
+        max_retries=max_retries,
+    )
+    return response.audio_content
+
+
+def get_batch_ssml(texts: list[str]) -> str:
+    # Every word is preceded by a mark and followed by a pause to cut at
+    parts = [
+        f'<mark name="w{i}"/>{escape(text)}<break time="{int(TTS_BATCH_BREAK_SECONDS * 1000)}ms"/>'
+        for i, text in enumerate(texts)
+    ]
+    return f'<speak>{"".join(parts)}<mark name="w{len(texts)}"/></speak>'
+
+
+def get_text_batches(
+    items: list[tuple[str, str]], batch_size: int
+) -> list[list[tuple[str, str]]]:
+    # Batches are limited by the number of words and the size of the SSML
+    batches = []
+    batch = []
+    ssml_size = 0
+    for item in items:
+        item_ssml_size = len(get_batch_ssml([item[1]]).encode("utf-8"))
+        if batch and (
+            len(batch) >= batch_size or ssml_size + item_ssml_size > TTS_MAX_SSML_BYTES
+        ):
+            batches.append(batch)
+            batch = []
+            ssml_size = 0
+        batch.append(item)
+        ssml_size += item_ssml_size
+
+    if batch:
+        batches.append(batch)
+
+    return batches
+
+
+def split_batch_audio(
+    audio_content: bytes, timepoints: list, count: int
+) -> list[bytes | None]:
+    """Cuts the audio of a batch request into one MP3 per word at the marks.
+    Words that cannot be cut cleanly are None."""
+    try:
+        frames = get_mp3_frames(audio_content)
+    except ValueError as e:
+        logger.warning(f"Could not split batch audio: {e}")
+        return [None] * count
+
+    mark_times = {
+        timepoint.mark_name: timepoint.time_seconds for timepoint in timepoints
+    }
+
+    segments = []
+    for i in range(count):
+        start_time = mark_times.get(f"w{i}")
+        end_time = mark_times.get(f"w{i + 1}")
+        if start_time is None or end_time is None or end_time <= start_time:
+            segments.append(None)
+            continue
+
+        # The word ends before the pause that precedes the next mark
+        segment = cut_mp3_frames(
+            frames,
+            max(start_time - TTS_BATCH_PADDING_SECONDS, 0),
+            end_time - TTS_BATCH_BREAK_SECONDS + TTS_BATCH_PADDING_SECONDS,
+        )
+        segments.append(segment or None)
+
+    return segments
+
+
+def synthesize_batch_with_retry(
+    batch_client: texttospeech_v1beta1.TextToSpeechClient,
+    texts: list[str],
+    voice_name: str,
+    language_code: str,
+    max_retries: int = TTS_MAX_RETRIES,
+) -> list[bytes | None]:
+    # Timepoints for SSML marks are only available in the v1beta1 API
+    request = texttospeech_v1beta1.SynthesizeSpeechRequest(
+        input=texttospeech_v1beta1.SynthesisInput(ssml=get_batch_ssml(texts)),
+        voice=texttospeech_v1beta1.VoiceSelectionParams(
+            name=voice_name,
+            language_code=language_code,
+        ),
+        audio_config=texttospeech_v1beta1.AudioConfig(
+            audio_encoding=texttospeech_v1beta1.AudioEncoding.MP3
+        ),
+        enable_time_pointing=[
+            texttospeech_v1beta1.SynthesizeSpeechRequest.TimepointType.SSML_MARK
+        ],
+    )
+
+    response = call_with_retry(
+        lambda: batch_client.synthesize_speech(request=request),
+        description=f"a batch of {len(texts)} words",
+        max_retries=max_retries,
+    )
+    return split_batch_audio(response.audio_content, response.timepoints, len(texts))
 
 
 def get_audio_from_google_cloud_tts(
-    word_objects: list[dict], language: Language, output_dir: str
-) -> None:
+    word_objects: list[dict],
+    language: Language,
+    output_dir: str,
+    workers: int = DEFAULT_TTS_WORKERS,
+    client: texttospeech.TextToSpeechClient | None = None,
+    max_retries: int = TTS_MAX_RETRIES,
+    batch_size: int = DEFAULT_TTS_BATCH_SIZE,
+    batch_client: texttospeech_v1beta1.TextToSpeechClient | None = None,
+) -> dict[str, str]:
+    """Generates missing audio files and returns the error for each key that
+    could not be generated. With a batch size above 1, several words are
+    synthesized per request and cut apart at SSML marks."""
     # Create audio directory if it doesn't exist
     audio_path = Path(output_dir)
     audio_path.mkdir(parents=True, exist_ok=True)
@@ -27,38 +208,48 @@ def get_audio_from_google_cloud_tts(
     voice_name = AI_VOICE_MAP.get(language)
     if not voice_name:
         logger.error(f"No voice mapping found for language: {language.value}")
-        return
+        return {}
 
     # Get the BCP-47 language code
     language_code = BCP_47_MAP.get(language)
     if not language_code:
         logger.error(f"No BCP-47 code found for language: {language.value}")
-        return
+        return {}
 
-    # Instantiate a client
-    client = texttospeech.TextToSpeechClient()
+    # Build the voice request with the configured voice name
+    voice = texttospeech.VoiceSelectionParams(
+        name=voice_name,
+        language_code=language_code,
+    )
 
     # Configure audio output
     audio_config = texttospeech.AudioConfig(
         audio_encoding=texttospeech.AudioEncoding.MP3
     )
 
-    for word_object in track(
-        word_objects,
-        description=f"Generating audio from Google Cloud TTS ({language.value})...",
-    ):
+    # Only set options are hashed, so library upgrades do not change the hashes
+    audio_config_description = {
+        option: value
+        for option, value in texttospeech.AudioConfig.to_dict(
+            audio_config, use_integers_for_enums=False
+        ).items()
+        if value
+    }
+
+    # Audio is stored once per hash and linked to <key>.mp3 for every key using it
+    store_dir = get_audio_store_dir(output_dir)
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_audio_manifest(output_dir)
+
+    # Collect the audio that still needs to be synthesized
+    pending = {}
+    reused_count = 0
+    for word_object in word_objects:
         key = word_object.get("key")
         if not key:
             logger.warning(f"Word object missing 'key' field: {word_object}")
             continue
 
-        # Check if audio already exists
-        audio_file_path = audio_path / f"{key}.mp3"
-
-        if audio_file_path.exists():
-            logger.info(f"Audio for '{key}' already exists, skipping")
-            continue
-
         # Get the word text in the target language
         text = word_object.get(language.value)
         if not text:
@@ -75,26 +266,125 @@ def get_audio_from_google_cloud_tts(
             )
             continue
 
-        try:
-            # Set the text input to be synthesized
-            synthesis_input = texttospeech.SynthesisInput(text=clean_text)
+        audio_hash = get_audio_hash(
+            voice_name, language_code, clean_text, audio_config_description
+        )
+        audio_file_path = audio_path / f"{key}.mp3"
+        store_path = get_audio_store_path(store_dir, audio_hash)
 
-            # Build the voice request with the configured voice name
-            voice = texttospeech.VoiceSelectionParams(
-                name=voice_name,
-                language_code=language_code,
-            )
+        # Check if audio already exists for the current text
+        if audio_file_path.exists() and manifest.get(key) == audio_hash:
+            continue
 
-            # Perform the text-to-speech request
-            response = client.synthesize_speech(
-                input=synthesis_input, voice=voice, audio_config=audio_config
+        # Audio generated before the store existed is assumed to be up to date
+        # for its key. It may be for an older text, so it is not added to the
+        # store where other keys with the current text would reuse it.
+        if audio_file_path.exists() and key not in manifest:
+            manifest[key] = audio_hash
+            continue
+
+        # Identical audio was already synthesized for another key or an old text
+        if os.path.exists(store_path):
+            link_audio_file(store_path, str(audio_file_path))
+            manifest[key] = audio_hash
+            reused_count += 1
+            continue
+
+        pending.setdefault(audio_hash, (clean_text, []))[1].append(key)
+
+    if reused_count:
+        logger.info(f"Reused stored audio for {reused_count} key(s)")
+
+    failures = {}
+    if pending:
+        # Instantiate clients, the gRPC clients are safe to share between threads
+        if client is None:
+            client = texttospeech.TextToSpeechClient()
+        if batch_size > 1 and batch_client is None:
+            batch_client = texttospeech_v1beta1.TextToSpeechClient()
+
+        def generate_audio_batch(
+            batch: list[tuple[str, str]],
+        ) -> dict[str, Exception | None]:
+            segments = [None] * len(batch)
+            if len(batch) > 1:
+                try:
+                    segments = synthesize_batch_with_retry(
+                        batch_client=batch_client,
+                        texts=[clean_text for _, clean_text in batch],
+                        voice_name=voice_name,
+                        language_code=language_code,
+                        max_retries=max_retries,
+                    )
+                except Exception as e:
+                    logger.warning(f"Batch request failed, using single requests: {e}")
+
+            # Words that could not be cut out of the batch are requested one by one
+            results = {}
+            for (audio_hash, clean_text), audio_content in zip(batch, segments):
+                try:
+                    if audio_content is None:
+                        audio_content = synthesize_speech_with_retry(
+                            client=client,
+                            text=clean_text,
+                            voice=voice,
+                            audio_config=audio_config,
+                            max_retries=max_retries,
+                        )
+                    write_file_atomically(
+                        get_audio_store_path(store_dir, audio_hash), audio_content
+                    )
+                    results[audio_hash] = None
+                except Exception as e:
+                    results[audio_hash] = e
+            return results
+
+        batches = get_text_batches(
+            [
+                (audio_hash, clean_text)
+                for audio_hash, (clean_text, _) in pending.items()
+            ],
+            batch_size=batch_size,
+        )
+
+        with (
+            Progress() as progress,
+            ThreadPoolExecutor(max_workers=max(workers, 1)) as executor,
+        ):
+            task = progress.add_task(
+                f"Generating audio from Google Cloud TTS ({language.value})...",
+                total=len(pending),
             )
+            futures = [
+                executor.submit(generate_audio_batch, batch) for batch in batches
+            ]
+
+            for future in as_completed(futures):
+                for audio_hash, error in future.result().items():
+                    keys = pending[audio_hash][1]
+                    if error is None:
+                        store_path = get_audio_store_path(store_dir, audio_hash)
+                        for key in keys:
+                            link_audio_file(store_path, str(audio_path / f"{key}.mp3"))
+                            manifest[key] = audio_hash
+                            logger.info(f"Audio for '{key}' generated successfully")
+                    else:
+                        for key in keys:
+                            failures[key] = str(error)
+                            logger.error(
+                                f"Failed to generate audio for '{key}': {error}"
+                            )
+                    progress.advance(task)
+
+        logger.info(
+            f"Generated {len(pending)} audio file(s) with {len(failures)} failed key(s)"
+        )
 
-            # Save the audio content to file
-            with open(audio_file_path, "wb") as out:
-                out.write(response.audio_content)
+    write_audio_manifest(output_dir, manifest)
 
-            logger.info(f"Audio for '{key}' generated successfully")
+    if failures:
+        logger.error(
+            f"Audio generation failed for {len(failures)} key(s): {', '.join(sorted(failures))}"
+        )
 
-        except Exception as e:
-            logger.error(f"Failed to generate audio for '{key}': {e}")
+    return failures
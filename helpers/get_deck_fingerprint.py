@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+
+import genanki
+
+from helpers.write_file_atomically import write_file_atomically
+
+# Bump when the way decks are built changes in a way the inputs don't show
+DECK_FINGERPRINT_VERSION = 1
+
+
+def get_deck_fingerprint(deck: genanki.Deck, package: genanki.Package) -> str:
+    """Hashes everything that ends up in the deck file: the deck, the note
+    models (including templates and css), the note fields (word list and
+    locale strings) and the size and modification time of the media files."""
+    digest = hashlib.sha256()
+
+    def update(value: object) -> None:
+        digest.update(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+        digest.update(b"\0")
+
+    update(DECK_FINGERPRINT_VERSION)
+    update([deck.deck_id, deck.name, deck.description])
+
+    models = {note.model.model_id: note.model for note in deck.notes}
+    for model_id, model in sorted(models.items()):
+        update([model_id, model.name, model.fields, model.templates, model.css])
+
+    for note in deck.notes:
+        update([note.model.model_id, note.fields, note.tags, note.guid])
+
+    for media_file in package.media_files:
+        stat = os.stat(media_file)
+        update([os.path.basename(media_file), stat.st_size, stat.st_mtime_ns])
+
+    return digest.hexdigest()
+
+
+def get_deck_fingerprint_path(output_path: str) -> str:
+    # Hidden, so the fingerprint is not synced along with the deck
+    directory, filename = os.path.split(output_path)
+    return os.path.join(directory, f".{filename}.fingerprint")
+
+
+def get_legacy_deck_fingerprint_path(output_path: str) -> str:
+    return f"{output_path}.fingerprint"
+
+
+def deck_is_up_to_date(output_path: str, fingerprint: str) -> bool:
+    if not os.path.exists(output_path):
+        return False
+
+    for fingerprint_path in (
+        get_deck_fingerprint_path(output_path),
+        get_legacy_deck_fingerprint_path(output_path),
+    ):
+        if os.path.exists(fingerprint_path):
+            with open(fingerprint_path, "r", encoding="utf-8") as f:
+                return f.read().strip() == fingerprint
+
+    return False
+
+
+def write_deck_fingerprint(output_path: str, fingerprint: str) -> None:
+    write_file_atomically(get_deck_fingerprint_path(output_path), fingerprint)
+
+    # Fingerprints used to be stored next to the deck and synced with it
+    legacy_path = get_legacy_deck_fingerprint_path(output_path)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
@@ -0,0 +1,36 @@
+import json
+import os
+from importlib.metadata import version
+
+from wordfreq import top_n_list
+
+from constants import DEFAULT_CACHE_DIR, WORDFREQ_LANG_MAP, Language
+from helpers.write_file_atomically import write_file_atomically
+
+
+def get_frequency_list_cache_path(
+    cache_dir: str, wordfreq_lang: str, length: int
+) -> str:
+    # A new wordfreq release may come with different frequency data
+    return os.path.join(
+        cache_dir, "wordfreq", version("wordfreq"), f"{wordfreq_lang}-{length}.json"
+    )
+
+
+def get_frequency_list(
+    language: Language, length: int, cache_dir: str | None = DEFAULT_CACHE_DIR
+) -> list[str]:
+    # wordfreq does not make a difference between european and brazilian portuguese
+    wordfreq_lang = WORDFREQ_LANG_MAP.get(language, language.value)
+
+    if not cache_dir:
+        return top_n_list(wordfreq_lang, length)
+
+    cache_path = get_frequency_list_cache_path(cache_dir, wordfreq_lang, length)
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    frequency_list = top_n_list(wordfreq_lang, length)
+    write_file_atomically(cache_path, json.dumps(frequency_list, ensure_ascii=False))
+    return frequency_list
@@ -2,50 +2,92 @@ import os
 from pathlib import Path
 
 import requests
-from ratelimit import limits, sleep_and_retry
-from slugify import slugify
 
-from constants import ONE_HOUR, UNSPLASH_LIMIT_PER_HOUR
+from constants import (
+    DEFAULT_CACHE_DIR,
+    UNSPLASH_API_URL,
+    UNSPLASH_METADATA_MAX_AGE,
+    UNSPLASH_QUOTA,
+)
+from helpers.http_client import get_json_cached, get_with_retry
+from helpers.media_index import add_image_attribution, get_image_slug
+from helpers.quota import acquire_quota, update_quota_remaining
 from helpers.save_unsplash_image import save_unsplash_image
 from log import logger
 
 
-@sleep_and_retry
-@limits(calls=UNSPLASH_LIMIT_PER_HOUR, period=ONE_HOUR)
-def get_image_data_by_id(unsplash_id: str) -> dict | None:
+def get_unsplash_api_url() -> str:
+    # Can point to another server, e.g. a fake one for tests
+    return os.getenv("UNSPLASH_API_URL", UNSPLASH_API_URL).rstrip("/")
+
+
+def get_unsplash_headers() -> dict:
     # Get the access key from environment
     access_key = os.getenv("UNSPLASH_ACCESS_KEY")
     if not access_key:
-        logger.error("UNSPLASH_ACCESS_KEY environment variable not set")
-        return None
+        raise requests.exceptions.RequestException(
+            "UNSPLASH_ACCESS_KEY environment variable not set"
+        )
+
+    return {"Authorization": f"Client-ID {access_key}"}
+
+
+def take_unsplash_quota() -> None:
+    # The hourly limit is shared with other processes and restarts
+    acquire_quota(UNSPLASH_QUOTA)
+
 
-    headers = {"Authorization": f"Client-ID {access_key}"}
+def update_unsplash_quota(response: requests.Response) -> None:
+    remaining = response.headers.get("X-Ratelimit-Remaining", "")
+    if remaining.isdigit():
+        update_quota_remaining(UNSPLASH_QUOTA, int(remaining))
 
-    response = requests.get(
-        f"https://api.unsplash.com/photos/{unsplash_id}",
-        headers=headers,
-        timeout=30,
+
+def get_image_data_by_id(
+    unsplash_id: str, cache_dir: str = DEFAULT_CACHE_DIR
+) -> dict | None:
+    # Photo metadata is cached by ID, so picking the same photo again is free
+    return get_json_cached(
+        f"{get_unsplash_api_url()}/photos/{unsplash_id}",
+        cache_path=os.path.join(cache_dir, "unsplash", "photos", f"{unsplash_id}.json"),
+        max_age=UNSPLASH_METADATA_MAX_AGE,
+        headers=get_unsplash_headers(),
+        before_request=take_unsplash_quota,
+        on_response=update_unsplash_quota,
+    )
+
+
+def search_unsplash_images(query: str, per_page: int) -> list[dict]:
+    response = get_with_retry(
+        f"{get_unsplash_api_url()}/search/photos",
+        params={"query": query, "per_page": per_page},
+        headers=get_unsplash_headers(),
+        before_request=take_unsplash_quota,
     )
+    update_unsplash_quota(response)
     response.raise_for_status()
 
-    return response.json()
+    return response.json().get("results", [])
 
 
 def get_image_from_unsplash(
     word_object: dict,
     unsplash_id: str,
     output_dir: str,
-) -> None:
+    image_data: dict | None = None,
+) -> bool:
+    """Saves the image and its attribution and returns whether it succeeded.
+    Search results already contain the image data, which saves an API call."""
     # Extract key and en from word_object
     key = word_object.get("key")
     en = word_object.get("en", "")
 
     if not key:
         logger.error(f"Word object missing 'key' field: {word_object}")
-        return
+        return False
 
     # Slugify the English word for the filename
-    en_slug = slugify(en) if en else "unknown"
+    en_slug = get_image_slug(en)
 
     # Create images directory if it doesn't exist
     images_path = Path(output_dir)
@@ -53,24 +95,29 @@ def get_image_from_unsplash(
 
     # Set up file paths with format: {en_slug}.jpg
     image_file_path = images_path / f"{en_slug}.jpg"
-    metadata_file_path = images_path / f"{en_slug}.json"
 
     try:
         # Fetch image data from Unsplash
-        image_data = get_image_data_by_id(unsplash_id)
+        if image_data is None:
+            image_data = get_image_data_by_id(unsplash_id)
         if not image_data:
             logger.error(f"Failed to fetch image with ID '{unsplash_id}'")
-            return
+            return False
 
         # Save the image
-        save_unsplash_image(
+        metadata = save_unsplash_image(
             image_data=image_data,
             image_file_path=str(image_file_path),
-            metadata_file_path=str(metadata_file_path),
             key=key,
         )
 
+        # Attributions are kept in one manifest instead of a JSON file per image
+        add_image_attribution(output_dir, en_slug, metadata)
+        return True
+
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to fetch image for '{key}': {e}")
     except Exception as e:
         logger.error(f"Failed to save image for '{key}': {e}")
+
+    return False
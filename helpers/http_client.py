@@ -0,0 +1,171 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import (
+    HTTP_MAX_RETRIES,
+    HTTP_POOL_SIZE,
+    HTTP_RETRY_BASE_DELAY,
+    HTTP_TIMEOUT,
+)
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+session = None
+session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Returns the shared session, which keeps connections alive between
+    requests. Other transports can be mounted on it, e.g. for tests."""
+    global session
+    with session_lock:
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+    return session
+
+
+def get_retry_delay(response: requests.Response | None, attempt: int) -> float:
+    retry_after = (
+        response.headers.get("Retry-After", "") if response is not None else ""
+    )
+    if retry_after.isdigit():
+        return float(retry_after)
+
+    # Exponential backoff with jitter
+    return HTTP_RETRY_BASE_DELAY * 2**attempt * random.uniform(0.5, 1.5)
+
+
+def get_with_retry(
+    url: str,
+    params: dict | None = None,
+    headers: dict | None = None,
+    stream: bool = False,
+    max_retries: int = HTTP_MAX_RETRIES,
+    before_request: Callable[[], None] | None = None,
+) -> requests.Response:
+    """Sends a GET request and retries connection errors and retryable status
+    codes. before_request is called before every attempt, e.g. to take from a
+    quota. The last response is returned even if its status is an error."""
+    for attempt in range(max_retries + 1):
+        if before_request:
+            before_request()
+
+        response = None
+        try:
+            response = get_http_session().get(
+                url, params=params, headers=headers, stream=stream, timeout=HTTP_TIMEOUT
+            )
+            if (
+                response.status_code not in RETRYABLE_STATUS_CODES
+                or attempt == max_retries
+            ):
+                return response
+            error = f"HTTP {response.status_code}"
+            response.close()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            error = str(e)
+
+        delay = get_retry_delay(response, attempt)
+        logger.warning(f"Request to {url} failed ({error}), retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+def read_cached_response(cache_path: str) -> dict | None:
+    if not os.path.exists(cache_path):
+        return None
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return None
+
+
+def get_json_cached(
+    url: str,
+    cache_path: str,
+    max_age: float,
+    params: dict | None = None,
+    headers: dict | None = None,
+    before_request: Callable[[], None] | None = None,
+    on_response: Callable[[requests.Response], None] | None = None,
+) -> dict:
+    """Returns the JSON body of url. A cached body is used as-is for max_age
+    seconds and then revalidated with its ETag."""
+    cached = read_cached_response(cache_path)
+    if cached and time.time() - cached["fetched_at"] < max_age:
+        return cached["data"]
+
+    request_headers = dict(headers or {})
+    if cached and cached.get("etag"):
+        request_headers["If-None-Match"] = cached["etag"]
+
+    response = get_with_retry(
+        url, params=params, headers=request_headers, before_request=before_request
+    )
+    if on_response:
+        on_response(response)
+
+    if cached and response.status_code == 304:
+        data = cached["data"]
+        etag = response.headers.get("ETag", cached.get("etag"))
+    else:
+        response.raise_for_status()
+        data = response.json()
+        etag = response.headers.get("ETag")
+
+    write_file_atomically(
+        cache_path,
+        json.dumps(
+            {"etag": etag, "fetched_at": time.time(), "data": data},
+            ensure_ascii=False,
+        ),
+    )
+    return data
+
+
+def download_file_cached(
+    url: str,
+    cache_path: str,
+    before_request: Callable[[], None] | None = None,
+) -> str:
+    """Downloads url to cache_path unless it is there already and returns the
+    path. Only meant for URLs whose body never changes."""
+    if os.path.exists(cache_path):
+        return cache_path
+
+    cache_dir = os.path.dirname(cache_path)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with get_with_retry(url, stream=True, before_request=before_request) as response:
+        response.raise_for_status()
+
+        # Stream into a temporary file next to the final path and move it into place
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for block in response.iter_content(chunk_size=64 * 1024):
+                    f.write(block)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    return cache_path
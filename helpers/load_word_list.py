@@ -1,39 +1,118 @@
 import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from typing import Iterator
 
 import yaml
 
-from constants import Language
-from helpers.validate_word_objects import validate_word_objects
+from constants import DEFAULT_CACHE_DIR, DEFAULT_LOAD_WORKERS, Language
+from helpers.validate_word_objects import (
+    get_word_object_schema_fingerprint,
+    validate_word_objects,
+)
+from helpers.word_list_cache import (
+    get_cached_chunk_entry,
+    get_word_list_cache_path,
+    read_word_list_cache,
+    write_word_list_cache,
+)
+from helpers.word_list_db import get_word_list_db, iter_word_list_chunks
+from helpers.yaml_loader import SafeLoader
 from log import logger
 
 
-# Custom YAML loader that treats "on", "off", "yes", "no", "true", "false" as strings
-class SafeLoader(yaml.SafeLoader):
+class InvalidWordListError(Exception):
     pass
 
 
-# Remove boolean resolvers for on/off/yes/no/true/false
-for ch in "OoYyNnTtFf":
-    if ch in SafeLoader.yaml_implicit_resolvers:
-        SafeLoader.yaml_implicit_resolvers[ch] = [
-            (tag, regexp)
-            for tag, regexp in SafeLoader.yaml_implicit_resolvers[ch]
-            if tag != "tag:yaml.org,2002:bool"
-        ]
+def parse_chunk(content: bytes) -> object:
+    return yaml.load(content.decode("utf-8"), Loader=SafeLoader)
 
 
-def load_word_list(
+def parse_chunks(
+    contents: dict[str, bytes], workers: int = DEFAULT_LOAD_WORKERS
+) -> dict[str, object]:
+    """Parses the given chunk files and returns the parsed chunk or the raised
+    exception for each of them, in the order of the given files."""
+    results = {}
+
+    # Spawning worker processes only pays off with enough chunks to parse
+    if workers <= 1 or len(contents) <= 1:
+        for yaml_file, content in contents.items():
+            try:
+                results[yaml_file] = parse_chunk(content)
+            except Exception as e:
+                results[yaml_file] = e
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(contents))) as executor:
+        futures = {
+            yaml_file: executor.submit(parse_chunk, content)
+            for yaml_file, content in contents.items()
+        }
+        for yaml_file, future in futures.items():
+            try:
+                results[yaml_file] = future.result()
+            except Exception as e:
+                results[yaml_file] = e
+
+    return results
+
+
+def load_word_list_chunks_from_db(
+    connection: sqlite3.Connection, lists_dir: str, key_is_required: bool = True
+) -> dict[str, list[dict]] | bool:
+    chunks = dict(iter_word_list_chunks(connection, lists_dir))
+    word_count = sum(len(chunk) for chunk in chunks.values())
+    logger.info(
+        f"Loaded {word_count} words from {len(chunks)} chunk(s) ('{lists_dir}' in the word list database)"
+    )
+
+    # Rows can be updated by other tools, so they are validated on every load
+    word_objects_is_valid = True
+    start_index = 0
+    for chunk_name, chunk in chunks.items():
+        if not validate_word_objects(
+            word_objects=chunk,
+            key_is_required=key_is_required,
+            start_index=start_index,
+            source=os.path.join(lists_dir, chunk_name),
+        ):
+            word_objects_is_valid = False
+        start_index += len(chunk)
+
+    return chunks if word_objects_is_valid else False
+
+
+def load_word_list_chunks(
     language: Language,
     lists_dir: str,
     key_is_required: bool = True,
-) -> list[dict] | bool:
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+    workers: int = DEFAULT_LOAD_WORKERS,
+    use_db: bool = True,
+    connection: sqlite3.Connection | None = None,
+) -> dict[str, list[dict]] | bool:
+    """Returns the word objects of each chunk file, in file order. With
+    use_db set to False the YAML files are read even if the list was
+    imported into the word list database. A given connection, e.g. from
+    open_word_list_transaction, is used and left open."""
+    if connection:
+        return load_word_list_chunks_from_db(connection, lists_dir, key_is_required)
+
+    connection = get_word_list_db(lists_dir) if use_db else None
+    if connection:
+        with closing(connection):
+            return load_word_list_chunks_from_db(connection, lists_dir, key_is_required)
+
     if not os.path.exists(lists_dir):
         logger.error(
             f"Word list directory not found for language '{language.value}': {lists_dir}"
         )
         return False
 
-    word_objects = []
+    word_count = 0
 
     # Get all YAML files in the directory and sort them
     yaml_files = sorted([f for f in os.listdir(lists_dir) if f.endswith(".yaml")])
@@ -42,30 +121,194 @@ def load_word_list(
         logger.error(f"No YAML files found in {lists_dir}")
         return False
 
-    # Load each YAML file and combine the word objects
+    # Parsed chunks are cached per language, the YAML files stay the source of truth
+    cache_path = (
+        get_word_list_cache_path(cache_dir, language, lists_dir) if cache_dir else None
+    )
+    cached_chunks = (
+        read_word_list_cache(cache_path).get("chunks", {}) if cache_path else {}
+    )
+    cache_is_stale = set(cached_chunks) != set(yaml_files)
+
+    # Look up each YAML file in the cache and collect the ones that need parsing
+    chunks = {}
+    contents = {}
     for yaml_file in yaml_files:
         filepath = os.path.join(lists_dir, yaml_file)
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                chunk = yaml.load(f, Loader=SafeLoader)
-                if isinstance(chunk, list):
-                    word_objects.extend(chunk)
-                else:
-                    logger.warning(
-                        f"Expected list in {filepath}, got {type(chunk).__name__}"
-                    )
+            cached_entry = cached_chunks.get(yaml_file)
+            entry, content = get_cached_chunk_entry(filepath, cached_entry)
+            if entry is not cached_entry:
+                cache_is_stale = True
+            chunks[yaml_file] = entry
+            if content is not None:
+                contents[yaml_file] = content
         except Exception as e:
             logger.error(f"Failed to load {filepath}: {e}", exc_info=True)
 
+    for yaml_file, result in parse_chunks(contents, workers=workers).items():
+        if isinstance(result, Exception):
+            filepath = os.path.join(lists_dir, yaml_file)
+            logger.error(f"Failed to load {filepath}: {result}", exc_info=result)
+            del chunks[yaml_file]
+        else:
+            chunks[yaml_file]["chunk"] = result
+
+    # Count the word objects of every chunk that holds a list
+    for yaml_file, entry in chunks.items():
+        chunk = entry["chunk"]
+        if isinstance(chunk, list):
+            word_count += len(chunk)
+        else:
+            filepath = os.path.join(lists_dir, yaml_file)
+            logger.warning(f"Expected list in {filepath}, got {type(chunk).__name__}")
+
     logger.info(
-        f"Loaded {len(word_objects)} words from {len(yaml_files)} file(s) ('{lists_dir}')"
+        f"Loaded {word_count} words from {len(yaml_files)} file(s) ('{lists_dir}')"
     )
 
-    word_objects_is_valid = validate_word_objects(
-        word_objects=word_objects, key_is_required=key_is_required
-    )
+    # Only validate chunks that have not been validated against this schema before
+    schema_fingerprint = get_word_object_schema_fingerprint(key_is_required)
+    word_objects_is_valid = True
+    start_index = 0
+    for yaml_file, entry in chunks.items():
+        chunk = entry["chunk"]
+        if not isinstance(chunk, list):
+            continue
+
+        valid_for = entry.get("valid_for", ())
+        if schema_fingerprint not in valid_for:
+            if validate_word_objects(
+                word_objects=chunk,
+                key_is_required=key_is_required,
+                start_index=start_index,
+                source=os.path.join(lists_dir, yaml_file),
+            ):
+                entry["valid_for"] = (*valid_for, schema_fingerprint)
+                cache_is_stale = True
+            else:
+                word_objects_is_valid = False
+
+        start_index += len(chunk)
+
+    if cache_path and cache_is_stale:
+        write_word_list_cache(cache_path, chunks)
 
     if word_objects_is_valid:
-        return word_objects
+        return {
+            yaml_file: entry["chunk"]
+            for yaml_file, entry in chunks.items()
+            if isinstance(entry["chunk"], list)
+        }
     else:
         return False
+
+
+def load_word_list(
+    language: Language,
+    lists_dir: str,
+    key_is_required: bool = True,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+    workers: int = DEFAULT_LOAD_WORKERS,
+    connection: sqlite3.Connection | None = None,
+) -> list[dict] | bool:
+    chunks = load_word_list_chunks(
+        language,
+        lists_dir,
+        key_is_required=key_is_required,
+        cache_dir=cache_dir,
+        workers=workers,
+        connection=connection,
+    )
+    if chunks is False:
+        return False
+
+    return [word_obj for chunk in chunks.values() for word_obj in chunk]
+
+
+def iter_word_list(
+    language: Language,
+    lists_dir: str,
+    key_is_required: bool = True,
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+) -> Iterator[dict]:
+    """Yields the word objects of a list chunk by chunk, so they can be
+    written out while the rest of the list is still being loaded. Raises
+    InvalidWordListError after logging the problem if the list cannot be
+    loaded or a chunk is invalid."""
+    connection = get_word_list_db(lists_dir)
+    if connection:
+        with closing(connection):
+            start_index = 0
+            for chunk_name, chunk in iter_word_list_chunks(connection, lists_dir):
+                if not validate_word_objects(
+                    word_objects=chunk,
+                    key_is_required=key_is_required,
+                    start_index=start_index,
+                    source=os.path.join(lists_dir, chunk_name),
+                ):
+                    raise InvalidWordListError(lists_dir)
+                start_index += len(chunk)
+                yield from chunk
+        return
+
+    if not os.path.exists(lists_dir):
+        logger.error(
+            f"Word list directory not found for language '{language.value}': {lists_dir}"
+        )
+        raise InvalidWordListError(lists_dir)
+
+    yaml_files = sorted([f for f in os.listdir(lists_dir) if f.endswith(".yaml")])
+
+    if not yaml_files:
+        logger.error(f"No YAML files found in {lists_dir}")
+        raise InvalidWordListError(lists_dir)
+
+    cache_path = (
+        get_word_list_cache_path(cache_dir, language, lists_dir) if cache_dir else None
+    )
+    cached_chunks = (
+        read_word_list_cache(cache_path).get("chunks", {}) if cache_path else {}
+    )
+    cache_is_stale = set(cached_chunks) != set(yaml_files)
+
+    schema_fingerprint = get_word_object_schema_fingerprint(key_is_required)
+    chunks = {}
+    start_index = 0
+    for yaml_file in yaml_files:
+        filepath = os.path.join(lists_dir, yaml_file)
+        cached_entry = cached_chunks.get(yaml_file)
+        try:
+            entry, content = get_cached_chunk_entry(filepath, cached_entry)
+            if content is not None:
+                entry["chunk"] = parse_chunk(content)
+        except Exception as e:
+            logger.error(f"Failed to load {filepath}: {e}", exc_info=True)
+            continue
+
+        if entry is not cached_entry:
+            cache_is_stale = True
+        chunks[yaml_file] = entry
+
+        chunk = entry["chunk"]
+        if not isinstance(chunk, list):
+            logger.warning(f"Expected list in {filepath}, got {type(chunk).__name__}")
+            continue
+
+        valid_for = entry.get("valid_for", ())
+        if schema_fingerprint not in valid_for:
+            if not validate_word_objects(
+                word_objects=chunk,
+                key_is_required=key_is_required,
+                start_index=start_index,
+                source=filepath,
+            ):
+                raise InvalidWordListError(filepath)
+            entry["valid_for"] = (*valid_for, schema_fingerprint)
+            cache_is_stale = True
+
+        start_index += len(chunk)
+        yield from chunk
+
+    if cache_path and cache_is_stale:
+        write_word_list_cache(cache_path, chunks)
@@ -0,0 +1,270 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator
+
+from slugify import slugify
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from constants import (
+    DEFAULT_AUDIO_DIR,
+    DEFAULT_CACHE_DIR,
+    DEFAULT_IMAGES_DIR,
+    IMAGE_ATTRIBUTIONS_FILENAME,
+    Language,
+)
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+# Bump when the layout of the persisted index changes
+MEDIA_INDEX_VERSION = 1
+
+# Supported media file extensions in order of preference
+AUDIO_EXTENSIONS = (".mp3", ".ogg")
+IMAGE_EXTENSIONS = (".jpg", ".webp")
+
+# Images may be downloaded in background threads that share the manifest
+attributions_lock = threading.Lock()
+
+# Other processes are kept out with a lock file, hidden so it is not synced
+ATTRIBUTIONS_LOCK_FILENAME = ".attributions.lock"
+
+
+@lru_cache(maxsize=None)
+def get_image_slug(en: str) -> str:
+    # Images are named after the slugified English word
+    return slugify(en) if en else "unknown"
+
+
+def get_media_index_path(cache_dir: str, media_dir: str) -> str:
+    media_dir_digest = hashlib.sha1(
+        os.path.abspath(media_dir).encode("utf-8")
+    ).hexdigest()[:10]
+    return os.path.join(cache_dir, "media", f"{media_dir_digest}.json")
+
+
+def get_mtime_ns(path: str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def scan_directory(directory: str) -> list[str]:
+    if not os.path.isdir(directory):
+        return []
+
+    with os.scandir(directory) as entries:
+        return sorted(entry.name for entry in entries if entry.is_file())
+
+
+def read_image_attributions(images_dir: str) -> dict[str, dict]:
+    attributions_path = os.path.join(images_dir, IMAGE_ATTRIBUTIONS_FILENAME)
+    if not os.path.exists(attributions_path):
+        return {}
+
+    try:
+        with open(attributions_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError) as e:
+        logger.warning(f"Could not read {attributions_path}: {e}")
+        return {}
+
+
+def write_image_attributions(images_dir: str, attributions: dict[str, dict]) -> None:
+    write_file_atomically(
+        os.path.join(images_dir, IMAGE_ATTRIBUTIONS_FILENAME),
+        json.dumps(attributions, ensure_ascii=False, indent=2, sort_keys=True),
+    )
+
+
+@contextmanager
+def lock_image_attributions(images_dir: str) -> Iterator[None]:
+    os.makedirs(images_dir, exist_ok=True)
+    lock_path = os.path.join(images_dir, ATTRIBUTIONS_LOCK_FILENAME)
+    with attributions_lock, open(lock_path, "a") as lock_file:
+        # The lock is released when the file is closed
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+
+def add_image_attribution(images_dir: str, en_slug: str, attribution: dict) -> None:
+    with lock_image_attributions(images_dir):
+        attributions = read_image_attributions(images_dir)
+        attributions[en_slug] = attribution
+        write_image_attributions(images_dir, attributions)
+
+
+def merge_image_attributions(
+    attributions_path: str, content: bytes, prefer_content: bool
+) -> None:
+    """Merges another copy of the attribution manifest, e.g. from the bucket,
+    into the local one by slug. With prefer_content, its entries win over
+    local ones for the same slug."""
+    try:
+        other_attributions = json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.warning(
+            f"Could not merge image attributions into {attributions_path}: {e}"
+        )
+        return
+
+    images_dir = os.path.dirname(attributions_path)
+    with lock_image_attributions(images_dir):
+        attributions = read_image_attributions(images_dir)
+        if prefer_content:
+            merged_attributions = {**attributions, **other_attributions}
+        else:
+            merged_attributions = {**other_attributions, **attributions}
+        if merged_attributions != attributions:
+            write_image_attributions(images_dir, merged_attributions)
+
+
+def consolidate_image_attributions(
+    images_dir: str, image_files: list[str]
+) -> dict[str, dict]:
+    """Returns the attribution manifest after moving in per-image JSON files
+    that are not part of it yet. Legacy files are removed once the manifest
+    has their data, so the two cannot drift apart."""
+    legacy_files = [
+        filename
+        for filename in image_files
+        if filename.endswith(".json") and filename != IMAGE_ATTRIBUTIONS_FILENAME
+    ]
+    if not legacy_files:
+        return read_image_attributions(images_dir)
+
+    with lock_image_attributions(images_dir):
+        attributions = read_image_attributions(images_dir)
+
+        added_count = 0
+        consolidated_files = []
+        for filename in legacy_files:
+            en_slug = os.path.splitext(filename)[0]
+            if en_slug not in attributions:
+                try:
+                    with open(
+                        os.path.join(images_dir, filename), "r", encoding="utf-8"
+                    ) as f:
+                        attributions[en_slug] = json.load(f)
+                    added_count += 1
+                except (json.JSONDecodeError, IOError) as e:
+                    logger.warning(f"Could not read image metadata {filename}: {e}")
+                    continue
+            consolidated_files.append(filename)
+
+        if added_count:
+            write_image_attributions(images_dir, attributions)
+            logger.info(f"Moved {added_count} image attribution(s) into the manifest")
+
+        for filename in consolidated_files:
+            os.remove(os.path.join(images_dir, filename))
+
+    return attributions
+
+
+def load_media_index(
+    media_dir: str,
+    languages: list[Language],
+    cache_dir: str | None = DEFAULT_CACHE_DIR,
+    rebuild: bool = False,
+) -> dict:
+    """Returns the files in media/images and media/audio/<lang> and the image
+    attributions. The index is persisted in the cache and a directory is only
+    scanned again when its modification time changed."""
+    index_path = get_media_index_path(cache_dir, media_dir) if cache_dir else None
+
+    persisted = {}
+    if index_path and not rebuild and os.path.exists(index_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                persisted = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            persisted = {}
+        if persisted.get("version") != MEDIA_INDEX_VERSION:
+            persisted = {}
+
+    directories = persisted.get("directories", {})
+    index_is_stale = False
+
+    def get_files(directory: str) -> list[str]:
+        nonlocal index_is_stale
+        mtime_ns = get_mtime_ns(directory)
+        entry = directories.get(directory)
+        if entry and entry["mtime_ns"] == mtime_ns:
+            return entry["files"]
+
+        files = scan_directory(directory)
+        directories[directory] = {"mtime_ns": mtime_ns, "files": files}
+        index_is_stale = True
+        return files
+
+    images_dir = os.path.join(media_dir, DEFAULT_IMAGES_DIR)
+    image_files = get_files(images_dir)
+
+    attributions_path = os.path.join(images_dir, IMAGE_ATTRIBUTIONS_FILENAME)
+    attributions = persisted.get("attributions", {})
+    if index_is_stale or persisted.get("attributions_mtime_ns") != get_mtime_ns(
+        attributions_path
+    ):
+        attributions = consolidate_image_attributions(images_dir, image_files)
+        # Writing the manifest changes the directory, so scan it again
+        image_files = get_files(images_dir)
+        index_is_stale = True
+
+    audio_files = {
+        language.value: get_files(
+            os.path.join(media_dir, DEFAULT_AUDIO_DIR, language.value)
+        )
+        for language in languages
+    }
+
+    if index_path and index_is_stale:
+        write_file_atomically(
+            index_path,
+            json.dumps(
+                {
+                    "version": MEDIA_INDEX_VERSION,
+                    "directories": directories,
+                    "attributions": attributions,
+                    "attributions_mtime_ns": get_mtime_ns(attributions_path),
+                },
+                ensure_ascii=False,
+            ),
+        )
+
+    return {
+        "media_dir": media_dir,
+        "images": set(image_files),
+        "audio": {language: set(files) for language, files in audio_files.items()},
+        "attributions": attributions,
+    }
+
+
+def get_audio_file(media_index: dict, language: Language, key: str) -> str | None:
+    # Optimized media may use Opus instead of MP3
+    audio_files = media_index["audio"].get(language.value, ())
+    for extension in AUDIO_EXTENSIONS:
+        filename = f"{key}{extension}"
+        if filename in audio_files:
+            return os.path.join(
+                media_index["media_dir"], DEFAULT_AUDIO_DIR, language.value, filename
+            )
+    return None
+
+
+def get_image_file(media_index: dict, en_slug: str) -> str | None:
+    # Optimized media may use WebP instead of JPEG
+    for extension in IMAGE_EXTENSIONS:
+        filename = f"{en_slug}{extension}"
+        if filename in media_index["images"]:
+            return os.path.join(media_index["media_dir"], DEFAULT_IMAGES_DIR, filename)
+    return None
@@ -0,0 +1,139 @@
+import difflib
+import os
+import sqlite3
+from contextlib import closing
+
+from constants import Language
+from helpers.save_word_objects_in_chunks import (
+    dump_chunk,
+    name_chunks,
+    split_into_chunks,
+)
+from helpers.word_list_db import (
+    get_word_list_db,
+    uses_word_list_db,
+    write_word_list_chunks,
+)
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+
+def build_key_index(chunks: dict[str, list[dict]]) -> dict[str, tuple[str, int]]:
+    # Maps each key to the chunk file and the position within that chunk
+    key_index = {}
+    for yaml_file, chunk in chunks.items():
+        for offset, word_obj in enumerate(chunk):
+            key = word_obj.get("key")
+            if key:
+                key_index[key] = (yaml_file, offset)
+    return key_index
+
+
+def plan_merge(
+    chunks: dict[str, list[dict]],
+    dump_word_objects: list[dict],
+    language: Language,
+    append_orphans: bool = False,
+) -> dict:
+    """Compares the dump with the list by key. Returns the keys that are
+    changed, unchanged or only in the dump (orphaned, or added with
+    append_orphans) and the chunks with their merged content. Added word
+    objects go after the last chunk, in new chunks where it grows too big."""
+    key_index = build_key_index(chunks)
+
+    plan = {
+        "changed": [],
+        "unchanged": [],
+        "orphaned": [],
+        "added": [],
+        "chunks": {},
+    }
+
+    dump_map = {}
+    for word_obj in dump_word_objects:
+        key = word_obj.get("key")
+        if key in dump_map:
+            logger.warning(f"Key {key} is in the dump more than once, the last wins")
+        dump_map[key] = word_obj
+
+    for key, word_obj in dump_map.items():
+        if key not in key_index:
+            plan["added" if append_orphans else "orphaned"].append(key)
+            continue
+
+        yaml_file, offset = key_index[key]
+        if chunks[yaml_file][offset] == word_obj:
+            plan["unchanged"].append(key)
+            continue
+
+        # Chunks are copied once, the loaded list itself is left alone
+        if yaml_file not in plan["chunks"]:
+            plan["chunks"][yaml_file] = list(chunks[yaml_file])
+        plan["chunks"][yaml_file][offset] = word_obj
+        plan["changed"].append(key)
+
+    # Keys that are not in the list yet go to the end, chunked and named the
+    # way a save would, so the last chunk keeps its name and only grows up
+    # to the chunk size
+    if plan["added"]:
+        last_file = list(chunks)[-1]
+        last_chunk = plan["chunks"].get(last_file, chunks[last_file])
+        tail_chunks = split_into_chunks(
+            [*last_chunk, *(dump_map[key] for key in plan["added"])], language
+        )
+        plan["chunks"].update(
+            name_chunks(tail_chunks, language, {last_file: last_chunk[0]})
+        )
+
+    return plan
+
+
+def get_merge_diff(chunks: dict[str, list[dict]], plan: dict, lists_dir: str) -> str:
+    # The diff is against the files on disk, so it shows exactly what is written
+    stored_in_db = uses_word_list_db(lists_dir)
+
+    diff = []
+    for yaml_file, merged_chunk in plan["chunks"].items():
+        filepath = os.path.join(lists_dir, yaml_file)
+        if yaml_file not in chunks:
+            current_content = ""
+        elif stored_in_db:
+            current_content = dump_chunk(chunks[yaml_file])
+        else:
+            with open(filepath, "r", encoding="utf-8") as f:
+                current_content = f.read()
+        diff.extend(
+            difflib.unified_diff(
+                current_content.splitlines(keepends=True),
+                dump_chunk(merged_chunk).splitlines(keepends=True),
+                fromfile=filepath,
+                tofile=filepath,
+            )
+        )
+    return "".join(diff)
+
+
+def apply_merge(
+    plan: dict,
+    lists_dir: str,
+    language: Language,
+    connection: sqlite3.Connection | None = None,
+) -> list[str]:
+    # Only the chunks that contain changed or added keys are rewritten
+    if connection:
+        write_word_list_chunks(connection, lists_dir, language, plan["chunks"])
+        return [os.path.join(lists_dir, yaml_file) for yaml_file in plan["chunks"]]
+
+    connection = get_word_list_db(lists_dir)
+    if connection:
+        with closing(connection):
+            write_word_list_chunks(connection, lists_dir, language, plan["chunks"])
+        return [os.path.join(lists_dir, yaml_file) for yaml_file in plan["chunks"]]
+
+    contents = {
+        os.path.join(lists_dir, yaml_file): dump_chunk(chunk)
+        for yaml_file, chunk in plan["chunks"].items()
+    }
+    for filepath, content in contents.items():
+        write_file_atomically(filepath, content)
+    return list(contents)
@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+from rich.progress import Progress
+
+from constants import (
+    DEFAULT_AUDIO_DIR,
+    DEFAULT_IMAGES_DIR,
+    IMAGE_ATTRIBUTIONS_FILENAME,
+    OPTIMIZED_MEDIA_MANIFEST_FILENAME,
+)
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+IMAGE_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+AUDIO_EXTENSIONS = {"mp3": ".mp3", "opus": ".ogg"}
+AUDIO_CODECS = {"mp3": "libmp3lame", "opus": "libopus"}
+
+# The image quality each deck settled on under a budget is kept in the
+# manifest next to the file entries
+BUDGET_QUALITIES_KEY = ".budget-qualities"
+
+# Removes leading silence, and trailing silence by doing the same on the reversed audio
+TRIM_SILENCE_FILTER = (
+    "silenceremove=start_periods=1:start_threshold=-50dB,"
+    "areverse,"
+    "silenceremove=start_periods=1:start_threshold=-50dB,"
+    "areverse"
+)
+
+
+def get_settings_hash(settings: dict) -> str:
+    settings_json = json.dumps(settings, sort_keys=True)
+    return hashlib.sha256(settings_json.encode("utf-8")).hexdigest()[:16]
+
+
+def optimize_image(
+    source_path: str, destination_path: str, size: int, quality: int, image_format: str
+) -> int:
+    with Image.open(source_path) as img:
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        if img.size != (size, size):
+            img = img.resize((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        # The slowest WebP method gives the smallest files
+        options = {"method": 6} if image_format == "webp" else {"optimize": True}
+
+        tmp_path = f"{destination_path}.tmp"
+        try:
+            img.save(tmp_path, image_format.upper(), quality=quality, **options)
+            os.replace(tmp_path, destination_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    return os.path.getsize(destination_path)
+
+
+def optimize_audio(
+    source_path: str,
+    destination_path: str,
+    bitrate: str,
+    audio_format: str,
+    trim_silence: bool,
+) -> int:
+    tmp_path = f"{destination_path}.tmp{AUDIO_EXTENSIONS[audio_format]}"
+    command = ["ffmpeg", "-y", "-v", "error", "-i", source_path, "-ac", "1"]
+    if trim_silence:
+        command += ["-af", TRIM_SILENCE_FILTER]
+    command += ["-c:a", AUDIO_CODECS[audio_format], "-b:a", bitrate, tmp_path]
+
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+        os.replace(tmp_path, destination_path)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(e.stderr.strip() or f"ffmpeg exited with {e.returncode}")
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return os.path.getsize(destination_path)
+
+
+def get_image_jobs(
+    media_dir: str,
+    output_dir: str,
+    size: int,
+    quality: int,
+    image_format: str,
+    image_qualities: dict[str, int] | None = None,
+) -> list[tuple]:
+    # image_qualities overrides the quality of single images by slug
+    images_dir = os.path.join(media_dir, DEFAULT_IMAGES_DIR)
+    if not os.path.isdir(images_dir):
+        return []
+
+    jobs = []
+    for filename in sorted(os.listdir(images_dir)):
+        en_slug, extension = os.path.splitext(filename)
+        if extension != ".jpg":
+            continue
+
+        image_quality = (image_qualities or {}).get(en_slug, quality)
+        destination = os.path.join(
+            output_dir, DEFAULT_IMAGES_DIR, en_slug + IMAGE_EXTENSIONS[image_format]
+        )
+        jobs.append(
+            (
+                os.path.join(images_dir, filename),
+                destination,
+                {"size": size, "quality": image_quality, "format": image_format},
+                optimize_image,
+                (size, image_quality, image_format),
+            )
+        )
+    return jobs
+
+
+def get_image_qualities(
+    deck_media: dict[str, tuple[set[str], set[str]]], deck_qualities: dict[str, int]
+) -> dict[str, int]:
+    # An image shared by several decks gets the lowest quality among them
+    image_qualities = {}
+    for language, quality in deck_qualities.items():
+        for en_slug in deck_media[language][0]:
+            image_qualities[en_slug] = min(
+                image_qualities.get(en_slug, quality), quality
+            )
+    return image_qualities
+
+
+def get_audio_jobs(
+    media_dir: str,
+    output_dir: str,
+    languages: list[str],
+    bitrate: str,
+    audio_format: str,
+    trim_silence: bool,
+) -> list[tuple]:
+    settings = {
+        "bitrate": bitrate,
+        "format": audio_format,
+        "trim_silence": trim_silence,
+    }
+    jobs = []
+    for language in languages:
+        audio_dir = os.path.join(media_dir, DEFAULT_AUDIO_DIR, language)
+        for filename in sorted(os.listdir(audio_dir)):
+            key, extension = os.path.splitext(filename)
+            if extension != ".mp3":
+                continue
+
+            destination = os.path.join(
+                output_dir,
+                DEFAULT_AUDIO_DIR,
+                language,
+                key + AUDIO_EXTENSIONS[audio_format],
+            )
+            jobs.append(
+                (
+                    os.path.join(audio_dir, filename),
+                    destination,
+                    settings,
+                    optimize_audio,
+                    (bitrate, audio_format, trim_silence),
+                )
+            )
+    return jobs
+
+
+def remove_other_formats(destination: str, manifest: dict, output_dir: str) -> None:
+    # A file left from a run with another format would be found first by the
+    # media lookup, so only the latest format is kept. Only files listed in
+    # the manifest were written here and may be removed.
+    stem, extension = os.path.splitext(destination)
+    extensions = (
+        IMAGE_EXTENSIONS.values()
+        if extension in IMAGE_EXTENSIONS.values()
+        else AUDIO_EXTENSIONS.values()
+    )
+    for other_extension in extensions:
+        relative_path = os.path.relpath(stem + other_extension, output_dir)
+        if other_extension != extension and relative_path in manifest:
+            del manifest[relative_path]
+            if os.path.exists(stem + other_extension):
+                os.remove(stem + other_extension)
+
+
+def run_jobs(jobs: list[tuple], manifest: dict, output_dir: str, workers: int) -> int:
+    """Runs the jobs whose source or settings changed since the last run and
+    returns the number of failures. The manifest is updated in place."""
+    pending = []
+    for source, destination, settings, function, args in jobs:
+        relative_path = os.path.relpath(destination, output_dir)
+        stat = os.stat(source)
+        entry = {
+            "source_size": stat.st_size,
+            "source_mtime_ns": stat.st_mtime_ns,
+            "settings": get_settings_hash(settings),
+        }
+        if manifest.get(relative_path) == entry and os.path.exists(destination):
+            remove_other_formats(destination, manifest, output_dir)
+            continue
+
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        pending.append(
+            (relative_path, entry, destination, function, (source, destination, *args))
+        )
+
+    if not pending:
+        return 0
+
+    failed_count = 0
+    with (
+        Progress() as progress,
+        ProcessPoolExecutor(max_workers=max(workers, 1)) as executor,
+    ):
+        task = progress.add_task("Optimizing media...", total=len(pending))
+        futures = {
+            executor.submit(function, *args): (relative_path, entry, destination)
+            for relative_path, entry, destination, function, args in pending
+        }
+        for future in as_completed(futures):
+            relative_path, entry, destination = futures[future]
+            try:
+                future.result()
+                manifest[relative_path] = entry
+                remove_other_formats(destination, manifest, output_dir)
+            except Exception as e:
+                failed_count += 1
+                logger.error(f"Failed to optimize {relative_path}: {e}")
+            progress.advance(task)
+
+    logger.info(f"Optimized {len(pending) - failed_count} of {len(pending)} file(s)")
+    return failed_count
+
+
+def get_deck_media_sizes(
+    output_dir: str, deck_media: dict[str, tuple[set[str], set[str]]]
+) -> dict[str, int]:
+    """Returns the media size per target language given the optimized image
+    slugs and audio keys each deck uses."""
+    file_sizes = {}
+    for root, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            name = os.path.splitext(filename)[0]
+            file_sizes.setdefault(os.path.relpath(root, output_dir), {})[name] = (
+                os.path.getsize(path)
+            )
+
+    image_sizes = file_sizes.get(DEFAULT_IMAGES_DIR, {})
+    sizes = {}
+    for language, (image_slugs, audio_keys) in deck_media.items():
+        audio_sizes = file_sizes.get(os.path.join(DEFAULT_AUDIO_DIR, language), {})
+        sizes[language] = sum(image_sizes.get(slug, 0) for slug in image_slugs) + sum(
+            audio_sizes.get(key, 0) for key in audio_keys
+        )
+    return sizes
+
+
+def optimize_media(
+    media_dir: str,
+    output_dir: str,
+    languages: list[str],
+    image_size: int,
+    image_quality: int,
+    image_format: str,
+    audio_bitrate: str,
+    audio_format: str,
+    trim_silence: bool,
+    workers: int = 1,
+    budget_bytes: int | None = None,
+    deck_media: dict[str, tuple[set[str], set[str]]] | None = None,
+    min_image_quality: int = 40,
+) -> None:
+    """Re-encodes media into output_dir with the same layout and file names
+    (apart from the extension for WebP and Opus). With a budget, the image
+    quality of each deck over it is lowered until its media fits."""
+    manifest_path = os.path.join(output_dir, OPTIMIZED_MEDIA_MANIFEST_FILENAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    audio_jobs = []
+    if languages and shutil.which("ffmpeg"):
+        audio_jobs = get_audio_jobs(
+            media_dir,
+            output_dir,
+            languages,
+            audio_bitrate,
+            audio_format,
+            trim_silence,
+        )
+    elif languages:
+        logger.error("ffmpeg was not found, skipping audio")
+
+    try:
+        run_jobs(audio_jobs, manifest, output_dir, workers)
+
+        # Decks start at the quality a previous run settled on for the same
+        # budget and settings, so unchanged images are not encoded again
+        budget_key = get_settings_hash(
+            {
+                "budget": budget_bytes,
+                "size": image_size,
+                "quality": image_quality,
+                "format": image_format,
+            }
+        )
+        saved_qualities = manifest.get(BUDGET_QUALITIES_KEY, {}).get(budget_key, {})
+        deck_qualities = {}
+        if budget_bytes is not None and deck_media:
+            deck_qualities = {
+                language: saved_qualities.get(language, image_quality)
+                for language in deck_media
+            }
+            # Saved with the manifest, which is also written if a pass fails
+            manifest.setdefault(BUDGET_QUALITIES_KEY, {})[budget_key] = deck_qualities
+
+        while True:
+            # Only images of decks whose quality was lowered are encoded again
+            image_jobs = get_image_jobs(
+                media_dir,
+                output_dir,
+                image_size,
+                image_quality,
+                image_format,
+                get_image_qualities(deck_media or {}, deck_qualities),
+            )
+            run_jobs(image_jobs, manifest, output_dir, workers)
+
+            if not deck_qualities:
+                break
+
+            sizes = get_deck_media_sizes(output_dir, deck_media)
+            over_budget = {
+                language: size
+                for language, size in sizes.items()
+                if size > budget_bytes
+            }
+            if not over_budget:
+                logger.info("All decks fit the media budget")
+                break
+
+            lowered = [
+                language
+                for language in over_budget
+                if deck_qualities[language] - 10 >= min_image_quality
+            ]
+            if not lowered:
+                for language, size in over_budget.items():
+                    logger.warning(
+                        f"Media for '{language}' is {size / 1e6:.1f} MB, over the budget of {budget_bytes / 1e6:.1f} MB"
+                    )
+                break
+
+            for language in lowered:
+                deck_qualities[language] -= 10
+            logger.info(
+                f"{len(over_budget)} deck(s) over budget, retrying with image quality {', '.join(f'{language}={deck_qualities[language]}' for language in lowered)}"
+            )
+    finally:
+        write_file_atomically(manifest_path, json.dumps(manifest, indent=2))
+
+    # Attributions are needed as-is by create_deck
+    attributions_path = os.path.join(
+        media_dir, DEFAULT_IMAGES_DIR, IMAGE_ATTRIBUTIONS_FILENAME
+    )
+    if os.path.exists(attributions_path):
+        os.makedirs(os.path.join(output_dir, DEFAULT_IMAGES_DIR), exist_ok=True)
+        shutil.copyfile(
+            attributions_path,
+            os.path.join(output_dir, DEFAULT_IMAGES_DIR, IMAGE_ATTRIBUTIONS_FILENAME),
+        )
@@ -0,0 +1,105 @@
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Callable
+
+from constants import API_QUOTAS, DEFAULT_CACHE_DIR, QUOTA_DB_FILENAME
+from log import logger
+
+
+def get_quota_path(cache_dir: str) -> str:
+    return os.path.join(cache_dir, QUOTA_DB_FILENAME)
+
+
+def connect_quota_db(cache_dir: str) -> sqlite3.Connection:
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # Transactions are started explicitly, so other processes wait for the lock
+    connection = sqlite3.connect(
+        get_quota_path(cache_dir), timeout=60, isolation_level=None
+    )
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS buckets ("
+        "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    return connection
+
+
+def get_bucket_tokens(connection: sqlite3.Connection, name: str, now: float) -> float:
+    capacity, period = API_QUOTAS[name]
+    row = connection.execute(
+        "SELECT tokens, updated_at FROM buckets WHERE name = ?", (name,)
+    ).fetchone()
+    if row is None:
+        return capacity
+
+    # Tokens refill continuously at the rate of the limit
+    tokens, updated_at = row
+    return min(capacity, tokens + max(now - updated_at, 0) * capacity / period)
+
+
+def update_bucket(
+    connection: sqlite3.Connection, name: str, get_tokens: Callable[[float], float]
+) -> float:
+    """Sets the tokens of the bucket to get_tokens(current tokens) while
+    holding the write lock and returns the new number of tokens."""
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        tokens = get_tokens(get_bucket_tokens(connection, name, now))
+        connection.execute(
+            "INSERT INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET "
+            "tokens = excluded.tokens, updated_at = excluded.updated_at",
+            (name, tokens, now),
+        )
+        connection.execute("COMMIT")
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    return tokens
+
+
+def take_token(connection: sqlite3.Connection, name: str) -> float:
+    """Takes one token and returns 0, or returns the seconds until a token
+    is available."""
+    capacity, period = API_QUOTAS[name]
+    delay = 0.0
+
+    def get_tokens(tokens: float) -> float:
+        nonlocal delay
+        if tokens >= 1:
+            return tokens - 1
+        delay = (1 - tokens) * period / capacity
+        return tokens
+
+    update_bucket(connection, name, get_tokens)
+    return delay
+
+
+def acquire_quota(name: str, cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+    """Takes one request from the named quota, waiting until one is available.
+    The quota is shared by all processes using the same cache directory."""
+    with closing(connect_quota_db(cache_dir)) as connection:
+        has_logged = False
+        while delay := take_token(connection, name):
+            if not has_logged:
+                logger.info(f"Quota for {name} is used up, waiting {delay:.0f}s")
+                has_logged = True
+            time.sleep(delay)
+
+
+def update_quota_remaining(
+    name: str, remaining: int, cache_dir: str = DEFAULT_CACHE_DIR
+) -> None:
+    # The API knows best, e.g. when requests were made from another machine
+    with closing(connect_quota_db(cache_dir)) as connection:
+        update_bucket(connection, name, lambda tokens: min(tokens, remaining))
+
+
+def get_quota_status(cache_dir: str = DEFAULT_CACHE_DIR) -> dict[str, float]:
+    # Returns the remaining requests per quota
+    with closing(connect_quota_db(cache_dir)) as connection:
+        now = time.time()
+        return {name: get_bucket_tokens(connection, name, now) for name in API_QUOTAS}
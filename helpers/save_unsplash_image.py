@@ -1,51 +1,75 @@
-import json
-from io import BytesIO
+import os
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-import requests
 from PIL import Image
 
+from constants import DEFAULT_CACHE_DIR, IMAGE_QUALITY, IMAGE_SIZE
+from helpers.http_client import download_file_cached
+from helpers.write_file_atomically import open_file_atomically
 from log import logger
 
 
+def get_sized_image_url(image_data: dict, size: int = IMAGE_SIZE) -> str:
+    urls = image_data["urls"]
+    if "raw" not in urls:
+        return urls["full"]
+
+    # Let Unsplash (imgix) crop the center square and scale it to the target size
+    scheme, netloc, path, query, fragment = urlsplit(urls["raw"])
+    params = dict(parse_qsl(query))
+    params.update({"w": size, "h": size, "fit": "crop", "fm": "jpg", "q": 95})
+    return urlunsplit((scheme, netloc, path, urlencode(params), fragment))
+
+
 def save_unsplash_image(
-    image_data: dict, image_file_path: str, metadata_file_path: str, key: str
-) -> None:
+    image_data: dict,
+    image_file_path: str,
+    key: str,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+) -> dict:
     # Get image URL and author info
-    image_url = image_data["urls"]["full"]
+    image_url = get_sized_image_url(image_data)
     author = image_data["user"]["username"]
 
-    # Download the image
-    image_response = requests.get(image_url, timeout=30)
-    image_response.raise_for_status()
+    # A rendition of a photo never changes, so it is only downloaded once
+    cached_image_path = download_file_cached(
+        image_url,
+        cache_path=os.path.join(
+            cache_dir, "unsplash", "images", f"{image_data['id']}-{IMAGE_SIZE}.jpg"
+        ),
+    )
 
-    # Open image with PIL
-    img = Image.open(BytesIO(image_response.content))
+    with Image.open(cached_image_path) as img:
+        # Large JPEG originals are decoded at a reduced scale (at least IMAGE_SIZE)
+        img.draft("RGB", (IMAGE_SIZE, IMAGE_SIZE))
 
-    # Crop image to 1024x1024 (centered without distortion)
-    width, height = img.size
+        # Crop image to 1024x1024 (centered without distortion)
+        width, height = img.size
 
-    # Determine the shorter side to create a square crop
-    min_dimension = min(width, height)
+        # Determine the shorter side to create a square crop
+        min_dimension = min(width, height)
 
-    # Calculate crop box (centered)
-    left = (width - min_dimension) // 2
-    top = (height - min_dimension) // 2
-    right = left + min_dimension
-    bottom = top + min_dimension
+        # Calculate crop box (centered)
+        left = (width - min_dimension) // 2
+        top = (height - min_dimension) // 2
+        right = left + min_dimension
+        bottom = top + min_dimension
 
-    # Crop to square
-    img_cropped = img.crop((left, top, right, bottom))
+        # Crop to square
+        img_cropped = img.crop((left, top, right, bottom))
 
-    # Resize to 1024x1024
-    img_resized = img_cropped.resize((1024, 1024), Image.Resampling.LANCZOS)
+        # Resize to 1024x1024, reducing large images by integer factors first
+        if img_cropped.size != (IMAGE_SIZE, IMAGE_SIZE):
+            img_cropped = img_cropped.resize(
+                (IMAGE_SIZE, IMAGE_SIZE), Image.Resampling.LANCZOS, reducing_gap=3.0
+            )
 
-    # Save the image
-    img_resized.save(image_file_path, "JPEG", quality=90)
-
-    # Save metadata
-    metadata = {"author": author, "source": "unsplash"}
-
-    with open(metadata_file_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+        # Save the image to a unique file next to its final path and move it
+        # into place, so parallel downloads never write to the same file
+        with open_file_atomically(image_file_path, "wb") as f:
+            img_cropped.convert("RGB").save(f, "JPEG", quality=IMAGE_QUALITY)
 
     logger.info(f"Created image for '{key}' (author: {author})")
+
+    # Return the metadata for the attribution manifest
+    return {"author": author, "source": "unsplash"}
@@ -1,33 +1,262 @@
+import hashlib
+import json
 import os
+import sqlite3
+from contextlib import closing
+from typing import Iterable, Iterator
 
 import yaml
 
 from constants import DEFAULT_CHUNK_SIZE, Language
+from helpers.word_list_db import (
+    get_first_stored_word_objects,
+    get_word_list_db,
+    write_word_list_chunks,
+)
+from helpers.write_file_atomically import write_file_atomically
+from helpers.yaml_loader import Dumper, SafeLoader
+from log import logger
 
 
-def save_word_objects_in_chunks(
-    word_objects: list[dict],
+def get_anchor(word_object: dict, language: Language) -> str:
+    # Prefer stable identifiers so edits to a word do not move chunk boundaries
+    anchor = word_object.get("key") or word_object.get(language.value)
+    if not isinstance(anchor, str):
+        anchor = json.dumps(word_object, sort_keys=True, ensure_ascii=False)
+    return anchor
+
+
+def get_anchor_hash(word_object: dict, language: Language) -> int:
+    anchor = get_anchor(word_object, language)
+    return int.from_bytes(hashlib.sha1(anchor.encode("utf-8")).digest()[:8], "big")
+
+
+def split_into_chunks(
+    word_objects: Iterable[dict],
     language: Language,
-    lists_dir: str,
     chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[list[dict]]:
+    """Splits word objects into chunks of about chunk_size items. A chunk ends
+    after a word object whose anchor hash hits the boundary condition, so
+    inserting or removing a word only changes the chunk it belongs to."""
+    min_size = max(chunk_size // 2, 1)
+    max_size = max(chunk_size * 3 // 2, 1)
+    boundary_modulus = max(chunk_size - min_size, 1)
+
+    chunk = []
+    for word_object in word_objects:
+        chunk.append(word_object)
+        if len(chunk) >= max_size or (
+            len(chunk) >= min_size
+            and get_anchor_hash(word_object, language) % boundary_modulus == 0
+        ):
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def get_next_chunk_name(previous_name: str, next_name: str | None) -> str | None:
+    """Returns a name that sorts between previous_name and next_name, so a
+    chunk inserted between two files gets a suffix instead of renaming the
+    files after it (005.yaml, 005_001.yaml, 006.yaml). Returns None if there
+    is no such name."""
+    head, _, last = previous_name.rpartition("_")
+    if not previous_name:
+        name = "001"
+    elif last.isdigit() and int(last) < 999:
+        name = f"{head}_{int(last) + 1:03d}" if head else f"{int(last) + 1:03d}"
+    else:
+        name = f"{previous_name}_001"
+    if next_name is None or name < next_name:
+        return name
+
+    # No room at this level, so the name gets a suffix
+    name = f"{previous_name}_001" if previous_name else "000"
+    return name if name < next_name else None
+
+
+def name_chunks(
+    chunks: Iterable[list[dict]],
+    language: Language,
+    first_word_objects: dict[str, dict | None],
+) -> Iterator[tuple[str, list[dict]]]:
+    """Names each chunk after the existing chunk file that starts with the same
+    word object, given the first word object of every existing file. Other
+    chunks get a new name between their neighbours, so the names keep
+    sorting in list order."""
+    # New lists are named as they stream in, 001.yaml, 002.yaml and so on
+    if not first_word_objects:
+        name = ""
+        for chunk in chunks:
+            name = get_next_chunk_name(name, None)
+            yield f"{name}.yaml", chunk
+        return
+
+    names_by_anchor = {}
+    for filename, word_object in first_word_objects.items():
+        if isinstance(word_object, dict):
+            anchor = get_anchor(word_object, language)
+            names_by_anchor.setdefault(anchor, os.path.splitext(filename)[0])
+
+    # Chunks keep the name of their file as long as the names stay in order
+    chunks = list(chunks)
+    names = []
+    previous_name = ""
+    for chunk in chunks:
+        name = names_by_anchor.pop(get_anchor(chunk[0], language), None)
+        if name is not None and name > previous_name:
+            previous_name = name
+            names.append(name)
+        else:
+            names.append(None)
+
+    previous_name = ""
+    for index, chunk in enumerate(chunks):
+        while names[index] is None:
+            next_index = next(
+                (i for i in range(index + 1, len(names)) if names[i] is not None),
+                None,
+            )
+            next_name = names[next_index] if next_index is not None else None
+            names[index] = get_next_chunk_name(previous_name, next_name)
+            if names[index] is None:
+                # The next file is renamed as well to make room
+                names[next_index] = None
+        previous_name = names[index]
+        yield f"{names[index]}.yaml", chunk
+
+
+def read_first_word_object(filepath: str) -> dict | None:
+    # Only the first item of the chunk is parsed, it ends where the next starts
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            lines = []
+            item_count = 0
+            for line in f:
+                if line.startswith("- "):
+                    item_count += 1
+                    if item_count > 1:
+                        break
+                lines.append(line)
+        items = yaml.load("".join(lines), Loader=SafeLoader)
+    except (OSError, UnicodeDecodeError, yaml.YAMLError):
+        return None
+
+    return items[0] if isinstance(items, list) and items else None
+
+
+def get_first_word_objects(lists_dir: str) -> dict[str, dict | None]:
+    if not os.path.isdir(lists_dir):
+        return {}
+
+    return {
+        filename: read_first_word_object(os.path.join(lists_dir, filename))
+        for filename in sorted(os.listdir(lists_dir))
+        if filename.endswith(".yaml")
+    }
+
+
+def dump_chunk(chunk: list[dict]) -> str:
+    return yaml.dump(
+        chunk,
+        Dumper=Dumper,
+        default_flow_style=False,
+        allow_unicode=True,
+        sort_keys=False,
+    )
+
+
+def write_chunk_files(
+    chunks: Iterable[tuple[str, list[dict]]], lists_dir: str
 ) -> list[str]:
     # Create directory if it doesn't exist
     os.makedirs(lists_dir, exist_ok=True)
 
-    # Split into chunks and save
+    # Save the chunks whose content changed
     created_files = []
+    written_count = 0
 
-    for i in range(0, len(word_objects), chunk_size):
-        chunk = word_objects[i : i + chunk_size]
-        chunk_number = (i // chunk_size) + 1
-        filename = f"{chunk_number:03d}.yaml"
+    for filename, chunk in chunks:
         filepath = os.path.join(lists_dir, filename)
 
-        with open(filepath, "w", encoding="utf-8") as f:
-            yaml.dump(
-                chunk, f, default_flow_style=False, allow_unicode=True, sort_keys=False
-            )
+        content = dump_chunk(chunk)
+
+        if os.path.exists(filepath):
+            with open(filepath, "r", encoding="utf-8") as f:
+                if f.read() == content:
+                    created_files.append(filepath)
+                    continue
 
+        write_file_atomically(filepath, content)
+        written_count += 1
         created_files.append(filepath)
 
+    # Remove chunk files whose words moved to other chunks
+    created_filenames = {os.path.basename(filepath) for filepath in created_files}
+    removed_count = 0
+    for filename in sorted(os.listdir(lists_dir)):
+        if filename.endswith(".yaml") and filename not in created_filenames:
+            filepath = os.path.join(lists_dir, filename)
+            os.remove(filepath)
+            removed_count += 1
+
+    logger.info(
+        f"Updated {written_count} and removed {removed_count} chunk file(s) in '{lists_dir}'"
+    )
+
     return created_files
+
+
+def store_word_objects_in_chunks(
+    connection: sqlite3.Connection,
+    word_objects: Iterable[dict],
+    language: Language,
+    lists_dir: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> list[str]:
+    chunks = dict(
+        name_chunks(
+            split_into_chunks(word_objects, language, chunk_size),
+            language,
+            get_first_stored_word_objects(connection, lists_dir),
+        )
+    )
+    written_count, removed_count = write_word_list_chunks(
+        connection, lists_dir, language, chunks, replace_all=True
+    )
+    logger.info(
+        f"Updated {written_count} and removed {removed_count} chunk(s) of '{lists_dir}' in the word list database"
+    )
+    return [os.path.join(lists_dir, chunk_name) for chunk_name in chunks]
+
+
+def save_word_objects_in_chunks(
+    word_objects: Iterable[dict],
+    language: Language,
+    lists_dir: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    connection: sqlite3.Connection | None = None,
+) -> list[str]:
+    # Lists imported into the word list database are written in one
+    # transaction, or in the one of the given connection
+    if connection:
+        return store_word_objects_in_chunks(
+            connection, word_objects, language, lists_dir, chunk_size
+        )
+
+    connection = get_word_list_db(lists_dir)
+    if connection:
+        with closing(connection):
+            return store_word_objects_in_chunks(
+                connection, word_objects, language, lists_dir, chunk_size
+            )
+
+    # Existing files keep their names, so an insert does not rename later files
+    chunks = name_chunks(
+        split_into_chunks(word_objects, language, chunk_size),
+        language,
+        get_first_word_objects(lists_dir),
+    )
+    return write_chunk_files(chunks, lists_dir)
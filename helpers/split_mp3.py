@@ -0,0 +1,87 @@
+from typing import NamedTuple
+
+# Bitrates in kbit/s for MPEG-1 and MPEG-2/2.5 layer III, indexed by the header
+MPEG1_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+MPEG2_BITRATES = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+
+# Sample rates in Hz, indexed by the version bits and the header
+SAMPLE_RATES = {
+    0b11: [44100, 48000, 32000],  # MPEG-1
+    0b10: [22050, 24000, 16000],  # MPEG-2
+    0b00: [11025, 12000, 8000],  # MPEG-2.5
+}
+
+
+class Mp3Frame(NamedTuple):
+    start_time: float
+    duration: float
+    data: bytes
+
+
+def skip_id3_tag(audio: bytes) -> int:
+    if audio[:3] != b"ID3" or len(audio) < 10:
+        return 0
+
+    # The tag size is stored as a 28 bit syncsafe integer
+    size = 0
+    for byte in audio[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    return 10 + size
+
+
+def get_mp3_frames(audio: bytes) -> list[Mp3Frame]:
+    """Splits MPEG layer III audio into frames. Raises ValueError for data
+    that is not a plain sequence of layer III frames."""
+    frames = []
+    position = skip_id3_tag(audio)
+    time = 0.0
+
+    while position + 4 <= len(audio):
+        header = int.from_bytes(audio[position : position + 4], "big")
+
+        if header >> 21 != 0x7FF:
+            raise ValueError(f"No MP3 frame sync at byte {position}")
+
+        version = (header >> 19) & 0b11
+        layer = (header >> 17) & 0b11
+        bitrate_index = (header >> 12) & 0b1111
+        sample_rate_index = (header >> 10) & 0b11
+        padding = (header >> 9) & 0b1
+
+        if version not in SAMPLE_RATES or layer != 0b01:
+            raise ValueError(f"Unsupported MPEG version or layer at byte {position}")
+        if bitrate_index in (0, 0b1111) or sample_rate_index == 0b11:
+            raise ValueError(f"Unsupported MP3 frame header at byte {position}")
+
+        sample_rate = SAMPLE_RATES[version][sample_rate_index]
+        if version == 0b11:
+            bitrate = MPEG1_BITRATES[bitrate_index] * 1000
+            samples = 1152
+        else:
+            bitrate = MPEG2_BITRATES[bitrate_index] * 1000
+            samples = 576
+
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+        data = audio[position : position + frame_length]
+        if len(data) < frame_length:
+            raise ValueError(f"Truncated MP3 frame at byte {position}")
+
+        duration = samples / sample_rate
+
+        # A Xing/Info frame describes the whole file and holds no audio
+        if frames or not (b"Xing" in data[:64] or b"Info" in data[:64]):
+            frames.append(Mp3Frame(start_time=time, duration=duration, data=data))
+            time += duration
+
+        position += frame_length
+
+    return frames
+
+
+def cut_mp3_frames(frames: list[Mp3Frame], start_time: float, end_time: float) -> bytes:
+    # Frames are kept whole, so the cut is accurate to one frame (~24-26 ms)
+    return b"".join(
+        frame.data
+        for frame in frames
+        if start_time <= frame.start_time + frame.duration / 2 < end_time
+    )
@@ -0,0 +1,109 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+from dotenv import load_dotenv
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+
+class StorageBackend(ABC):
+    """Remote storage used to sync directories. Paths are relative to the
+    root of the storage and separated by '/'."""
+
+    @abstractmethod
+    def describe(self, path: str) -> str:
+        pass
+
+    @abstractmethod
+    def read_bytes(self, path: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    def write_bytes(self, path: str, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def upload_file(self, local_path: str, path: str) -> None:
+        pass
+
+    @abstractmethod
+    def download_file(self, path: str, local_path: str) -> None:
+        pass
+
+
+class LocalDirectoryBackend(StorageBackend):
+    def __init__(self, root: str):
+        self.root = root
+
+    def get_path(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/"))
+
+    def describe(self, path: str) -> str:
+        return self.get_path(path)
+
+    def read_bytes(self, path: str) -> bytes | None:
+        if not os.path.exists(self.get_path(path)):
+            return None
+
+        with open(self.get_path(path), "rb") as f:
+            return f.read()
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(self.get_path(path)), exist_ok=True)
+        write_file_atomically(self.get_path(path), data)
+
+    def upload_file(self, local_path: str, path: str) -> None:
+        destination_path = self.get_path(path)
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+
+        tmp_path = f"{destination_path}.tmp"
+        shutil.copyfile(local_path, tmp_path)
+        os.replace(tmp_path, destination_path)
+
+    def download_file(self, path: str, local_path: str) -> None:
+        shutil.copyfile(self.get_path(path), local_path)
+
+
+class GcsBackend(StorageBackend):
+    def __init__(self, bucket_name: str):
+        self.bucket_name = bucket_name
+        self.bucket = storage.Client().bucket(bucket_name)
+
+    def describe(self, path: str) -> str:
+        return f"gs://{self.bucket_name}/{path}"
+
+    def read_bytes(self, path: str) -> bytes | None:
+        try:
+            return self.bucket.blob(path).download_as_bytes()
+        except NotFound:
+            return None
+
+    def write_bytes(self, path: str, data: bytes) -> None:
+        self.bucket.blob(path).upload_from_string(data, content_type="application/json")
+
+    def upload_file(self, local_path: str, path: str) -> None:
+        self.bucket.blob(path).upload_from_filename(local_path)
+
+    def download_file(self, path: str, local_path: str) -> None:
+        self.bucket.blob(path).download_to_filename(local_path)
+
+
+def get_storage_backend() -> StorageBackend | None:
+    load_dotenv()
+
+    # A local directory can stand in for the bucket, e.g. for tests
+    local_dir = os.getenv("SYNC_LOCAL_DIR")
+    if local_dir:
+        return LocalDirectoryBackend(local_dir)
+
+    bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET")
+
+    if not bucket_name:
+        logger.error("GOOGLE_CLOUD_BUCKET environment variable is not set")
+        return None
+
+    return GcsBackend(bucket_name)
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable
+
+from rich.console import Console
+from rich.progress import Progress
+from rich.table import Table
+
+from constants import DEFAULT_CACHE_DIR, DEFAULT_SYNC_WORKERS, SYNC_MANIFEST_FILENAME
+from helpers.storage_backends import StorageBackend
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+# Merges downloaded or remote content into a local file: (local path, content,
+# whether the content wins over local data)
+MergeFunction = Callable[[str, bytes, bool], None]
+
+
+def get_file_hash(path: str) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def get_local_manifest_path(cache_dir: str, local_dir: str) -> str:
+    local_dir_digest = hashlib.sha1(
+        os.path.abspath(local_dir).encode("utf-8")
+    ).hexdigest()[:10]
+    return os.path.join(cache_dir, "sync", f"{local_dir_digest}.json")
+
+
+def read_manifest(content: bytes | None) -> dict[str, dict]:
+    if not content:
+        return {}
+
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        logger.warning("Could not parse sync manifest, treating it as empty")
+        return {}
+
+
+def read_local_manifest(manifest_path: str) -> dict[str, dict]:
+    if not os.path.exists(manifest_path):
+        return {}
+
+    with open(manifest_path, "rb") as f:
+        return read_manifest(f.read())
+
+
+def scan_local_files(local_dir: str, cached: dict[str, dict]) -> dict[str, dict]:
+    """Returns size, modification time and hash of every file in local_dir.
+    Hashes are reused for files whose size and modification time did not
+    change. Hidden files and directories are local bookkeeping (e.g. the
+    audio store) and are not synced."""
+    files = {}
+    for root, dirnames, filenames in os.walk(local_dir):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        for filename in sorted(filenames):
+            if filename.startswith(".") or filename.endswith(".tmp"):
+                continue
+
+            path = os.path.join(root, filename)
+            relative_path = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            stat = os.stat(path)
+
+            entry = cached.get(relative_path)
+            if (
+                entry
+                and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns
+            ):
+                files[relative_path] = entry
+                continue
+
+            files[relative_path] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": get_file_hash(path),
+            }
+    return files
+
+
+def print_transfer_report(action: str, transfers: list[tuple[str, int]]) -> None:
+    console = Console()
+    table = Table(title=f"Files to {action}")
+
+    table.add_column("Directory", style="cyan")
+    table.add_column("Files", style="magenta", justify="right")
+    table.add_column("Size", style="green", justify="right")
+
+    directories = defaultdict(lambda: [0, 0])
+    for relative_path, size in transfers:
+        directory = relative_path.rsplit("/", 1)[0] if "/" in relative_path else "."
+        directories[directory][0] += 1
+        directories[directory][1] += size
+
+    for directory, (count, size) in sorted(directories.items()):
+        table.add_row(directory, str(count), f"{size / 1e6:.1f} MB")
+
+    total_size = sum(size for _, size in transfers)
+    table.add_row(
+        "[bold]Total[/bold]", str(len(transfers)), f"{total_size / 1e6:.1f} MB"
+    )
+
+    console.print(table)
+
+
+def run_transfers(
+    transfers: list[tuple[str, int]],
+    transfer: Callable[[str], None],
+    workers: int,
+    description: str,
+) -> list[str]:
+    # Returns the relative paths that were transferred successfully
+    succeeded = []
+    with (
+        Progress() as progress,
+        ThreadPoolExecutor(max_workers=max(workers, 1)) as executor,
+    ):
+        task = progress.add_task(description, total=sum(size for _, size in transfers))
+        futures = {
+            executor.submit(transfer, relative_path): (relative_path, size)
+            for relative_path, size in transfers
+        }
+        for future in as_completed(futures):
+            relative_path, size = futures[future]
+            try:
+                future.result()
+                succeeded.append(relative_path)
+            except Exception as e:
+                logger.error(f"Failed to transfer {relative_path}: {e}")
+            progress.advance(task, size)
+
+    return succeeded
+
+
+def upload_directory(
+    local_dir: str,
+    remote_dir: str,
+    backend: StorageBackend,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    merge_files: dict[str, MergeFunction] | None = None,
+) -> bool:
+    """Uploads the files whose hash differs from the remote manifest, which
+    avoids listing the remote directory. Files in merge_files take over the
+    remote entries first, so entries uploaded by others are kept. Returns
+    whether all uploads succeeded."""
+    if not dry_run:
+        for relative_path, merge in (merge_files or {}).items():
+            local_path = os.path.join(local_dir, *relative_path.split("/"))
+            content = backend.read_bytes(f"{remote_dir}/{relative_path}")
+            if content and os.path.exists(local_path):
+                merge(local_path, content, False)
+
+    manifest_path = get_local_manifest_path(cache_dir, local_dir)
+    local_files = scan_local_files(local_dir, read_local_manifest(manifest_path))
+    write_file_atomically(manifest_path, json.dumps(local_files))
+
+    remote_manifest_path = f"{remote_dir}/{SYNC_MANIFEST_FILENAME}"
+    remote_manifest = read_manifest(backend.read_bytes(remote_manifest_path))
+
+    transfers = [
+        (relative_path, entry["size"])
+        for relative_path, entry in local_files.items()
+        if remote_manifest.get(relative_path, {}).get("sha256") != entry["sha256"]
+    ]
+
+    if dry_run:
+        print_transfer_report(f"upload to {backend.describe(remote_dir)}", transfers)
+        return True
+
+    if not transfers:
+        logger.info(f"{backend.describe(remote_dir)} is up to date")
+        return True
+
+    succeeded = run_transfers(
+        transfers,
+        lambda relative_path: backend.upload_file(
+            os.path.join(local_dir, relative_path), f"{remote_dir}/{relative_path}"
+        ),
+        workers,
+        "Uploading...",
+    )
+
+    # Read the manifest again to keep uploads made in the meantime
+    remote_manifest = read_manifest(backend.read_bytes(remote_manifest_path))
+    for relative_path in succeeded:
+        remote_manifest[relative_path] = {
+            "size": local_files[relative_path]["size"],
+            "sha256": local_files[relative_path]["sha256"],
+        }
+    backend.write_bytes(
+        remote_manifest_path,
+        json.dumps(remote_manifest, indent=2, sort_keys=True).encode("utf-8"),
+    )
+
+    logger.info(f"Uploaded {len(succeeded)} of {len(transfers)} file(s)")
+    return len(succeeded) == len(transfers)
+
+
+def download_directory(
+    local_dir: str,
+    remote_dir: str,
+    backend: StorageBackend,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    merge_files: dict[str, MergeFunction] | None = None,
+) -> bool:
+    """Downloads the files of the remote manifest whose hash differs from the
+    local copy. Files in merge_files are merged into an existing local copy
+    instead of replacing it. Returns whether all downloads succeeded."""
+    remote_manifest_path = f"{remote_dir}/{SYNC_MANIFEST_FILENAME}"
+    remote_manifest = read_manifest(backend.read_bytes(remote_manifest_path))
+    if not remote_manifest:
+        logger.error(
+            f"No sync manifest found at {backend.describe(remote_manifest_path)}, upload the files first"
+        )
+        return False
+
+    manifest_path = get_local_manifest_path(cache_dir, local_dir)
+    local_files = scan_local_files(local_dir, read_local_manifest(manifest_path))
+
+    transfers = []
+    for relative_path, entry in remote_manifest.items():
+        # Never write outside of the local directory
+        if relative_path.startswith("/") or ".." in relative_path.split("/"):
+            logger.warning(f"Skipping invalid path in sync manifest: {relative_path}")
+            continue
+        if local_files.get(relative_path, {}).get("sha256") != entry["sha256"]:
+            transfers.append((relative_path, entry["size"]))
+
+    if dry_run:
+        write_file_atomically(manifest_path, json.dumps(local_files))
+        print_transfer_report(
+            f"download from {backend.describe(remote_dir)}", transfers
+        )
+        return True
+
+    def download(relative_path: str) -> None:
+        local_path = os.path.join(local_dir, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+        merge = (merge_files or {}).get(relative_path)
+        tmp_path = f"{local_path}.tmp"
+        try:
+            backend.download_file(f"{remote_dir}/{relative_path}", tmp_path)
+            if get_file_hash(tmp_path) != remote_manifest[relative_path]["sha256"]:
+                raise ValueError("content does not match the sync manifest")
+            if merge and os.path.exists(local_path):
+                with open(tmp_path, "rb") as f:
+                    merge(local_path, f.read(), True)
+            else:
+                os.replace(tmp_path, local_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        stat = os.stat(local_path)
+        local_files[relative_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": get_file_hash(local_path)
+            if merge
+            else remote_manifest[relative_path]["sha256"],
+        }
+
+    succeeded = []
+    if transfers:
+        succeeded = run_transfers(transfers, download, workers, "Downloading...")
+    else:
+        logger.info(f"{local_dir} is up to date")
+
+    write_file_atomically(manifest_path, json.dumps(local_files))
+
+    if transfers:
+        logger.info(f"Downloaded {len(succeeded)} of {len(transfers)} file(s)")
+    return len(succeeded) == len(transfers)
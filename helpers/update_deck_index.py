@@ -1,15 +1,16 @@
 import json
 import os
 
+from helpers.write_file_atomically import write_file_atomically
 from log import logger
 
 
-def update_deck_index(
+def update_deck_index_entries(
     index_path: str,
-    native_language_code: str,
-    target_language_code: str,
-    deck_path: str,
+    entries: list[tuple[str, str, str]],
 ) -> None:
+    """Merges (native language code, target language code, deck path) entries
+    into the index and writes it in a single atomic replace."""
     index = {}
     if os.path.exists(index_path):
         try:
@@ -19,29 +20,44 @@ def update_deck_index(
             logger.warning(f"Could not parse {index_path}, creating new index")
             index = {}
 
-    index_key = f"{native_language_code}_{target_language_code}"
-
-    index[index_key] = deck_path
-
     native_languages = index.get("native_languages", None)
     target_languages = index.get("target_languages", None)
 
     if native_languages == None:
         native_languages = []
 
-    if native_language_code not in native_languages:
-        native_languages.append(native_language_code)
-
     if target_languages == None:
         target_languages = []
 
-    if target_language_code not in target_languages:
-        target_languages.append(target_language_code)
+    for native_language_code, target_language_code, deck_path in entries:
+        index_key = f"{native_language_code}_{target_language_code}"
+
+        index[index_key] = deck_path
+
+        if native_language_code not in native_languages:
+            native_languages.append(native_language_code)
+
+        if target_language_code not in target_languages:
+            target_languages.append(target_language_code)
 
     index["native_languages"] = native_languages
     index["target_languages"] = target_languages
 
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump(index, f, ensure_ascii=False, indent=2)
+    write_file_atomically(index_path, json.dumps(index, ensure_ascii=False, indent=2))
+
+    for native_language_code, target_language_code, deck_path in entries:
+        logger.info(
+            f"Updated deck index: {native_language_code}_{target_language_code} -> {deck_path}"
+        )
+
 
-    logger.info(f"Updated deck index: {index_key} -> {deck_path}")
+def update_deck_index(
+    index_path: str,
+    native_language_code: str,
+    target_language_code: str,
+    deck_path: str,
+) -> None:
+    update_deck_index_entries(
+        index_path=index_path,
+        entries=[(native_language_code, target_language_code, deck_path)],
+    )
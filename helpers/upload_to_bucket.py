@@ -1,28 +1,25 @@
-import os
-
-from dotenv import load_dotenv
-
+from constants import DEFAULT_SYNC_WORKERS
+from helpers.storage_backends import get_storage_backend
+from helpers.sync_directory import MergeFunction, upload_directory
 from log import logger
 
 
-def upload_to_bucket(path: str) -> None:
-    load_dotenv()
-
-    bucket_name = os.getenv("GOOGLE_CLOUD_BUCKET")
+def upload_to_bucket(
+    path: str,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
+    merge_files: dict[str, MergeFunction] | None = None,
+) -> None:
+    backend = get_storage_backend()
 
-    if not bucket_name:
-        logger.error("GOOGLE_CLOUD_BUCKET environment variable is not set")
+    if not backend:
         return
 
-    bucket_path = f"gs://{bucket_name}/{path}"
-
-    logger.info(f"Uploading {path} to {bucket_path}...")
-
-    result = os.system(
-        f'gsutil -o "GSUtil:parallel_process_count=1" -m rsync -r "{path}" "{bucket_path}"'
-    )
+    logger.info(f"Uploading {path} to {backend.describe(path)}...")
 
-    if result == 0:
+    if upload_directory(
+        path, path, backend, workers=workers, dry_run=dry_run, merge_files=merge_files
+    ):
         logger.info("Upload completed successfully")
     else:
-        logger.error(f"Upload failed with exit code {result}")
+        logger.error("Upload failed for some files")
@@ -1,32 +1,163 @@
-from jsonschema import ValidationError, validate
+import hashlib
+import json
+from functools import cache
+from typing import Callable
 
-from constants import get_word_objects_array_schema
+from jsonschema import Draft202012Validator
+
+from constants import get_word_object_schema
 from log import logger
 
+JSON_TYPES = {
+    "object": "dict",
+    "array": "list",
+    "string": "str",
+}
+
+
+class UnsupportedSchemaError(ValueError):
+    pass
+
+
+def get_type_check(schema_type: str, value: str) -> str:
+    if schema_type not in JSON_TYPES:
+        raise UnsupportedSchemaError(f"Unsupported type: {schema_type}")
+    return f"isinstance({value}, {JSON_TYPES[schema_type]})"
+
+
+def get_condition(schema: dict) -> str:
+    # Only "properties" with "const" are supported inside "if"
+    conditions = []
+    for keyword, subschema in schema.items():
+        if keyword != "properties":
+            raise UnsupportedSchemaError(f"Unsupported keyword in 'if': {keyword}")
+        for name, property_schema in subschema.items():
+            if set(property_schema) != {"const"}:
+                raise UnsupportedSchemaError(
+                    f"Unsupported 'if' property schema: {property_schema}"
+                )
+            # Like in JSON schema, a missing property does not fail the condition
+            conditions.append(
+                f"({name!r} not in obj or obj[{name!r}] == {property_schema['const']!r})"
+            )
+    return " and ".join(conditions) or "True"
+
+
+def get_object_checks(schema: dict, indent: str) -> list[str]:
+    lines = []
+    for keyword, value in schema.items():
+        if keyword == "type":
+            if value != "object":
+                raise UnsupportedSchemaError(f"Unsupported word object type: {value}")
+        elif keyword == "required":
+            for name in value:
+                lines.append(f"{indent}if {name!r} not in obj:")
+                lines.append(
+                    f"{indent}    errors.append({f'{name!r} is a required property'!r})"
+                )
+        elif keyword == "properties":
+            for name, property_schema in value.items():
+                lines.append(f"{indent}if {name!r} in obj:")
+                lines.append(f"{indent}    value = obj[{name!r}]")
+                lines.extend(get_property_checks(property_schema, indent + "    "))
+        elif keyword == "allOf":
+            for subschema in value:
+                lines.extend(get_object_checks(subschema, indent))
+        elif keyword == "if":
+            lines.append(f"{indent}if {get_condition(value)}:")
+            lines.extend(get_object_checks(schema.get("then", {}), indent + "    "))
+            lines.append(f"{indent}    pass")
+        elif keyword != "then":
+            raise UnsupportedSchemaError(f"Unsupported keyword: {keyword}")
+    return lines
+
+
+def get_property_checks(schema: dict, indent: str) -> list[str]:
+    lines = []
+    for keyword, value in schema.items():
+        if keyword == "type":
+            lines.append(f"{indent}if not {get_type_check(value, 'value')}:")
+            message = f" is not of type {value!r}"
+            lines.append(f"{indent}    errors.append(repr(value) + {message!r})")
+        elif keyword == "enum":
+            lines.append(f"{indent}if value not in {tuple(value)!r}:")
+            message = f" is not one of {value!r}"
+            lines.append(f"{indent}    errors.append(repr(value) + {message!r})")
+        elif keyword == "const":
+            lines.append(f"{indent}if value != {value!r}:")
+            message = f"{value!r} was expected"
+            lines.append(f"{indent}    errors.append({message!r})")
+        else:
+            raise UnsupportedSchemaError(f"Unsupported property keyword: {keyword}")
+    return lines
+
+
+def compile_word_object_schema(schema: dict) -> Callable[[object], list[str]]:
+    """Generates a function with straight-line checks for the word object schema
+    that returns all error messages for a word object."""
+    lines = [
+        "def validate_word_object(obj):",
+        "    if not isinstance(obj, dict):",
+        "        return [repr(obj) + \" is not of type 'object'\"]",
+        "    errors = []",
+        *get_object_checks(schema, "    "),
+        "    return errors",
+    ]
+
+    namespace = {}
+    exec(compile("\n".join(lines), "<word object schema>", "exec"), namespace)
+    return namespace["validate_word_object"]
+
+
+@cache
+def get_word_object_validator(
+    key_is_required: bool = True,
+) -> Callable[[object], list[str]]:
+    schema = get_word_object_schema(key_is_required=key_is_required)
+
+    try:
+        return compile_word_object_schema(schema)
+    except UnsupportedSchemaError as e:
+        logger.debug(f"Falling back to jsonschema validation: {e}")
+
+    # Checking the schema once up front saves the meta-schema check on every call
+    Draft202012Validator.check_schema(schema)
+    validator = Draft202012Validator(schema)
+
+    def validate_word_object(obj: object) -> list[str]:
+        return [error.message for error in validator.iter_errors(obj)]
+
+    return validate_word_object
+
+
+@cache
+def get_word_object_schema_fingerprint(key_is_required: bool = True) -> str:
+    schema = get_word_object_schema(key_is_required=key_is_required)
+    return hashlib.sha256(
+        json.dumps(schema, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
 
 def validate_word_objects(
-    word_objects: list[dict], key_is_required: bool = True
+    word_objects: list[dict],
+    key_is_required: bool = True,
+    start_index: int = 0,
+    source: str | None = None,
 ) -> bool:
-    schema = get_word_objects_array_schema(key_is_required=key_is_required)
+    validate_word_object = get_word_object_validator(key_is_required=key_is_required)
+    location = f" ({source})" if source else ""
 
-    try:
-        validate(instance=word_objects, schema=schema)
-        return True
-    except ValidationError as e:
-        # Extract the path to the problematic item to provide better error messages
-        if e.path:
-            item_index = list(e.path)[0] if e.path else "unknown"
-            word_obj = (
-                word_objects[item_index]
-                if isinstance(item_index, int) and item_index < len(word_objects)
-                else {}
-            )
+    # Report every invalid word object instead of stopping at the first one
+    invalid_count = 0
+    for index, word_obj in enumerate(word_objects, start=start_index):
+        errors = validate_word_object(word_obj)
+        if errors:
+            invalid_count += 1
             logger.error(
-                f"Validation error at index {item_index}: {e.message}\nObject: {word_obj}"
+                f"Validation error at index {index}{location}: {'; '.join(errors)}\nObject: {word_obj}"
             )
-        else:
-            logger.error(f"Validation error: {e.message}")
-        return False
-    except Exception as e:
-        logger.error(f"Unexpected error during validation: {e}")
-        return False
+
+    if invalid_count:
+        logger.error(f"Found {invalid_count} invalid word object(s){location}")
+
+    return invalid_count == 0
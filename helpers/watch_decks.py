@@ -0,0 +1,164 @@
+import os
+import time
+
+from constants import Language
+from helpers.create_deck import create_deck, get_flashcard_model
+from helpers.load_word_list import load_word_list_chunks, parse_chunk
+from helpers.validate_word_objects import validate_word_objects
+from helpers.watch_files import get_file_watcher, watch_changes
+from log import logger
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+
+def is_chunk_file(path: str) -> bool:
+    # Temporary files of atomic writes start with a dot
+    filename = os.path.basename(path)
+    return filename.endswith(".yaml") and not filename.startswith(".")
+
+
+def load_chunk(filepath: str, start_index: int) -> list[dict] | None:
+    try:
+        with open(filepath, "rb") as f:
+            chunk = parse_chunk(f.read())
+    except Exception as e:
+        logger.error(f"Failed to load {filepath}: {e}")
+        return None
+
+    if not isinstance(chunk, list):
+        logger.error(f"Expected list in {filepath}, got {type(chunk).__name__}")
+        return None
+
+    if not validate_word_objects(
+        word_objects=chunk, start_index=start_index, source=filepath
+    ):
+        return None
+
+    return chunk
+
+
+def get_start_index(chunks: dict[str, list[dict]], chunk_name: str) -> int:
+    return sum(len(chunk) for name, chunk in chunks.items() if name < chunk_name)
+
+
+def load_watched_list(lang_dir: str, language: Language) -> tuple[dict, set]:
+    """Returns the chunks of a list and the names of the invalid chunks."""
+    chunks = load_word_list_chunks(language, lang_dir, use_db=False)
+    if chunks:
+        return dict(chunks), set()
+
+    # Some chunk is invalid, so each one is loaded on its own to find out which
+    chunks = {}
+    invalid_chunks = set()
+    if not os.path.isdir(lang_dir):
+        return chunks, invalid_chunks
+
+    for chunk_name in sorted(filter(is_chunk_file, os.listdir(lang_dir))):
+        chunk = load_chunk(
+            os.path.join(lang_dir, chunk_name), get_start_index(chunks, chunk_name)
+        )
+        if chunk is None:
+            invalid_chunks.add(chunk_name)
+        else:
+            chunks[chunk_name] = chunk
+    return chunks, invalid_chunks
+
+
+def build_deck(
+    language: Language,
+    chunks: dict[str, list[dict]],
+    media_dir: str,
+    decks_dir: str,
+) -> None:
+    word_objects = [
+        word_obj for chunk_name in sorted(chunks) for word_obj in chunks[chunk_name]
+    ]
+    try:
+        create_deck(
+            word_objects=word_objects,
+            native_language=Language.ENGLISH,
+            target_language=language,
+            media_dir=media_dir,
+            output_dir=os.path.join(decks_dir, language.value),
+        )
+    except Exception as e:
+        logger.error(f"Failed to build the {language.value} deck: {e}", exc_info=True)
+
+
+def watch_decks(
+    languages: list[Language],
+    lists_dir: str,
+    media_dir: str,
+    decks_dir: str,
+    debounce: float,
+    poll_interval: float,
+    use_inotify: bool = True,
+) -> None:
+    """Revalidates changed chunks and rebuilds the affected decks whenever a
+    list, template or media file changes, until interrupted."""
+    lang_dirs = {
+        language: os.path.join(lists_dir, language.value) for language in languages
+    }
+    lists = {
+        language: load_watched_list(lang_dir, language)
+        for language, lang_dir in lang_dirs.items()
+    }
+    for language, (chunks, invalid_chunks) in lists.items():
+        if not invalid_chunks:
+            build_deck(language, chunks, media_dir, decks_dir)
+
+    watcher = get_file_watcher(
+        [*lang_dirs.values(), TEMPLATES_DIR, media_dir],
+        poll_interval=poll_interval,
+        use_inotify=use_inotify,
+    )
+    logger.info(
+        f"Watching {', '.join(language.value for language in languages)} lists, templates and media (press Ctrl+C to stop)"
+    )
+
+    try:
+        for changes in watch_changes(watcher, debounce=debounce):
+            start = time.perf_counter()
+            affected = set()
+
+            for language, lang_dir in lang_dirs.items():
+                chunks, invalid_chunks = lists[language]
+                for path in sorted(changes):
+                    if os.path.dirname(path) != lang_dir or not is_chunk_file(path):
+                        continue
+
+                    affected.add(language)
+                    chunk_name = os.path.basename(path)
+                    chunks.pop(chunk_name, None)
+                    invalid_chunks.discard(chunk_name)
+                    if not os.path.exists(path):
+                        continue
+
+                    chunk = load_chunk(path, get_start_index(chunks, chunk_name))
+                    if chunk is None:
+                        invalid_chunks.add(chunk_name)
+                    else:
+                        chunks[chunk_name] = chunk
+
+            # Templates and media are shared, so every deck may change
+            if any(path.startswith(TEMPLATES_DIR) for path in changes):
+                get_flashcard_model.cache_clear()
+                affected.update(languages)
+            if any(path.startswith(os.path.join(media_dir, "")) for path in changes):
+                affected.update(languages)
+
+            if affected:
+                logger.info(
+                    f"Revalidated {len(changes)} changed file(s) in {time.perf_counter() - start:.2f}s"
+                )
+
+            for language in sorted(affected, key=lambda language: language.value):
+                chunks, invalid_chunks = lists[language]
+                if invalid_chunks:
+                    logger.error(
+                        f"Not rebuilding the {language.value} deck until these chunks are valid: {', '.join(sorted(invalid_chunks))}"
+                    )
+                    continue
+                build_deck(language, chunks, media_dir, decks_dir)
+    finally:
+        watcher.close()
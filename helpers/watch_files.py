@@ -0,0 +1,170 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator
+
+from constants import DEFAULT_WATCH_DEBOUNCE, DEFAULT_WATCH_POLL_INTERVAL
+from log import logger
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Editors either write the file in place or move a temporary file over it
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher(ABC):
+    """Reports files that changed below the watched directories."""
+
+    @abstractmethod
+    def read_changes(self, timeout: float | None) -> set[str]:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher(FileWatcher):
+    def __init__(self, libc: ctypes.CDLL, directories: list[str]):
+        self.libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Watches are not recursive, so every subdirectory gets its own
+        self.directories = {}
+        for directory in directories:
+            for root, _, _ in os.walk(directory):
+                self.add_watch(root)
+
+    def add_watch(self, directory: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), INOTIFY_MASK)
+        if wd < 0:
+            logger.warning(
+                f"Cannot watch {directory}: {os.strerror(ctypes.get_errno())}"
+            )
+            return
+        self.directories[wd] = directory
+
+    def read_changes(self, timeout: float | None) -> set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT_HEADER.unpack_from(data, offset)
+            offset += INOTIFY_EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for root, _, files in os.walk(path):
+                        self.add_watch(root)
+                        changes.update(os.path.join(root, f) for f in files)
+                continue
+
+            changes.add(path)
+
+        return changes
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def get_file_snapshot(directories: list[str]) -> dict[str, tuple[int, int]]:
+    snapshot = {}
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+class PollingWatcher(FileWatcher):
+    def __init__(self, directories: list[str], poll_interval: float):
+        self.directories = directories
+        self.poll_interval = poll_interval
+        self.snapshot = get_file_snapshot(directories)
+
+    def read_changes(self, timeout: float | None) -> set[str]:
+        time.sleep(
+            self.poll_interval if timeout is None else min(timeout, self.poll_interval)
+        )
+
+        snapshot = get_file_snapshot(self.directories)
+        changes = {
+            path
+            for path in snapshot.keys() | self.snapshot.keys()
+            if snapshot.get(path) != self.snapshot.get(path)
+        }
+        self.snapshot = snapshot
+        return changes
+
+
+def get_file_watcher(
+    directories: list[str],
+    poll_interval: float = DEFAULT_WATCH_POLL_INTERVAL,
+    use_inotify: bool = True,
+) -> FileWatcher:
+    directories = [directory for directory in directories if os.path.isdir(directory)]
+
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            return InotifyWatcher(libc, directories)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify is not available, polling instead: {e}")
+
+    return PollingWatcher(directories, poll_interval)
+
+
+def watch_changes(
+    watcher: FileWatcher, debounce: float = DEFAULT_WATCH_DEBOUNCE
+) -> Iterator[set[str]]:
+    """Yields the changed files once no further change arrived for debounce
+    seconds, so a burst of writes is handled as one change."""
+    pending = set()
+    while True:
+        changes = watcher.read_changes(debounce if pending else None)
+        if changes:
+            pending |= changes
+        elif pending:
+            yield pending
+            pending = set()
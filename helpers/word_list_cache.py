@@ -0,0 +1,81 @@
+import hashlib
+import os
+import pickle
+
+from constants import Language
+from helpers.write_file_atomically import write_file_atomically
+from log import logger
+
+# Bump when the layout of the cache file changes
+WORD_LIST_CACHE_VERSION = 1
+
+
+def get_word_list_cache_path(cache_dir: str, language: Language, lists_dir: str) -> str:
+    # The same language can be loaded from different directories (e.g. ./dump)
+    lists_dir_digest = hashlib.sha1(
+        os.path.abspath(lists_dir).encode("utf-8")
+    ).hexdigest()[:10]
+
+    return os.path.join(
+        cache_dir, "lists", f"{language.value}-{lists_dir_digest}.pickle"
+    )
+
+
+def read_word_list_cache(cache_path: str) -> dict:
+    if not os.path.exists(cache_path):
+        return {}
+
+    try:
+        with open(cache_path, "rb") as f:
+            cache = pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable word list cache {cache_path}: {e}")
+        return {}
+
+    if not isinstance(cache, dict) or cache.get("version") != WORD_LIST_CACHE_VERSION:
+        return {}
+
+    return cache
+
+
+def write_word_list_cache(cache_path: str, chunks: dict[str, dict]) -> None:
+    cache = {"version": WORD_LIST_CACHE_VERSION, "chunks": chunks}
+
+    try:
+        write_file_atomically(
+            cache_path, pickle.dumps(cache, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+    except OSError as e:
+        logger.warning(f"Could not write word list cache {cache_path}: {e}")
+
+
+def get_cached_chunk_entry(
+    filepath: str, cached_entry: dict | None
+) -> tuple[dict, bytes | None]:
+    """Returns the cache entry for a chunk file and the raw file content if the
+    entry could not be reused and the chunk has to be parsed again."""
+    stat = os.stat(filepath)
+
+    if (
+        cached_entry
+        and cached_entry["mtime_ns"] == stat.st_mtime_ns
+        and cached_entry["size"] == stat.st_size
+    ):
+        return cached_entry, None
+
+    with open(filepath, "rb") as f:
+        content = f.read()
+
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    entry = {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": sha256,
+    }
+
+    # The file was touched but its content did not change
+    if cached_entry and cached_entry["sha256"] == sha256:
+        return {**cached_entry, **entry}, None
+
+    return entry, content
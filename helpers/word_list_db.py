@@ -0,0 +1,211 @@
+import json
+import os
+import sqlite3
+from contextlib import closing, contextmanager
+from typing import Iterator
+
+from dotenv import load_dotenv
+
+from constants import DEFAULT_WORD_LIST_DB_PATH, WORD_LIST_BACKENDS, Language
+from log import logger
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS word_lists ("
+    "source TEXT PRIMARY KEY, language TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS word_objects ("
+    "source TEXT NOT NULL, chunk TEXT NOT NULL, offset INTEGER NOT NULL, "
+    "language TEXT NOT NULL, key TEXT, word_type TEXT, data TEXT NOT NULL, "
+    "PRIMARY KEY (source, chunk, offset))",
+    "CREATE INDEX IF NOT EXISTS word_objects_key ON word_objects (language, key)",
+    "CREATE INDEX IF NOT EXISTS word_objects_word_type "
+    "ON word_objects (language, word_type)",
+)
+
+
+def get_word_list_backend() -> str:
+    load_dotenv()
+    backend = os.getenv("WORD_LIST_BACKEND", "yaml").lower()
+    if backend not in WORD_LIST_BACKENDS:
+        logger.warning(f"Unknown WORD_LIST_BACKEND '{backend}', using YAML files")
+        return "yaml"
+    return backend
+
+
+def get_word_list_db_path() -> str:
+    load_dotenv()
+    return os.getenv("WORD_LIST_DB", DEFAULT_WORD_LIST_DB_PATH)
+
+
+def get_source(lists_dir: str) -> str:
+    # Lists are stored under the directory they were imported from, e.g. lists/fr
+    return os.path.normpath(os.path.relpath(lists_dir)).replace(os.sep, "/")
+
+
+def connect_word_list_db(db_path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+    # Transactions are started explicitly, so other processes wait for the lock
+    connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    connection.execute("PRAGMA journal_mode=WAL")
+    for statement in SCHEMA:
+        connection.execute(statement)
+    return connection
+
+
+def has_word_list(connection: sqlite3.Connection, lists_dir: str) -> bool:
+    return (
+        connection.execute(
+            "SELECT 1 FROM word_lists WHERE source = ?", (get_source(lists_dir),)
+        ).fetchone()
+        is not None
+    )
+
+
+def get_word_list_db(lists_dir: str) -> sqlite3.Connection | None:
+    """Returns a connection to the word list database if the SQLite backend is
+    selected and the list was imported. Other directories, e.g. ./dump, are
+    read and written as YAML files."""
+    if get_word_list_backend() != "sqlite":
+        return None
+
+    db_path = get_word_list_db_path()
+    if not os.path.exists(db_path):
+        return None
+
+    connection = connect_word_list_db(db_path)
+    if not has_word_list(connection, lists_dir):
+        connection.close()
+        return None
+
+    return connection
+
+
+@contextmanager
+def open_word_list_transaction(
+    lists_dir: str,
+) -> Iterator[sqlite3.Connection | None]:
+    """Yields a connection that holds the write lock of an imported list until
+    the block ends, so a command can load, change and save the list without
+    another command writing in between. Yields None for YAML lists."""
+    connection = get_word_list_db(lists_dir)
+    if not connection:
+        yield None
+        return
+
+    with closing(connection):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+
+def uses_word_list_db(lists_dir: str) -> bool:
+    connection = get_word_list_db(lists_dir)
+    if connection:
+        connection.close()
+    return connection is not None
+
+
+def iter_word_list_chunks(
+    connection: sqlite3.Connection, lists_dir: str
+) -> Iterator[tuple[str, list[dict]]]:
+    # Rows come in chunk order, so one chunk at a time is held in memory
+    chunk_name = None
+    chunk = []
+    for name, data in connection.execute(
+        "SELECT chunk, data FROM word_objects WHERE source = ? ORDER BY chunk, offset",
+        (get_source(lists_dir),),
+    ):
+        if name != chunk_name:
+            if chunk_name is not None:
+                yield chunk_name, chunk
+            chunk_name, chunk = name, []
+        chunk.append(json.loads(data))
+
+    if chunk_name is not None:
+        yield chunk_name, chunk
+
+
+def get_first_stored_word_objects(
+    connection: sqlite3.Connection, lists_dir: str
+) -> dict[str, dict]:
+    return {
+        name: json.loads(data)
+        for name, data in connection.execute(
+            "SELECT chunk, data FROM word_objects "
+            "WHERE source = ? AND offset = 0 ORDER BY chunk",
+            (get_source(lists_dir),),
+        )
+    }
+
+
+def get_word_object_rows(
+    source: str, language: Language, chunk_name: str, chunk: list[dict]
+) -> Iterator[tuple]:
+    for offset, word_obj in enumerate(chunk):
+        key = word_obj.get("key")
+        word_type = word_obj.get("word_type")
+        yield (
+            source,
+            chunk_name,
+            offset,
+            language.value,
+            key if isinstance(key, str) else None,
+            word_type if isinstance(word_type, str) else None,
+            json.dumps(word_obj, ensure_ascii=False),
+        )
+
+
+def write_word_list_chunks(
+    connection: sqlite3.Connection,
+    lists_dir: str,
+    language: Language,
+    chunks: dict[str, list[dict]],
+    replace_all: bool = False,
+) -> tuple[int, int]:
+    """Stores the given chunks in one transaction, or in the transaction the
+    connection is already in. With replace_all, stored chunks that are not
+    given are removed, otherwise they are kept as they are. Only chunks whose
+    rows differ are rewritten. Returns the numbers of written and removed
+    chunks."""
+    source = get_source(lists_dir)
+
+    in_transaction = connection.in_transaction
+    if not in_transaction:
+        connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute(
+            "INSERT OR IGNORE INTO word_lists (source, language) VALUES (?, ?)",
+            (source, language.value),
+        )
+
+        stored_chunks = dict(iter_word_list_chunks(connection, lists_dir))
+        changed_chunks = {
+            chunk_name: chunk
+            for chunk_name, chunk in chunks.items()
+            if stored_chunks.get(chunk_name) != chunk
+        }
+        removed_chunks = stored_chunks.keys() - chunks.keys() if replace_all else set()
+
+        connection.executemany(
+            "DELETE FROM word_objects WHERE source = ? AND chunk = ?",
+            [(source, chunk_name) for chunk_name in [*changed_chunks, *removed_chunks]],
+        )
+        for chunk_name, chunk in changed_chunks.items():
+            connection.executemany(
+                "INSERT INTO word_objects "
+                "(source, chunk, offset, language, key, word_type, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                get_word_object_rows(source, language, chunk_name, chunk),
+            )
+        if not in_transaction:
+            connection.execute("COMMIT")
+    except BaseException:
+        if not in_transaction:
+            connection.execute("ROLLBACK")
+        raise
+
+    return len(changed_chunks), len(removed_chunks)
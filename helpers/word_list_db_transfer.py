@@ -0,0 +1,85 @@
+import json
+import os
+from contextlib import closing
+
+from constants import Language
+from helpers.load_word_list import load_word_list_chunks
+from helpers.save_word_objects_in_chunks import write_chunk_files
+from helpers.word_list_db import (
+    connect_word_list_db,
+    get_word_list_backend,
+    get_word_list_db_path,
+    has_word_list,
+    iter_word_list_chunks,
+    write_word_list_chunks,
+)
+from log import logger
+
+
+def is_json_lossless(chunk: list[dict]) -> bool:
+    try:
+        return json.loads(json.dumps(chunk, ensure_ascii=False)) == chunk
+    except (TypeError, ValueError):
+        return False
+
+
+def import_yaml_word_list(language: Language, lists_dir: str) -> int | bool:
+    """Replaces the stored list with the YAML chunks in lists_dir and returns
+    the number of imported word objects."""
+    chunks = load_word_list_chunks(
+        language, lists_dir, key_is_required=False, use_db=False
+    )
+    if not chunks:
+        return False
+
+    # Rows are stored as JSON, so values JSON cannot represent would be lost
+    for chunk_name, chunk in chunks.items():
+        if not is_json_lossless(chunk):
+            logger.error(
+                f"{os.path.join(lists_dir, chunk_name)} has values that cannot be stored losslessly, quote them in the YAML file"
+            )
+            return False
+
+    db_path = get_word_list_db_path()
+    with closing(connect_word_list_db(db_path)) as connection:
+        write_word_list_chunks(
+            connection, lists_dir, language, chunks, replace_all=True
+        )
+
+    word_count = sum(len(chunk) for chunk in chunks.values())
+    logger.info(
+        f"Imported {word_count} words in {len(chunks)} chunk(s) from '{lists_dir}' into {db_path}"
+    )
+    if get_word_list_backend() != "sqlite":
+        logger.info("Set WORD_LIST_BACKEND=sqlite to use the database in commands")
+    return word_count
+
+
+def export_yaml_word_list(lists_dir: str) -> list[str] | bool:
+    # The stored chunks are written back to the files they were imported from
+    db_path = get_word_list_db_path()
+    if not os.path.exists(db_path):
+        logger.error(f"Word list database not found: {db_path}")
+        return False
+
+    with closing(connect_word_list_db(db_path)) as connection:
+        if not has_word_list(connection, lists_dir):
+            logger.error(f"'{lists_dir}' was not imported into {db_path}")
+            return False
+
+        return write_chunk_files(
+            iter_word_list_chunks(connection, lists_dir), lists_dir
+        )
+
+
+def get_stored_languages(lists_dir: str) -> list[Language]:
+    db_path = get_word_list_db_path()
+    if not os.path.exists(db_path):
+        return []
+
+    with closing(connect_word_list_db(db_path)) as connection:
+        return [
+            language
+            for language in Language
+            if has_word_list(connection, os.path.join(lists_dir, language.value))
+        ]
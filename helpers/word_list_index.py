@@ -0,0 +1,147 @@
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+from constants import Language
+
+# A predicate returns the positions of the matching word objects
+Predicate = Callable[["WordListIndex"], set[int]]
+
+
+def is_present(value: object) -> bool:
+    return value is not None and value != "" and value != [] and value != {}
+
+
+class WordListIndex:
+    """Secondary indexes over a loaded word list. Each index is built the
+    first time it is needed and then reused for every later query."""
+
+    def __init__(self, word_objects: list[dict], language: Language):
+        self.word_objects = word_objects
+        self.language = language
+        self.value_indexes = {}
+        self.presence_indexes = {}
+        self.prefix_indexes = {}
+
+    def __len__(self) -> int:
+        return len(self.word_objects)
+
+    def get_all(self) -> set[int]:
+        return set(range(len(self.word_objects)))
+
+    def get_value_index(self, field: str) -> dict[object, set[int]]:
+        if field not in self.value_indexes:
+            value_index = {}
+            for position, word_obj in enumerate(self.word_objects):
+                value = word_obj.get(field)
+                if isinstance(value, (str, int, float, bool)):
+                    value_index.setdefault(value, set()).add(position)
+            self.value_indexes[field] = value_index
+        return self.value_indexes[field]
+
+    def get_presence_index(self, field: str) -> set[int]:
+        if field not in self.presence_indexes:
+            self.presence_indexes[field] = {
+                position
+                for position, word_obj in enumerate(self.word_objects)
+                if is_present(word_obj.get(field))
+            }
+        return self.presence_indexes[field]
+
+    def get_prefix_index(self, field: str) -> tuple[list[str], list[int]]:
+        # Case folded values sorted once, so a prefix is found by bisection
+        if field not in self.prefix_indexes:
+            entries = sorted(
+                (word_obj[field].casefold(), position)
+                for position, word_obj in enumerate(self.word_objects)
+                if isinstance(word_obj.get(field), str)
+            )
+            self.prefix_indexes[field] = (
+                [value for value, _ in entries],
+                [position for _, position in entries],
+            )
+        return self.prefix_indexes[field]
+
+    def get_positions(self, predicate: Predicate) -> list[int]:
+        return sorted(predicate(self))
+
+    def query(self, predicate: Predicate) -> Iterator[dict]:
+        # Matches are yielded in list order, e.g. to save or export them
+        for position in self.get_positions(predicate):
+            yield self.word_objects[position]
+
+
+def field_equals(field: str, value: object) -> Predicate:
+    def predicate(index: WordListIndex) -> set[int]:
+        return index.get_value_index(field).get(value, set())
+
+    return predicate
+
+
+def field_in(field: str, values: list[object]) -> Predicate:
+    return any_of(*(field_equals(field, value) for value in values))
+
+
+def key_is(key: str) -> Predicate:
+    return field_equals("key", key)
+
+
+def has_field(field: str) -> Predicate:
+    def predicate(index: WordListIndex) -> set[int]:
+        return index.get_presence_index(field)
+
+    return predicate
+
+
+def missing_field(field: str) -> Predicate:
+    return negate(has_field(field))
+
+
+def missing_translation() -> Predicate:
+    # The word itself or its English translation is empty
+    def predicate(index: WordListIndex) -> set[int]:
+        return index.get_all() - (
+            index.get_presence_index(index.language.value)
+            & index.get_presence_index(Language.ENGLISH.value)
+        )
+
+    return predicate
+
+
+def has_prefix(field: str, prefix: str) -> Predicate:
+    def predicate(index: WordListIndex) -> set[int]:
+        values, positions = index.get_prefix_index(field)
+        prefix_folded = prefix.casefold()
+
+        matches = set()
+        for i in range(bisect_left(values, prefix_folded), len(values)):
+            if not values[i].startswith(prefix_folded):
+                break
+            matches.add(positions[i])
+        return matches
+
+    return predicate
+
+
+def all_of(*predicates: Predicate) -> Predicate:
+    def predicate(index: WordListIndex) -> set[int]:
+        # Start with the smallest result so the intersections stay cheap
+        results = sorted((p(index) for p in predicates), key=len)
+        if not results:
+            return index.get_all()
+        return set(results[0]).intersection(*results[1:])
+
+    return predicate
+
+
+def any_of(*predicates: Predicate) -> Predicate:
+    def predicate(index: WordListIndex) -> set[int]:
+        return set().union(*(p(index) for p in predicates))
+
+    return predicate
+
+
+def negate(inner: Predicate) -> Predicate:
+    def predicate(index: WordListIndex) -> set[int]:
+        return index.get_all() - inner(index)
+
+    return predicate
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+
+@contextmanager
+def open_file_atomically(
+    path: str, mode: str = "w", newline: str | None = None
+) -> Iterator[IO]:
+    # Write to a temporary file in the same directory first so readers never
+    # see a partially written file
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        if "b" in mode:
+            f = os.fdopen(fd, mode)
+        else:
+            f = os.fdopen(fd, mode, encoding="utf-8", newline=newline)
+        with f:
+            yield f
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def write_file_atomically(path: str, content: str | bytes) -> None:
+    with open_file_atomically(path, "w" if isinstance(content, str) else "wb") as f:
+        f.write(content)
+
+
+@contextmanager
+def open_directory_atomically(path: str) -> Iterator[str]:
+    # Fill a temporary directory next to path and only swap it in once it is
+    # complete, so a failure leaves the previous directory untouched
+    directory = os.path.abspath(path)
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+
+    tmp_path = tempfile.mkdtemp(
+        dir=parent, prefix=f".{os.path.basename(directory)}.", suffix=".tmp"
+    )
+    try:
+        yield tmp_path
+        os.chmod(tmp_path, 0o755)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    old_path = f"{tmp_path}.old"
+    if os.path.exists(directory):
+        os.rename(directory, old_path)
+    os.rename(tmp_path, directory)
+    shutil.rmtree(old_path, ignore_errors=True)
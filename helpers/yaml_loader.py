@@ -0,0 +1,26 @@
+import yaml
+
+
+# Custom YAML loader that treats "on", "off", "yes", "no", "true", "false" as strings
+class SafeLoader(yaml.SafeLoader):
+    pass
+
+
+# The same loader backed by libyaml, if PyYAML was built with it
+class CSafeLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    pass
+
+
+# Remove boolean resolvers for on/off/yes/no/true/false
+for loader in (SafeLoader, CSafeLoader):
+    for ch in "OoYyNnTtFf":
+        if ch in loader.yaml_implicit_resolvers:
+            loader.yaml_implicit_resolvers[ch] = [
+                (tag, regexp)
+                for tag, regexp in loader.yaml_implicit_resolvers[ch]
+                if tag != "tag:yaml.org,2002:bool"
+            ]
+
+
+# The libyaml emitter writes the same YAML for word objects, only faster
+Dumper = getattr(yaml, "CDumper", yaml.Dumper)
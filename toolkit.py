@@ -1,114 +1,151 @@
 import os
-import shutil
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from functools import partial
 from string import Template
 
-import pyperclip
 import typer
 import yaml
 from dotenv import load_dotenv
 from rich.console import Console
 from rich.table import Table
-from rich.traceback import install
-from wordfreq import top_n_list
-
-
-# Custom YAML loader that treats "on", "off", "yes", "no", "true", "false" as strings
-class SafeLoader(yaml.SafeLoader):
-    pass
-
-
-# Remove boolean resolvers for on/off/yes/no/true/false
-for ch in "OoYyNnTtFf":
-    if ch in SafeLoader.yaml_implicit_resolvers:
-        SafeLoader.yaml_implicit_resolvers[ch] = [
-            (tag, regexp)
-            for tag, regexp in SafeLoader.yaml_implicit_resolvers[ch]
-            if tag != "tag:yaml.org,2002:bool"
-        ]
 
 from constants import (
     AI_VOICE_MAP,
+    API_QUOTAS,
     DEFAULT_AUDIO_DIR,
     DEFAULT_BASICS_LIST_PATH,
+    DEFAULT_CACHE_DIR,
     DEFAULT_DECKS_DIR,
+    DEFAULT_DUMP_DIR,
+    DEFAULT_EXPORT_DIR,
+    DEFAULT_IMAGE_CANDIDATES,
+    DEFAULT_IMAGE_WORKERS,
     DEFAULT_IMAGES_DIR,
     DEFAULT_LENGTH,
     DEFAULT_LISTS_DIR,
+    DEFAULT_LOAD_WORKERS,
     DEFAULT_MEDIA_DIR,
+    DEFAULT_NEAR_DUPLICATE_THRESHOLD,
+    DEFAULT_OPTIMIZED_AUDIO_BITRATE,
+    DEFAULT_OPTIMIZED_IMAGE_QUALITY,
+    DEFAULT_OPTIMIZED_IMAGE_SIZE,
+    DEFAULT_OPTIMIZED_MEDIA_DIR,
+    DEFAULT_SYNC_WORKERS,
     DEFAULT_TEMPLATE_PATH,
     DEFAULT_TRIM_LENGTH,
+    DEFAULT_TTS_BATCH_SIZE,
+    DEFAULT_TTS_WORKERS,
+    DEFAULT_WATCH_DEBOUNCE,
+    DEFAULT_WATCH_POLL_INTERVAL,
+    IMAGE_ATTRIBUTIONS_FILENAME,
     SUPPORTED_LANGUAGES,
-    WORDFREQ_LANG_MAP,
+    ExportFormat,
     Language,
     WordType,
 )
-from helpers.create_deck import create_deck
-from helpers.deduplicate_list import deduplicate_list
-from helpers.download_from_bucket import download_from_bucket
-from helpers.get_audio_from_google_cloud_tts import get_audio_from_google_cloud_tts
-from helpers.get_image_from_unsplash import get_image_from_unsplash
-from helpers.load_word_list import load_word_list
-from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
-from helpers.upload_to_bucket import upload_to_bucket
 from log import logger
 
-install(show_locals=True)
+# Helpers are imported inside the commands, so light commands start quickly
 
-app = typer.Typer()
+# Typer installs its own rich exception hook when the app runs
+app = typer.Typer(pretty_exceptions_show_locals=True)
 
 
 @app.command()
 def create_list(
-    language: Language,
+    language: list[Language] = typer.Argument(None),
+    all_languages: bool = typer.Option(
+        False, "--all", help="Use every language of the basics list without a list"
+    ),
     basics_list_path: str = DEFAULT_BASICS_LIST_PATH,
     frequency_list_length: int = DEFAULT_LENGTH,
     lists_dir: str = DEFAULT_LISTS_DIR,
+    workers: int = os.cpu_count() or 1,
 ) -> None:
+    from helpers.basics_index import get_basics_pairs, load_basics_index
+    from helpers.create_word_list import create_word_list
+
     # Load environment variables from .env file
     load_dotenv()
 
-    # load basics.yaml and save it in basics_list variable
-    with open(basics_list_path, "r", encoding="utf-8") as f:
-        basics_list = yaml.load(f, Loader=SafeLoader)
-
-    # get initial frequency list
-    # wordfreq does not make a difference between european and brazilian portuguese
-    wordfreq_lang = WORDFREQ_LANG_MAP.get(language, language.value)
-    frequency_list = top_n_list(wordfreq_lang, frequency_list_length)
-
-    # convert frequency list to word objects
-    basics_word_objects = []
-    for word in basics_list:
-        word_object = {
-            Language.ENGLISH.value: word.get(Language.ENGLISH.value, None),
-            language.value: word.get(language.value, None),
-        }
-        basics_word_objects.append(word_object)
+    # basics.yaml is only parsed again when it changed
+    basics_index = load_basics_index(basics_list_path)
+
+    languages = list(language or [])
+    if all_languages:
+        languages += [
+            lang
+            for lang in Language
+            if lang != Language.ENGLISH
+            and lang.value in basics_index["languages"]
+            and not os.path.isdir(os.path.join(lists_dir, lang.value))
+            and lang not in languages
+        ]
 
-    # convert frequency list to word objects
-    frequency_word_objects = []
-    for word in frequency_list:
-        word_object = {
-            language.value: word,
-        }
-        frequency_word_objects.append(word_object)
+    if not languages:
+        logger.error("No languages given, pass languages or use --all")
+        return
 
-    # combine basics and frequency lists
-    word_objects = basics_word_objects + frequency_word_objects
+    # Only the English column and the column of each language are read
+    jobs = [(lang, get_basics_pairs(basics_index, lang)) for lang in languages]
 
-    # deduplicate word_objects based on key
-    word_objects = deduplicate_list(word_objects, key=language.value)
+    if workers <= 1 or len(jobs) == 1:
+        for lang, basics_list in jobs:
+            create_word_list(lang, basics_list, frequency_list_length, lists_dir)
+        return
 
-    # save the word objects in chunks of 50
-    lang_dir = os.path.join(lists_dir, language.value)
-    created_files = save_word_objects_in_chunks(
-        word_objects=word_objects,
-        language=language,
-        lists_dir=lang_dir,
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {
+            executor.submit(
+                create_word_list,
+                lang,
+                basics_list,
+                frequency_list_length,
+                lists_dir,
+            ): lang
+            for lang, basics_list in jobs
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Failed to create list for {futures[future].value}: {e}")
+
+
+@app.command(name="missing-basics")
+def missing_basics(
+    language: Language,
+    basics_list_path: str = DEFAULT_BASICS_LIST_PATH,
+) -> None:
+    from helpers.basics_index import (
+        get_basics_column,
+        get_missing_basics_rows,
+        load_basics_index,
     )
 
-    logger.info(f"Saved {len(word_objects)} words across {len(created_files)} files")
+    basics_index = load_basics_index(basics_list_path)
+    missing_rows = get_missing_basics_rows(basics_index, language)
+
+    if not missing_rows:
+        logger.info(
+            f"All {basics_index['rows']} basics have a {language.value} translation"
+        )
+        return
+
+    english_column = get_basics_column(basics_index, Language.ENGLISH)
+
+    console = Console()
+    table = Table(title=f"Basics without {language.name.title()}")
+
+    table.add_column("Row", style="magenta")
+    table.add_column("English", style="cyan")
+
+    for row in missing_rows:
+        table.add_row(str(row), english_column[row] or "")
+
+    console.print(table)
+    logger.info(f"{len(missing_rows)} of {basics_index['rows']} basics are missing")
 
 
 @app.command()
@@ -127,6 +164,31 @@ def languages() -> None:
     console.print(table)
 
 
+@app.command()
+def quota(cache_dir: str = DEFAULT_CACHE_DIR) -> None:
+    from helpers.quota import get_quota_status
+
+    console = Console()
+    table = Table(title="API Quotas")
+
+    table.add_column("API", style="cyan")
+    table.add_column("Remaining", style="green")
+    table.add_column("Limit", style="magenta")
+    table.add_column("Full In", style="yellow")
+
+    for name, remaining in get_quota_status(cache_dir).items():
+        capacity, period = API_QUOTAS[name]
+        full_in = (capacity - remaining) * period / capacity
+        table.add_row(
+            name,
+            str(int(remaining)),
+            f"{capacity} per {period}s",
+            f"{full_in:.0f}s",
+        )
+
+    console.print(table)
+
+
 @app.command()
 def get_refinement_prompt(
     language: Language,
@@ -157,7 +219,12 @@ def create_audio(
     language: Language,
     media_dir: str = DEFAULT_MEDIA_DIR,
     lists_dir: str = DEFAULT_LISTS_DIR,
+    workers: int = DEFAULT_TTS_WORKERS,
+    batch_size: int = DEFAULT_TTS_BATCH_SIZE,
 ) -> None:
+    from helpers.get_audio_from_google_cloud_tts import get_audio_from_google_cloud_tts
+    from helpers.load_word_list import load_word_list
+
     lang_dir = os.path.join(lists_dir, language.value)
     word_objects = load_word_list(language=language, lists_dir=lang_dir)
 
@@ -168,6 +235,8 @@ def create_audio(
         word_objects=word_objects,
         language=language,
         output_dir=os.path.join(media_dir, DEFAULT_AUDIO_DIR, language.value),
+        workers=workers,
+        batch_size=batch_size,
     )
 
 
@@ -176,7 +245,20 @@ def get_images(
     language: Language,
     media_dir: str = DEFAULT_MEDIA_DIR,
     lists_dir: str = DEFAULT_LISTS_DIR,
+    prefetch: int = 0,
+    candidates: int = DEFAULT_IMAGE_CANDIDATES,
+    workers: int = DEFAULT_IMAGE_WORKERS,
 ) -> None:
+    import pyperclip
+
+    from helpers.get_image_from_unsplash import (
+        get_image_from_unsplash,
+        search_unsplash_images,
+    )
+    from helpers.load_word_list import load_word_list
+    from helpers.media_index import get_image_file, get_image_slug, load_media_index
+    from helpers.word_list_index import WordListIndex, field_equals
+
     # Load word list for the language
     lang_dir = os.path.join(lists_dir, language.value)
     word_objects = load_word_list(language=language, lists_dir=lang_dir)
@@ -185,7 +267,11 @@ def get_images(
         return
 
     # Filter for nouns only
-    noun_objects = [obj for obj in word_objects if obj.get("word_type") == "noun"]
+    noun_objects = list(
+        WordListIndex(word_objects, language).query(
+            field_equals("word_type", WordType.NOUN.value)
+        )
+    )
 
     if not noun_objects:
         logger.info("No nouns found in the word list")
@@ -194,74 +280,136 @@ def get_images(
     images_dir = os.path.join(media_dir, DEFAULT_IMAGES_DIR)
     console = Console()
 
-    # Import slugify for checking existing files
-    from slugify import slugify
+    # Existing images are looked up in the media index instead of on disk
+    media_index = load_media_index(media_dir, [])
 
     # Track statistics
     skipped = 0
-    added = 0
     skipped_by_user = 0
-    total = len(noun_objects)
-    processed = 0
-
-    console.print(f"[bold]Processing {total} nouns...[/bold]\n")
 
+    pending_objects = []
+    queued_slugs = set()
     for word_object in noun_objects:
         en = word_object.get("en", "")
         if not en:
             logger.warning(f"Word object missing 'en' field: {word_object}")
             continue
 
-        # Slugify the English word for the filename
-        en_slug = slugify(en)
-
-        # Check if image already exists
-        image_filepath = os.path.join(images_dir, f"{en_slug}.jpg")
-        if os.path.exists(image_filepath):
+        # Check if image already exists, or is queued for another noun with
+        # the same English word
+        en_slug = get_image_slug(en)
+        if get_image_file(media_index, en_slug) or en_slug in queued_slugs:
             skipped += 1
-            processed += 1
             continue
 
-        # Copy word to clipboard
-        pyperclip.copy(en)
-
-        # Calculate remaining
-        processed += 1
-        remaining = total - processed
-
-        # Prompt user for Unsplash URL
-        console.print(
-            f"\n[bold cyan]Word ({processed}/{total}, {remaining} left):[/bold cyan] {en} [dim](copied to clipboard)[/dim]"
-        )
-        unsplash_url = typer.prompt(
-            "Unsplash URL (or press Enter to skip)", default="", show_default=False
-        )
-
-        # Skip if user pressed Enter without input
-        if not unsplash_url.strip():
-            skipped_by_user += 1
-            continue
+        queued_slugs.add(en_slug)
+        pending_objects.append(word_object)
 
-        # Extract the Unsplash ID from the URL
-        # URL format: https://unsplash.com/photos/{id} or https://unsplash.com/photos/{slug}-{id}
-        # Unsplash IDs are always 11 characters long
-        url_parts = unsplash_url.rstrip("/").split("/")
-        photo_slug = url_parts[-1]
-        unsplash_id = photo_slug[-11:]
-
-        get_image_from_unsplash(
-            word_object=word_object,
-            unsplash_id=unsplash_id,
-            output_dir=images_dir,
-        )
+    total = len(pending_objects)
+    console.print(
+        f"[bold]Processing {total} nouns ({skipped} already have an image)...[/bold]\n"
+    )
 
-        added += 1
-        logger.info(f"Image saved for '{en}' (ID: {unsplash_id})")
+    # Downloads run in the background while the next word is prompted, and
+    # search candidates for the upcoming words are fetched ahead of time
+    download_executor = ThreadPoolExecutor(max_workers=max(workers, 1))
+    search_executor = ThreadPoolExecutor(max_workers=1)
+    downloads = {}
+    searches = {}
+
+    try:
+        for index, word_object in enumerate(pending_objects):
+            en = word_object["en"]
+
+            if prefetch > 0:
+                for ahead in range(index, min(index + prefetch + 1, total)):
+                    if ahead not in searches:
+                        searches[ahead] = search_executor.submit(
+                            search_unsplash_images,
+                            pending_objects[ahead]["en"],
+                            candidates,
+                        )
+
+            # Copy word to clipboard
+            pyperclip.copy(en)
+
+            remaining = total - index - 1
+            console.print(
+                f"\n[bold cyan]Word ({index + 1}/{total}, {remaining} left):[/bold cyan] {en} [dim](copied to clipboard)[/dim]"
+            )
+
+            # Show the prefetched candidates to pick from by number
+            results = []
+            if index in searches:
+                try:
+                    results = searches.pop(index).result()
+                except Exception as e:
+                    logger.warning(f"Failed to search images for '{en}': {e}")
+
+            for number, image_data in enumerate(results, start=1):
+                description = (
+                    image_data.get("alt_description")
+                    or image_data.get("description")
+                    or ""
+                )
+                console.print(
+                    f"  [bold]{number}[/bold] {description} [dim]by {image_data['user']['username']}, {image_data['links']['html']}[/dim]"
+                )
+
+            # Prompt user for a candidate or an Unsplash URL
+            answer = typer.prompt(
+                "Candidate number or Unsplash URL (or press Enter to skip)"
+                if results
+                else "Unsplash URL (or press Enter to skip)",
+                default="",
+                show_default=False,
+            ).strip()
+
+            # Skip if user pressed Enter without input
+            if not answer:
+                skipped_by_user += 1
+                continue
+
+            image_data = None
+            if answer.isdigit() and 1 <= int(answer) <= len(results):
+                image_data = results[int(answer) - 1]
+                unsplash_id = image_data["id"]
+            else:
+                # Extract the Unsplash ID from the URL
+                # URL format: https://unsplash.com/photos/{id} or https://unsplash.com/photos/{slug}-{id}
+                # Unsplash IDs are always 11 characters long
+                url_parts = answer.rstrip("/").split("/")
+                photo_slug = url_parts[-1]
+                unsplash_id = photo_slug[-11:]
+
+            future = download_executor.submit(
+                get_image_from_unsplash,
+                word_object=word_object,
+                unsplash_id=unsplash_id,
+                output_dir=images_dir,
+                image_data=image_data,
+            )
+            downloads[future] = (en, unsplash_id)
+    except typer.Abort:
+        console.print("\n[yellow]Stopped, finishing the queued downloads[/yellow]")
+    finally:
+        search_executor.shutdown(wait=False, cancel_futures=True)
+        with console.status(f"Waiting for {len(downloads)} download(s)..."):
+            download_executor.shutdown(wait=True)
+
+    failed = [
+        (en, unsplash_id)
+        for future, (en, unsplash_id) in downloads.items()
+        if not future.result()
+    ]
+    added = len(downloads) - len(failed)
 
     # Print summary
     console.print(
-        f"\n[bold green]Summary:[/bold green] {added} added, {skipped} already exist, {skipped_by_user} skipped by user"
+        f"\n[bold green]Summary:[/bold green] {added} added, {len(failed)} failed, {skipped} already exist, {skipped_by_user} skipped by user"
     )
+    for en, unsplash_id in failed:
+        console.print(f"  [red]Failed:[/red] {en} (ID: {unsplash_id})")
 
 
 @app.command()
@@ -269,39 +417,173 @@ def finalize_list(
     language: Language,
     lists_dir: str = DEFAULT_LISTS_DIR,
     trim: int = DEFAULT_TRIM_LENGTH,
+    workers: int = DEFAULT_LOAD_WORKERS,
+    casefold: bool = False,
+    unicode_normalize: bool = False,
+    strip_parentheticals: bool = False,
 ) -> None:
+    from helpers.deduplicate_list import deduplicate_list, normalize_word
+    from helpers.load_word_list import load_word_list
+    from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
+    from helpers.word_list_db import open_word_list_transaction
+
     lang_dir = os.path.join(lists_dir, language.value)
-    word_objects = load_word_list(
-        language=language, lists_dir=lang_dir, key_is_required=False
-    )
 
-    if not word_objects:
-        return
+    # The list stays locked from loading to saving, so no other command
+    # writes to it in between
+    with open_word_list_transaction(lang_dir) as connection:
+        word_objects = load_word_list(
+            language=language,
+            lists_dir=lang_dir,
+            key_is_required=False,
+            workers=workers,
+            connection=connection,
+        )
+
+        if not word_objects:
+            return
+
+        # assign key if missing
+        for word_obj in word_objects:
+            if "en" in word_obj and "key" not in word_obj:
+                word_obj["key"] = str(uuid.uuid4())
+
+        # deduplicate list, exact matches only unless a normalization is chosen
+        normalize = None
+        if casefold or unicode_normalize or strip_parentheticals:
+            normalize = partial(
+                normalize_word,
+                casefold=casefold,
+                unicode_form="NFKC" if unicode_normalize else None,
+                strip_parentheticals=strip_parentheticals,
+            )
+
+        deduplicated_word_objects = deduplicate_list(
+            word_objects,
+            key=language.value,
+            normalize=normalize,
+            merge=normalize is not None,
+        )
+
+        if trim > 0:
+            deduplicated_word_objects = deduplicated_word_objects[:trim]
+
+        # only chunks whose content changed are rewritten, stale chunks are removed
+        updated_files = save_word_objects_in_chunks(
+            word_objects=deduplicated_word_objects,
+            language=language,
+            lists_dir=lang_dir,
+            connection=connection,
+        )
 
-    # assign key if missing
-    for word_obj in word_objects:
-        if "en" in word_obj and "key" not in word_obj:
-            word_obj["key"] = str(uuid.uuid4())
+    logger.info(
+        f"Finalized list: {len(word_objects)} → {len(deduplicated_word_objects)} words across {len(updated_files)} file(s)"
+    )
 
-    # deduplicate list
-    deduplicated_word_objects = deduplicate_list(word_objects, key=language.value)
 
-    if trim > 0:
-        deduplicated_word_objects = deduplicated_word_objects[:trim]
+@app.command(name="find-duplicates")
+def find_duplicates(
+    language: Language,
+    lists_dir: str = DEFAULT_LISTS_DIR,
+    threshold: float = DEFAULT_NEAR_DUPLICATE_THRESHOLD,
+    report_file: str = "",
+    merge: bool = False,
+    workers: int = DEFAULT_LOAD_WORKERS,
+) -> None:
+    from helpers.deduplicate_list import merge_word_objects, normalize_word
+    from helpers.find_near_duplicates import find_near_duplicates
+    from helpers.load_word_list import load_word_list
+    from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
+    from helpers.word_list_db import open_word_list_transaction
 
-    # recreate the language directory to clear old files
     lang_dir = os.path.join(lists_dir, language.value)
-    if os.path.exists(lang_dir):
-        shutil.rmtree(lang_dir)
 
-    updated_files = save_word_objects_in_chunks(
-        word_objects=deduplicated_word_objects,
-        language=language,
-        lists_dir=lang_dir,
-    )
+    # The list stays locked until the merged list is saved
+    with open_word_list_transaction(lang_dir) as connection:
+        word_objects = load_word_list(
+            language=language,
+            lists_dir=lang_dir,
+            key_is_required=False,
+            workers=workers,
+            connection=connection,
+        )
+
+        if not word_objects:
+            return
+
+        groups = find_near_duplicates(
+            [
+                normalize_word(word_obj.get(language.value, ""))
+                for word_obj in word_objects
+            ],
+            threshold=threshold,
+        )
+
+        if not groups:
+            logger.info(f"No near-duplicates found at a similarity of {threshold}")
+            return
+
+        console = Console()
+        table = Table(title=f"Near-duplicates in {language.name.title()}")
+
+        table.add_column("Group", style="magenta")
+        table.add_column("Similarity", justify="right")
+        table.add_column("Word", style="cyan")
+        table.add_column("English")
+        table.add_column("Key", style="dim")
+
+        for number, (members, similarity) in enumerate(groups, start=1):
+            for index in members:
+                word_obj = word_objects[index]
+                table.add_row(
+                    str(number),
+                    f"{similarity:.2f}",
+                    word_obj.get(language.value, ""),
+                    word_obj.get("en", ""),
+                    word_obj.get("key", ""),
+                )
+
+        console.print(table)
+
+        if report_file:
+            report = [
+                {
+                    "similarity": round(similarity, 3),
+                    "words": [word_objects[index] for index in members],
+                }
+                for members, similarity in groups
+            ]
+            with open(report_file, "w", encoding="utf-8") as f:
+                yaml.dump(report, f, allow_unicode=True, sort_keys=False)
+            logger.info(f"Wrote {len(groups)} group(s) to {report_file}")
+
+        if not merge:
+            logger.info(f"Found {len(groups)} group(s) of near-duplicates")
+            return
+
+        # The first word object of a group is kept and takes over missing fields
+        dropped = set()
+        for members, _ in groups:
+            first, *rest = members
+            word_objects[first] = merge_word_objects(
+                word_objects[first], [word_objects[index] for index in rest]
+            )
+            dropped.update(rest)
+
+        merged_word_objects = [
+            word_obj
+            for index, word_obj in enumerate(word_objects)
+            if index not in dropped
+        ]
+        updated_files = save_word_objects_in_chunks(
+            word_objects=merged_word_objects,
+            language=language,
+            lists_dir=lang_dir,
+            connection=connection,
+        )
 
     logger.info(
-        f"Finalized list: {len(word_objects)} → {len(deduplicated_word_objects)} words across {len(updated_files)} file(s)"
+        f"Merged {len(groups)} group(s): {len(word_objects)} → {len(merged_word_objects)} words across {len(updated_files)} file(s)"
     )
 
 
@@ -311,117 +593,384 @@ def dump_list(
     lists_dir: str = DEFAULT_LISTS_DIR,
     word_type: WordType = WordType.ALL,
 ) -> None:
-    lang_dir = os.path.join(lists_dir, language.value)
-    word_objects = load_word_list(language=language, lists_dir=lang_dir)
+    from helpers.export_word_list import filter_word_type
+    from helpers.load_word_list import InvalidWordListError, iter_word_list
+    from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
+    from helpers.write_file_atomically import open_directory_atomically
 
-    if not word_objects:
+    lang_dir = os.path.join(lists_dir, language.value)
+    word_count = 0
+
+    def count_word_objects(word_objects):
+        nonlocal word_count
+        for word_obj in word_objects:
+            word_count += 1
+            yield word_obj
+
+    # Chunks are written while the list is still being loaded, into a new
+    # directory that only replaces ./dump once the whole list was valid
+    try:
+        with open_directory_atomically(DEFAULT_DUMP_DIR) as dump_dir:
+            created_files = save_word_objects_in_chunks(
+                word_objects=count_word_objects(
+                    filter_word_type(iter_word_list(language, lang_dir), word_type)
+                ),
+                language=language,
+                lists_dir=dump_dir,
+            )
+    except InvalidWordListError:
+        logger.error("Left 'dump' unchanged")
         return
 
-    # Filter by word_type if not "all"
-    if word_type.value != WordType.ALL.value:
-        filtered_word_objects = [
-            word_obj
-            for word_obj in word_objects
-            if word_obj.get("word_type") == word_type.value
-        ]
-    else:
-        filtered_word_objects = word_objects
-
-    # Save as chunks to ./dump directory
-    created_files = save_word_objects_in_chunks(
-        word_objects=filtered_word_objects,
-        language=language,
-        lists_dir="./dump",
-    )
     logger.info(
-        f"Dumped {len(filtered_word_objects)} word objects across {len(created_files)} file(s) to 'dump'"
+        f"Dumped {word_count} word objects across {len(created_files)} file(s) to 'dump'"
     )
 
 
+def parse_fields(fields: str) -> list[str] | None:
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+
 @app.command(name="export-list")
 def export_list(
     language: Language,
     output_file: str,
     lists_dir: str = DEFAULT_LISTS_DIR,
     word_type: WordType = WordType.ALL,
+    export_format: ExportFormat = typer.Option(
+        None, "--format", help="Defaults to the extension of the output file"
+    ),
+    fields: str = typer.Option("", help="Comma separated fields to export"),
 ) -> None:
+    from helpers.export_word_list import export_word_list, get_export_format
+
+    export_format = export_format or get_export_format(output_file)
+    if not export_format:
+        logger.error(f"Unknown export format for {output_file}, pass --format")
+        return
+
     lang_dir = os.path.join(lists_dir, language.value)
-    word_objects = load_word_list(language=language, lists_dir=lang_dir)
+    export_word_list(
+        language,
+        lang_dir,
+        output_file,
+        export_format,
+        fields=parse_fields(fields),
+        word_type=word_type,
+    )
+
+
+@app.command(name="export-lists")
+def export_lists(
+    language: list[Language] = typer.Argument(None),
+    all_languages: bool = typer.Option(
+        False, "--all", help="Export every language with a list"
+    ),
+    lists_dir: str = DEFAULT_LISTS_DIR,
+    output_dir: str = DEFAULT_EXPORT_DIR,
+    export_format: ExportFormat = typer.Option(ExportFormat.JSON, "--format"),
+    fields: str = typer.Option("", help="Comma separated fields to export"),
+    workers: int = os.cpu_count() or 1,
+) -> None:
+    from helpers.export_word_list import export_word_list
+
+    languages = list(language or [])
+    if all_languages:
+        languages += [
+            lang
+            for lang in Language
+            if os.path.isdir(os.path.join(lists_dir, lang.value))
+            and lang not in languages
+        ]
+
+    if not languages:
+        logger.error("No languages given, pass languages or use --all")
+        return
+
+    # One file per language, e.g. the JSON shards of the website
+    jobs = [
+        (
+            lang,
+            os.path.join(lists_dir, lang.value),
+            os.path.join(output_dir, f"{lang.value}.{export_format.value}"),
+            export_format,
+            parse_fields(fields),
+        )
+        for lang in languages
+    ]
+
+    if workers <= 1 or len(jobs) == 1:
+        for job in jobs:
+            export_word_list(*job)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+        futures = {executor.submit(export_word_list, *job): job[0] for job in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Failed to export list for {futures[future].value}: {e}")
+
+
+def parse_assignments(
+    assignments: list[str], option: str
+) -> list[tuple[str, str]] | None:
+    pairs = []
+    for assignment in assignments:
+        field, separator, value = assignment.partition("=")
+        if not separator or not field:
+            logger.error(f"Expected FIELD=VALUE for {option}, got '{assignment}'")
+            return None
+        pairs.append((field, value))
+    return pairs
+
+
+@app.command()
+def query(
+    language: Language,
+    lists_dir: str = DEFAULT_LISTS_DIR,
+    word_type: WordType = WordType.ALL,
+    gender: str = "",
+    key: str = "",
+    where: list[str] = typer.Option(None, help="FIELD=VALUE, can be repeated"),
+    prefix: list[str] = typer.Option(None, help="FIELD=PREFIX, can be repeated"),
+    has: list[str] = typer.Option(None, help="Field that must be set"),
+    missing: list[str] = typer.Option(None, help="Field that must be empty"),
+    translation_missing: bool = typer.Option(
+        False, "--missing-translation", help="Word or English translation is empty"
+    ),
+    match_any: bool = typer.Option(
+        False, "--any", help="Match any condition instead of all of them"
+    ),
+    output_file: str = typer.Option("", help="Export the matches to this file"),
+    export_format: ExportFormat = typer.Option(None, "--format"),
+    fields: str = typer.Option("", help="Comma separated fields to export"),
+    dump: bool = typer.Option(False, help="Dump the matches to ./dump"),
+    limit: int = 50,
+    workers: int = DEFAULT_LOAD_WORKERS,
+) -> None:
+    from helpers.load_word_list import load_word_list
+    from helpers.word_list_index import (
+        WordListIndex,
+        all_of,
+        any_of,
+        field_equals,
+        has_field,
+        has_prefix,
+        key_is,
+        missing_field,
+        missing_translation,
+    )
+
+    where_pairs = parse_assignments(where or [], "--where")
+    prefix_pairs = parse_assignments(prefix or [], "--prefix")
+    if where_pairs is None or prefix_pairs is None:
+        return
+
+    predicates = [field_equals(field, value) for field, value in where_pairs]
+    predicates += [has_prefix(field, value) for field, value in prefix_pairs]
+    predicates += [has_field(field) for field in has or []]
+    predicates += [missing_field(field) for field in missing or []]
+    if word_type != WordType.ALL:
+        predicates.append(field_equals("word_type", word_type.value))
+    if gender:
+        predicates.append(field_equals("gender", gender))
+    if key:
+        predicates.append(key_is(key))
+    if translation_missing:
+        predicates.append(missing_translation())
+
+    lang_dir = os.path.join(lists_dir, language.value)
+    word_objects = load_word_list(
+        language=language, lists_dir=lang_dir, key_is_required=False, workers=workers
+    )
 
     if not word_objects:
         return
 
-    # Filter by word_type if not "all"
-    if word_type.value != WordType.ALL.value:
-        filtered_word_objects = [
-            word_obj
-            for word_obj in word_objects
-            if word_obj.get("word_type") == word_type.value
-        ]
-    else:
-        filtered_word_objects = word_objects
-
-    # Save as single file
-    with open(output_file, "w", encoding="utf-8") as f:
-        yaml.dump(
-            filtered_word_objects,
-            f,
-            default_flow_style=False,
-            allow_unicode=True,
-            sort_keys=False,
+    word_list_index = WordListIndex(word_objects, language)
+    predicate = any_of(*predicates) if match_any else all_of(*predicates)
+    positions = word_list_index.get_positions(predicate)
+
+    if output_file:
+        from helpers.export_word_list import export_word_objects, get_export_format
+
+        export_format = export_format or get_export_format(output_file)
+        if not export_format:
+            logger.error(f"Unknown export format for {output_file}, pass --format")
+            return
+
+        count = export_word_objects(
+            word_list_index.query(predicate),
+            output_file,
+            export_format,
+            language,
+            parse_fields(fields),
+        )
+        logger.info(f"Exported {count} matching word objects to {output_file}")
+
+    if dump:
+        from helpers.save_word_objects_in_chunks import save_word_objects_in_chunks
+
+        created_files = save_word_objects_in_chunks(
+            word_objects=word_list_index.query(predicate),
+            language=language,
+            lists_dir=DEFAULT_DUMP_DIR,
+        )
+        logger.info(
+            f"Dumped {len(positions)} word objects across {len(created_files)} file(s) to 'dump'"
+        )
+
+    if output_file or dump:
+        return
+
+    console = Console()
+    table = Table(title=f"{len(positions)} of {len(word_objects)} words")
+
+    table.add_column("Index", style="magenta")
+    table.add_column("Word", style="cyan")
+    table.add_column("English")
+    table.add_column("Type")
+    table.add_column("Key", style="dim")
+
+    for position in positions[:limit] if limit > 0 else positions:
+        word_obj = word_objects[position]
+        table.add_row(
+            str(position),
+            str(word_obj.get(language.value, "")),
+            str(word_obj.get("en", "")),
+            str(word_obj.get("word_type", "")),
+            str(word_obj.get("key", "")),
         )
 
-    logger.info(f"Exported {len(filtered_word_objects)} word objects to {output_file}")
+    console.print(table)
+    if 0 < limit < len(positions):
+        logger.info(
+            f"Showing {limit} of {len(positions)} matches, use --limit 0 for all"
+        )
 
 
 @app.command(name="replace-from-dump")
 def replace_from_dump(
     language: Language,
     lists_dir: str = DEFAULT_LISTS_DIR,
+    dry_run: bool = typer.Option(False, help="Show a diff without writing files"),
+    append_orphans: bool = typer.Option(
+        False, help="Append dump entries whose key is not in the list"
+    ),
 ) -> None:
+    from helpers.load_word_list import load_word_list, load_word_list_chunks
+    from helpers.merge_dump import apply_merge, get_merge_diff, plan_merge
+    from helpers.word_list_db import open_word_list_transaction
+
     # Load word objects from ./dump
-    dump_word_objects = load_word_list(language=language, lists_dir="./dump")
+    dump_word_objects = load_word_list(language=language, lists_dir=DEFAULT_DUMP_DIR)
 
     if not dump_word_objects:
         return
 
-    # Load word objects from ./lists/[language]
+    # Load the chunks of ./lists/[language], keys are looked up per chunk
     lang_dir = os.path.join(lists_dir, language.value)
-    list_word_objects = load_word_list(language=language, lists_dir=lang_dir)
+    with open_word_list_transaction(lang_dir) as connection:
+        chunks = load_word_list_chunks(
+            language=language, lists_dir=lang_dir, connection=connection
+        )
 
-    if not list_word_objects:
-        return
+        if not chunks:
+            return
 
-    # Create a mapping of key -> word_object from dump
-    dump_map = {
-        word_obj.get("key"): word_obj
-        for word_obj in dump_word_objects
-        if word_obj.get("key")
-    }
-
-    # Replace matching word objects
-    replaced_count = 0
-    for i, word_obj in enumerate(list_word_objects):
-        key = word_obj.get("key")
-        if key and key in dump_map:
-            list_word_objects[i] = dump_map[key]
-            replaced_count += 1
-
-    # Save updated word objects back to ./lists/[language]
-    lang_dir = os.path.join(lists_dir, language.value)
-    if os.path.exists(lang_dir):
-        shutil.rmtree(lang_dir)
+        plan = plan_merge(
+            chunks, dump_word_objects, language, append_orphans=append_orphans
+        )
 
-    updated_files = save_word_objects_in_chunks(
-        word_objects=list_word_objects,
-        language=language,
-        lists_dir=lang_dir,
-    )
+        console = Console()
+        table = Table(title=f"Merge of 'dump' into '{lang_dir}'")
+
+        table.add_column("Status", style="cyan")
+        table.add_column("Keys", justify="right")
+
+        for status in ("changed", "added", "unchanged", "orphaned"):
+            table.add_row(status.title(), str(len(plan[status])))
+
+        console.print(table)
+
+        if plan["orphaned"]:
+            logger.warning(
+                f"{len(plan['orphaned'])} dump key(s) are not in the list, use --append-orphans to add them: {', '.join(plan['orphaned'])}"
+            )
+
+        if dry_run:
+            diff = get_merge_diff(chunks, plan, lang_dir)
+            if diff:
+                console.print(diff, markup=False, highlight=False, end="")
+            logger.info(
+                f"Dry run, {len(plan['chunks'])} chunk file(s) would be updated"
+            )
+            return
+
+        updated_files = apply_merge(plan, lang_dir, language, connection=connection)
 
     logger.info(
-        f"Replaced {replaced_count} word objects across {len(updated_files)} file(s)"
+        f"Replaced {len(plan['changed'])} and added {len(plan['added'])} word objects across {len(updated_files)} file(s)"
+    )
+
+
+@app.command(name="import-yaml")
+def import_yaml(
+    language: list[Language] = typer.Argument(None),
+    all_languages: bool = typer.Option(
+        False, "--all", help="Import every language with a list"
+    ),
+    lists_dir: str = DEFAULT_LISTS_DIR,
+) -> None:
+    from helpers.word_list_db_transfer import import_yaml_word_list
+
+    languages = list(language or [])
+    if all_languages:
+        languages += [
+            lang
+            for lang in Language
+            if os.path.isdir(os.path.join(lists_dir, lang.value))
+            and lang not in languages
+        ]
+
+    if not languages:
+        logger.error("No languages given, pass languages or use --all")
+        return
+
+    # The YAML chunks replace the stored list, one transaction per language
+    for lang in languages:
+        import_yaml_word_list(lang, os.path.join(lists_dir, lang.value))
+
+
+@app.command(name="export-yaml")
+def export_yaml(
+    language: list[Language] = typer.Argument(None),
+    all_languages: bool = typer.Option(
+        False, "--all", help="Export every language in the database"
+    ),
+    lists_dir: str = DEFAULT_LISTS_DIR,
+) -> None:
+    from helpers.word_list_db_transfer import (
+        export_yaml_word_list,
+        get_stored_languages,
     )
 
+    languages = list(language or [])
+    if all_languages:
+        languages += [
+            lang for lang in get_stored_languages(lists_dir) if lang not in languages
+        ]
+
+    if not languages:
+        logger.error("No languages given, pass languages or use --all")
+        return
+
+    # Only chunk files whose content differs from the database are rewritten
+    for lang in languages:
+        export_yaml_word_list(os.path.join(lists_dir, lang.value))
+
 
 @app.command(name="create-deck")
 def create_deck_command(
@@ -429,9 +978,16 @@ def create_deck_command(
     decks_dir: str = DEFAULT_DECKS_DIR,
     media_dir: str = DEFAULT_MEDIA_DIR,
     lists_dir: str = DEFAULT_LISTS_DIR,
+    workers: int = DEFAULT_LOAD_WORKERS,
+    force: bool = False,
 ) -> None:
+    from helpers.create_deck import create_deck
+    from helpers.load_word_list import load_word_list
+
     lang_dir = os.path.join(lists_dir, target_language.value)
-    word_objects = load_word_list(language=target_language, lists_dir=lang_dir)
+    word_objects = load_word_list(
+        language=target_language, lists_dir=lang_dir, workers=workers
+    )
 
     if not word_objects:
         return
@@ -442,24 +998,225 @@ def create_deck_command(
         target_language=target_language,
         media_dir=media_dir,
         output_dir=os.path.join(decks_dir, target_language.value),
+        force=force,
+    )
+
+
+@app.command()
+def watch(
+    language: list[Language] = typer.Argument(None),
+    all_languages: bool = typer.Option(
+        False, "--all", help="Watch every language with a list"
+    ),
+    lists_dir: str = DEFAULT_LISTS_DIR,
+    media_dir: str = DEFAULT_MEDIA_DIR,
+    decks_dir: str = DEFAULT_DECKS_DIR,
+    debounce: float = DEFAULT_WATCH_DEBOUNCE,
+    poll: bool = typer.Option(False, help="Poll for changes instead of inotify"),
+    poll_interval: float = DEFAULT_WATCH_POLL_INTERVAL,
+) -> None:
+    from helpers.watch_decks import watch_decks
+
+    languages = list(language or [])
+    if all_languages:
+        languages += [
+            lang
+            for lang in Language
+            if os.path.isdir(os.path.join(lists_dir, lang.value))
+            and lang not in languages
+        ]
+
+    if not languages:
+        logger.error("No languages given, pass languages or use --all")
+        return
+
+    try:
+        watch_decks(
+            languages,
+            lists_dir=lists_dir,
+            media_dir=media_dir,
+            decks_dir=decks_dir,
+            debounce=debounce,
+            poll_interval=poll_interval,
+            use_inotify=not poll,
+        )
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+
+
+@app.command(name="build-media-index")
+def build_media_index(
+    media_dir: str = DEFAULT_MEDIA_DIR,
+    rebuild: bool = False,
+) -> None:
+    from helpers.media_index import load_media_index
+
+    # Scans all audio directories and moves per-image metadata into the manifest
+    audio_languages = [
+        lang
+        for lang in Language
+        if os.path.isdir(os.path.join(media_dir, DEFAULT_AUDIO_DIR, lang.value))
+    ]
+    media_index = load_media_index(media_dir, audio_languages, rebuild=rebuild)
+
+    image_count = len(
+        [filename for filename in media_index["images"] if filename.endswith(".jpg")]
+    )
+    audio_count = sum(len(files) for files in media_index["audio"].values())
+    logger.info(
+        f"Indexed {image_count} image(s), {audio_count} audio file(s) and {len(media_index['attributions'])} attribution(s)"
+    )
+
+
+@app.command(name="optimize-media")
+def optimize_media_command(
+    media_dir: str = DEFAULT_MEDIA_DIR,
+    output_dir: str = DEFAULT_OPTIMIZED_MEDIA_DIR,
+    lists_dir: str = DEFAULT_LISTS_DIR,
+    image_size: int = DEFAULT_OPTIMIZED_IMAGE_SIZE,
+    image_quality: int = DEFAULT_OPTIMIZED_IMAGE_QUALITY,
+    webp: bool = False,
+    audio_bitrate: str = DEFAULT_OPTIMIZED_AUDIO_BITRATE,
+    opus: bool = False,
+    trim_silence: bool = True,
+    budget_mb: float = 0,
+    workers: int = os.cpu_count() or 1,
+) -> None:
+    from helpers.load_word_list import load_word_list
+    from helpers.media_index import get_image_slug
+    from helpers.optimize_media import optimize_media
+
+    # The output keeps the media layout, so it can be used with --media-dir
+    audio_languages = [
+        lang
+        for lang in Language
+        if os.path.isdir(os.path.join(media_dir, DEFAULT_AUDIO_DIR, lang.value))
+    ]
+
+    # The budget applies to the media each deck actually references
+    deck_media = {}
+    if budget_mb > 0:
+        for lang in audio_languages:
+            lang_dir = os.path.join(lists_dir, lang.value)
+            word_objects = load_word_list(language=lang, lists_dir=lang_dir)
+            if not word_objects:
+                continue
+            deck_media[lang.value] = (
+                {get_image_slug(obj.get("en", "")) for obj in word_objects},
+                {obj["key"] for obj in word_objects},
+            )
+
+    optimize_media(
+        media_dir=media_dir,
+        output_dir=output_dir,
+        languages=[lang.value for lang in audio_languages],
+        image_size=image_size,
+        image_quality=image_quality,
+        image_format="webp" if webp else "jpeg",
+        audio_bitrate=audio_bitrate,
+        audio_format="opus" if opus else "mp3",
+        trim_silence=trim_silence,
+        workers=workers,
+        budget_bytes=int(budget_mb * 1_000_000) if budget_mb > 0 else None,
+        deck_media=deck_media,
+    )
+
+
+@app.command(name="create-decks")
+def create_decks_command(
+    target: list[Language] = [],
+    native: list[Language] = [Language.ENGLISH],
+    all_languages: bool = typer.Option(
+        False, "--all", help="Use every target language with a word list"
+    ),
+    decks_dir: str = DEFAULT_DECKS_DIR,
+    media_dir: str = DEFAULT_MEDIA_DIR,
+    lists_dir: str = DEFAULT_LISTS_DIR,
+    workers: int = os.cpu_count() or 1,
+    force: bool = False,
+) -> None:
+    from helpers.create_decks import create_decks
+    from helpers.load_word_list import load_word_list
+
+    target_languages = target
+    if all_languages:
+        target_languages = [
+            lang
+            for lang in Language
+            if os.path.isdir(os.path.join(lists_dir, lang.value))
+        ]
+
+    if not target_languages:
+        logger.error("No target languages given, use --target or --all")
+        return
+
+    # Each list is loaded once and shared by all decks for its language
+    word_lists = {}
+    for target_language in target_languages:
+        lang_dir = os.path.join(lists_dir, target_language.value)
+        word_objects = load_word_list(language=target_language, lists_dir=lang_dir)
+        if word_objects:
+            word_lists[target_language] = word_objects
+
+    create_decks(
+        word_lists=word_lists,
+        native_languages=native,
+        media_dir=media_dir,
+        decks_dir=decks_dir,
+        workers=workers,
+        force=force,
     )
 
 
 @app.command()
-def upload_media(media_dir: str = DEFAULT_MEDIA_DIR):
-    upload_to_bucket(path=media_dir.lstrip("./"))
+def upload_media(
+    media_dir: str = DEFAULT_MEDIA_DIR,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
+):
+    from helpers.media_index import merge_image_attributions
+    from helpers.upload_to_bucket import upload_to_bucket
+
+    # The attribution manifest is merged by slug, so nobody's entries are lost
+    upload_to_bucket(
+        path=media_dir.lstrip("./"),
+        workers=workers,
+        dry_run=dry_run,
+        merge_files={
+            f"{DEFAULT_IMAGES_DIR}/{IMAGE_ATTRIBUTIONS_FILENAME}": merge_image_attributions
+        },
+    )
 
 
 @app.command()
-def download_media(media_dir: str = DEFAULT_MEDIA_DIR):
-    download_from_bucket(path=media_dir.lstrip("./"))
+def download_media(
+    media_dir: str = DEFAULT_MEDIA_DIR,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
+):
+    from helpers.download_from_bucket import download_from_bucket
+    from helpers.media_index import merge_image_attributions
+
+    # The attribution manifest is merged by slug, so nobody's entries are lost
+    download_from_bucket(
+        path=media_dir.lstrip("./"),
+        workers=workers,
+        dry_run=dry_run,
+        merge_files={
+            f"{DEFAULT_IMAGES_DIR}/{IMAGE_ATTRIBUTIONS_FILENAME}": merge_image_attributions
+        },
+    )
 
 
 @app.command()
 def upload_decks(
     decks_dir: str = DEFAULT_DECKS_DIR,
+    workers: int = DEFAULT_SYNC_WORKERS,
+    dry_run: bool = False,
 ):
-    upload_to_bucket(path=decks_dir.lstrip("./"))
+    from helpers.upload_to_bucket import upload_to_bucket
+
+    upload_to_bucket(path=decks_dir.lstrip("./"), workers=workers, dry_run=dry_run)
 
 
 if __name__ == "__main__":